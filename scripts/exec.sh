@@ -36,12 +36,15 @@ case "$1" in
     migrate)
         $DOCKER_COMMAND run -T backend bash < "${SCRIPTS_PATH}/migrate.sh"
         ;;
+    bench)
+        $DOCKER_COMMAND run --rm -T backend bash -s -- "${@:2}" < "${SCRIPTS_PATH}/bench.sh"
+        ;;
     test)
         $DOCKER_COMMAND $DOCKER_COMPOSE_TEST_FILES run --rm -T backend bash < "${SCRIPTS_PATH}/test.sh"
         $DOCKER_COMMAND $DOCKER_COMPOSE_TEST_FILES down
         ;;
     *)
-        echo "Usage: $0 {format|makemigrations|migrate|bash|test}"
+        echo "Usage: $0 {format|makemigrations|migrate|bash|test|bench}"
         exit 1
         ;;
 esac
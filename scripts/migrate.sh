@@ -2,3 +2,6 @@
 
 cd src
 alembic upgrade head
+if [ -n "$DATABASE_SHARDS" ]; then
+    alembic -n shards upgrade head
+fi
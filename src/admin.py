@@ -1,9 +1,20 @@
-from fastapi import Request
-from fastapi.responses import RedirectResponse
-from sqladmin import ModelView
-from sqladmin.authentication import AuthenticationBackend
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Type
+from uuid import UUID
 
-from src.core.database import AsyncSessionLocal
+from fastapi import HTTPException, Request
+from fastapi.responses import RedirectResponse, Response
+from sqladmin import Admin, ModelView
+from sqladmin.authentication import AuthenticationBackend, login_required
+from sqladmin.pagination import PageControl, Pagination
+from sqlalchemy import ColumnElement, Select, literal, select, tuple_
+from sqlalchemy.ext.asyncio import async_object_session
+from sqlalchemy.orm import joinedload
+from starlette.datastructures import URL
+
+from src.core.database import AsyncSessionLocal, DatedTableMixin, Objects
+from src.core.outbox import queue_invalidations
 from src.core.security import AuthManager, PasswordManager
 from src.models import User, Url
 
@@ -50,19 +61,134 @@ class AdminAuth(AuthenticationBackend):
         return None
 
 
+@dataclass
+class KeysetPagination(Pagination):
+    """A page of a keyset-paged list, linking to its neighbours by cursor rather than by offset."""
+
+    previous_cursor: str | None = None
+    next_cursor: str | None = None
+
+    @property
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def add_pagination_urls(self, base_url: URL) -> None:
+        base_url = base_url.remove_query_params(["after", "before"])
+        if self.previous_cursor is not None:
+            url = base_url.include_query_params(page=max(1, self.page - 1), before=self.previous_cursor)
+            self.page_controls.append(PageControl(number=max(1, self.page - 1), url=str(url)))
+        self.page_controls.append(PageControl(number=self.page, url="#"))
+        if self.next_cursor is not None:
+            url = base_url.include_query_params(page=self.page + 1, after=self.next_cursor)
+            self.page_controls.append(PageControl(number=self.page + 1, url=str(url)))
+
+
+class KeysetModelView(ModelView):
+    """
+    A list view for large tables: rows are paged newest first by keyset on `(created_at, id)`
+    instead of by OFFSET, and counted from the table statistics instead of with count(*).
+    Searching or sorting by a column falls back to sqladmin's offset paging.
+    """
+
+    async def count(self) -> int:
+        async with AsyncSessionLocal() as session:
+            return await Objects(self.model, session).count(approximate=True)
+
+    def cursor(self, row: Url | User) -> str:
+        return f"{row.created_at.isoformat()}_{row.id}"
+
+    def parse_cursor(self, cursor: str) -> tuple[datetime, UUID]:
+        try:
+            created_at, id = cursor.rsplit("_", 1)
+            return datetime.fromisoformat(created_at), UUID(id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid page cursor.")
+
+    def cursor_key(self, cursor: str) -> ColumnElement:
+        created_at, id = self.parse_cursor(cursor)
+        return tuple_(literal(created_at), literal(id))
+
+    async def keyset_list(self, page: int, page_size: int, after: str | None, before: str | None) -> KeysetPagination:
+        page_size = min(page_size or self.page_size, max(self.page_size_options))
+        model: Type[DatedTableMixin] = self.model
+        key = tuple_(model.created_at, model.id)
+        stmt: Select = select(model).limit(page_size + 1)
+        for relation in self._list_relation_attrs:
+            stmt = stmt.options(joinedload(relation))
+        if before is not None:
+            stmt = stmt.where(key > self.cursor_key(before))
+            stmt = stmt.order_by(model.created_at.asc(), model.id.asc())
+        else:
+            if after is not None:
+                stmt = stmt.where(key < self.cursor_key(after))
+            stmt = stmt.order_by(model.created_at.desc(), model.id.desc())
+
+        rows = list(await self._run_query(stmt))
+        more = len(rows) > page_size
+        rows = rows[:page_size]
+        if before is not None:
+            rows.reverse()
+        pagination = KeysetPagination(rows=rows, page=page, page_size=page_size, count=await self.count())
+        if rows:
+            if before is not None and more or after is not None:
+                pagination.previous_cursor = self.cursor(rows[0])
+            if before is None and more or before is not None:
+                pagination.next_cursor = self.cursor(rows[-1])
+        return pagination
+
+
+class KeysetAdmin(Admin):
+    """Admin passing the page cursor of list requests to the views paging by keyset."""
+
+    @login_required
+    async def list(self, request: Request) -> Response:
+        await self._list(request)
+
+        model_view = self._find_model_view(request.path_params["identity"])
+
+        params = request.query_params
+        page = int(params.get("page", 1))
+        page_size = int(params.get("pageSize", 0))
+        search = params.get("search", None)
+        sort_by = params.get("sortBy", None)
+        sort = params.get("sort", "asc")
 
-class UserAdmin(ModelView, model=User):
+        pagination: Pagination
+        if isinstance(model_view, KeysetModelView) and not search and not sort_by:
+            pagination = await model_view.keyset_list(page, page_size, params.get("after"), params.get("before"))
+        else:
+            pagination = await model_view.list(page, page_size, search, sort_by, sort)
+        pagination.add_pagination_urls(request.url)
+
+        context = {
+            "request": request,
+            "model_view": model_view,
+            "pagination": pagination,
+        }
+
+        return self.templates.TemplateResponse(model_view.list_template, context)
+
+
+class UserAdmin(KeysetModelView, model=User):
     column_list = [
         User.email,
         User.created_at,
         User.id,
         User.password,
         User.is_superuser,
+        User.is_high_traffic,
     ]
     column_searchable_list = [User.id, User.email]
+    # A user may own millions of links: never load them all in the details page or the edit form.
+    column_details_exclude_list = [User.urls]
+    form_excluded_columns = [User.urls]
 
 
-class UrlAdmin(ModelView, model=Url):
+class UrlAdmin(KeysetModelView, model=Url):
     column_list = [
         Url.original_url,
         Url.shortened_url,
@@ -73,3 +199,29 @@ class UrlAdmin(ModelView, model=Url):
         Url.updated_at,
         Url.id,
     ]
+    # The owner is joined in the list query; the edit form looks owners up by email instead of
+    # rendering every user as an option.
+    form_ajax_refs = {"owner": {"fields": ("email",), "order_by": "email"}}
+    # Fields making up a link's cached redirect.
+    redirect_fields = ("original_url", "shortened_url", "is_active", "redirect_type", "expires_at", "max_clicks")
+
+    async def on_model_change(self, data: Dict[str, Any], model: Url, is_created: bool) -> None:
+        """Queue the invalidation of an edited link's cached redirect, in the edit's transaction."""
+        if is_created or not any(field in data and data[field] != getattr(model, field) for field in self.redirect_fields):
+            return
+        session = async_object_session(model)
+        assert session is not None
+        # The model still has its previous code.
+        await queue_invalidations(session, [model.shortened_url])
+
+    async def delete_model(self, obj: Url) -> None:
+        """
+        sqladmin's delete, queueing the invalidation of the link's cached redirect in the delete's
+        transaction: `on_model_delete` is not given the session.
+        """
+        async with self.sessionmaker() as session:
+            await self.on_model_delete(obj)
+            await queue_invalidations(session, [obj.shortened_url])
+            await session.delete(obj)
+            await session.commit()
+            await self.after_model_delete(obj)
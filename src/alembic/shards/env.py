@@ -0,0 +1,87 @@
+"""
+Migrations of the url shards (see src/core/sharding.py), which hold the `url` table without its
+foreign key to `user`, and the cache invalidation outbox. They are applied to every shard of the
+current ring, or to the one given with `-x shard=<name>`:
+
+    alembic -n shards upgrade head
+    alembic -n shards -x shard=shard_1 revision --autogenerate
+"""
+from logging.config import fileConfig
+from sqlalchemy.ext.asyncio import create_async_engine
+from alembic import context
+from src import models  # noqa: F401
+from src.core.database import SQLBase
+from src.core.sharding import shards
+
+# Alembic Config object
+config = context.config
+
+# Python logging setup
+fileConfig(config.config_file_name)
+
+target_metadata = SQLBase.metadata
+
+SHARD_TABLES = {"url", "cache_invalidation"}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Compare the tables shards hold, without the foreign keys to the primary's tables."""
+    if type_ == "table":
+        return name in SHARD_TABLES
+    return type_ != "foreign_key_constraint"
+
+
+def shard_names():
+    name = context.get_x_argument(as_dictionary=True).get("shard")
+    if name is not None:
+        return [name]
+    if shards.ring is None:
+        raise RuntimeError("DATABASE_SHARDS is not set.")
+    # Shards only left in the previous ring are being emptied, and may be the primary database.
+    return shards.ring.names
+
+
+def run_migrations_offline():
+    """Run migrations in 'offline' mode."""
+    for name in shard_names():
+        context.configure(
+            url=shards.urls[name],
+            target_metadata=target_metadata,
+            include_object=include_object,
+            literal_binds=True,
+            compare_type=True,
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+async def run_migrations_online():
+    """Run migrations in 'online' mode, one shard after the other."""
+    for name in shard_names():
+        connectable = create_async_engine(shards.urls[name])
+
+        async with connectable.connect() as connection:
+            await connection.run_sync(do_run_migrations)
+        await connectable.dispose()
+
+
+def do_run_migrations(connection):
+    """Configure context and run migrations."""
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        compare_type=True,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    # Using asyncio to run the async function
+    import asyncio
+    asyncio.run(run_migrations_online())
@@ -0,0 +1,29 @@
+"""empty message
+
+Revision ID: 5d2a8e6f1c37
+Revises: 3b7e91c4d5a2
+Create Date: 2026-10-18 17:02:48.361925
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2a8e6f1c37'
+down_revision = '3b7e91c4d5a2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Built concurrently, so large tables stay writable while the indexes are created.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_url_created_at_id', 'url', ['created_at', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_user_created_at_id', 'user', ['created_at', 'id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_user_created_at_id', table_name='user', postgresql_concurrently=True)
+        op.drop_index('ix_url_created_at_id', table_name='url', postgresql_concurrently=True)
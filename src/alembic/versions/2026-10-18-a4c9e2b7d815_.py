@@ -0,0 +1,92 @@
+"""empty message
+
+Revision ID: a4c9e2b7d815
+Revises: 5d2a8e6f1c37
+Create Date: 2026-10-18 19:26:11.538204
+
+"""
+import hashlib
+from datetime import datetime
+from urllib.parse import urlsplit, urlunsplit
+from uuid import UUID
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c9e2b7d815'
+down_revision = '5d2a8e6f1c37'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 5000
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+SELECT_BATCH = sa.text(
+    "SELECT id, created_at, owner_id, original_url FROM url "
+    "WHERE is_active AND (created_at, id) > (:created_at, :id) ORDER BY created_at, id LIMIT :batch_size"
+)
+
+# A link only gets the hash if no active link of its owner holds it yet, oldest first.
+BACKFILL_BATCH = sa.text(
+    "UPDATE url SET url_hash = batch.url_hash FROM unnest(:ids, :hashes) AS batch(id, url_hash) "
+    "WHERE url.id = batch.id AND NOT EXISTS ("
+    "SELECT 1 FROM url AS other WHERE other.owner_id = url.owner_id AND other.url_hash = batch.url_hash AND other.is_active)"
+).bindparams(
+    sa.bindparam('ids', type_=postgresql.ARRAY(postgresql.UUID(as_uuid=True))),
+    sa.bindparam('hashes', type_=postgresql.ARRAY(sa.LargeBinary())),
+)
+
+
+# Copies of src.core.url_shortener.normalize_url and url_hash as of this revision, so later changes
+# to the normalization do not change what this migration writes.
+def normalize_url(original_url):
+    parts = urlsplit(original_url)
+    scheme = parts.scheme.lower()
+    netloc = parts.hostname or ""
+    if ":" in netloc:
+        netloc = f"[{netloc}]"
+    if parts.port is not None and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{parts.port}"
+    if parts.username is not None:
+        userinfo = parts.username if parts.password is None else f"{parts.username}:{parts.password}"
+        netloc = f"{userinfo}@{netloc}"
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, parts.fragment))
+
+
+def url_hash(original_url):
+    return hashlib.blake2b(normalize_url(original_url).encode(), digest_size=16).digest()
+
+
+def upgrade():
+    op.add_column('url', sa.Column('url_hash', sa.LargeBinary(length=16), nullable=True))
+    # The index is built concurrently and the rows are hashed in committed batches, so large
+    # tables stay writable during the migration.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_url_owner_id_url_hash', 'url', ['owner_id', 'url_hash'], unique=True,
+            postgresql_where=sa.text('is_active'), postgresql_concurrently=True,
+        )
+        connection = op.get_bind()
+        cursor = {'created_at': datetime.min, 'id': UUID(int=0)}
+        while True:
+            rows = connection.execute(SELECT_BATCH, {**cursor, 'batch_size': BACKFILL_BATCH_SIZE}).all()
+            if not rows:
+                break
+            hashes = {}
+            for row in rows:
+                hashes.setdefault((row.owner_id, url_hash(row.original_url)), row.id)
+            connection.execute(
+                BACKFILL_BATCH,
+                {'ids': list(hashes.values()), 'hashes': [hashed_url for _, hashed_url in hashes]},
+            )
+            cursor = {'created_at': rows[-1].created_at, 'id': rows[-1].id}
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_url_owner_id_url_hash', table_name='url', postgresql_concurrently=True)
+    op.drop_column('url', 'url_hash')
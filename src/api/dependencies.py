@@ -1,11 +1,11 @@
 from typing import AsyncGenerator
 
-from fastapi import Depends, Request
-from redis.asyncio import Redis
+from fastapi import Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
 from src.core.database import AsyncSessionLocal
+from src.core.profiling import ProfiledRedis
 from src.core.security import AuthManager
 from src.core.config import settings
 from src.models import User
@@ -16,8 +16,8 @@ async def db_session() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
-async def get_redis() -> AsyncGenerator[Redis, None]:
-    async with Redis.from_url(
+async def get_redis() -> AsyncGenerator[ProfiledRedis, None]:
+    async with ProfiledRedis.from_url(
         f"redis://{settings.redis_host}:{settings.redis_port}",
         encoding="utf-8", decode_responses=True
     ) as redis_:
@@ -27,3 +27,9 @@ async def get_redis() -> AsyncGenerator[Redis, None]:
 async def get_user(request: Request, session: AsyncSession = Depends(db_session)) -> User:
     manager = AuthManager()
     return await manager(request=request, session=session)
+
+
+async def get_superuser(user: User = Depends(get_user)) -> User:
+    if not user.is_superuser:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only superusers can access this resource.")
+    return user
@@ -1,16 +1,12 @@
-import logging
-from typing import Any
-
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.responses import RedirectResponse
 from redis.asyncio import Redis
 
 from src.api.dependencies import db_session, get_redis
 from src.core.database import AsyncSession
-from src.models import Url
-from src.celery.tasks import increment_click_count
-
-logger = logging.getLogger(__name__)
+from src.api.v1.schemas import RedirectResolve, RedirectsResolved, ResolvedRedirect
+from src.core.redirects import redirect_response, resolve_redirect, resolve_redirects
+from src.core.visitors import visitor_id
 
 router = APIRouter()
 
@@ -18,19 +14,33 @@ router = APIRouter()
 @router.get("/{shortened_url}", status_code=status.HTTP_302_FOUND, include_in_schema=False)
 async def redirect(
     shortened_url: str,
+    request: Request,
     redis: Redis = Depends(get_redis),
     session: AsyncSession = Depends(db_session)
 ) -> RedirectResponse:
-    logger.info(f"Retrieving original URL for shortened URL '{shortened_url}' from Redis cache.")  # Log Redis retrieval for demo purposes, showcasing cache usage.
-    original_url = await redis.get(f"url:{shortened_url}")
-    if original_url is None:
-        logger.info(f"Original URL for shortened URL '{shortened_url}' not found in Redis cache. Attempting to retrieve from database.")  # Log Redis retrieval for demo purposes, showcasing cache usage.
-        url = await Url.objects(session).get(Url.shortened_url == shortened_url, Url.is_active == True)
-        if not url:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="URL not found.")
-        original_url = url.original_url
-        await redis.set(f"url:{shortened_url}", original_url, ex=3600)
-    else:
-        logger.info(f"Found original URL '{original_url}' for shortened URL '{shortened_url}' in Redis cache.")  # Log Redis retrieval for demo purposes, showcasing cache usage.
-    increment_click_count.delay(shortened_url)
-    return RedirectResponse(url=original_url, status_code=status.HTTP_302_FOUND)
+    redirect = await resolve_redirect(shortened_url, redis, session)
+    if redirect is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="URL not found.")
+    visitor = visitor_id(request.client and request.client.host, request.headers.get("user-agent"))
+    return redirect_response(shortened_url, redirect, visitor)
+
+
+@router.post("/resolve", response_model=RedirectsResolved)
+async def resolve(
+    data: RedirectResolve,
+    redis: Redis = Depends(get_redis),
+    session: AsyncSession = Depends(db_session)
+) -> RedirectsResolved:
+    """
+    The targets of many shortened URLs, for services rendering pages full of them. Nothing is
+    redirected, so no clicks are counted.
+    """
+    redirects, hit_ratio = await resolve_redirects(data.shortened_urls, redis, session)
+    return RedirectsResolved(
+        redirects={
+            shortened_url: ResolvedRedirect(original_url=redirect.original_url, status_code=redirect.status_code)
+            for shortened_url, redirect in redirects.items()
+        },
+        not_found=[shortened_url for shortened_url in dict.fromkeys(data.shortened_urls) if shortened_url not in redirects],
+        cache_hit_ratio=hit_ratio,
+    )
@@ -1,13 +1,20 @@
-from typing import Any
+from datetime import date, datetime, timedelta
+from typing import Any, List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from fastapi_pagination import Page, paginate
 from redis.asyncio import Redis
 
-from src.api.dependencies import db_session, get_redis, get_user
-from src.api.v1.schemas import Url, UrlCreate
+from src.api.dependencies import db_session, get_redis, get_superuser, get_user
+from src.api.v1.schemas import TrendingUrl, Url, UrlCreate, UrlDeactivate, UrlDeactivated, UrlStats
 from src.controllers import UrlController
+from src.core.cache import evict_urls, url_cache_key
 from src.core.database import AsyncSession
+from src.core.sharding import find_on_shards
+from src.core.config import settings
+from src.core.redirects import write_through
+from src.core.trending import trending_urls
+from src.core.visitors import count_unique_visitors
 from src.models import User
 from src import models
 
@@ -22,26 +29,89 @@ async def get_shortened_urls(
     return paginate(urls)
 
 
+@router.get("/trending", response_model=List[TrendingUrl])
+async def get_trending_urls(
+    limit: int = Query(10, ge=1, le=100),
+    user: User = Depends(get_superuser),
+    redis: Redis = Depends(get_redis),
+) -> Any:
+    """Links of every user with the most clicks recently, highest score first. Superusers only."""
+    scores = await trending_urls(redis, limit)
+    return [TrendingUrl(shortened_url=shortened_url, score=score) for shortened_url, score in scores]
+
+
 @router.get("/{shortened_url}", response_model=Url)
 async def get_shortened_url_data(
     shortened_url : str,
     user: User = Depends(get_user),
     session: AsyncSession = Depends(db_session)
 ) -> Any:
-    url = await models.Url.objects(session).get(models.Url.shortened_url == shortened_url, models.Url.owner_id == user.id)
+    url = await find_on_shards(
+        session,
+        shortened_url,
+        lambda shard_session: models.Url.objects(shard_session).get(
+            models.Url.shortened_url == shortened_url, models.Url.owner_id == user.id
+        ),
+    )
     if not url:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="URL not found or you do not have permission to modify it.")
     return url
 
 
+@router.get("/{shortened_url}/stats", response_model=UrlStats)
+async def get_shortened_url_stats(
+    shortened_url: str,
+    start: date | None = None,
+    end: date | None = None,
+    user: User = Depends(get_user),
+    redis: Redis = Depends(get_redis),
+    session: AsyncSession = Depends(db_session),
+) -> Any:
+    """Clicks and unique visitors of a URL from `start` to `end` (UTC days, both included; the last 30 days by default)."""
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+    if not timedelta(0) <= end - start < timedelta(days=settings.visitor_stats_max_days):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The date range must end after it starts and span at most {settings.visitor_stats_max_days} days.",
+        )
+    url = await find_on_shards(
+        session,
+        shortened_url,
+        lambda shard_session: models.Url.objects(shard_session).get(
+            models.Url.shortened_url == shortened_url, models.Url.owner_id == user.id
+        ),
+    )
+    if not url:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="URL not found or you do not have permission to modify it."
+        )
+    unique_visitors = await count_unique_visitors(redis, shortened_url, start, end)
+    return UrlStats(shortened_url=shortened_url, start=start, end=end, clicks=url.clicks, unique_visitors=unique_visitors)
+
+
 @router.post("", response_model=Url, status_code=status.HTTP_201_CREATED)
 async def create_shortened_url(
     url_data: UrlCreate,
+    response: Response,
     alias: str | None = None,
+    idempotent: bool = False,
     user: User = Depends(get_user),
+    redis: Redis = Depends(get_redis),
     session: AsyncSession = Depends(db_session),
 ) -> Any:
-    return await UrlController.create(url_data=url_data, owner_id=user.id, alias=alias, session=session)
+    """
+    With `idempotent`, and no alias, an active link of yours to the same URL is returned with a
+    200 instead of creating another one, or a 409 if it has other settings.
+    """
+    url, created = await UrlController.create(
+        url_data=url_data, owner_id=user.id, alias=alias, session=session, idempotent=idempotent and not alias
+    )
+    if not created:
+        response.status_code = status.HTTP_200_OK
+        return url
+    await write_through(redis, [url], user)
+    return url
 
 
 @router.delete("/{shortened_url}", response_model=Url, status_code=status.HTTP_202_ACCEPTED)
@@ -52,5 +122,19 @@ async def delete_shortened_url(
     session: AsyncSession = Depends(db_session),
 ) -> Any:
     url = await UrlController.deactivate(shortened_url=shortened_url, owner_id=user.id, session=session)
-    await redis.delete(f"url:{shortened_url}")
+    await redis.delete(url_cache_key(shortened_url))
     return url
+
+
+@router.post("/deactivate", response_model=UrlDeactivated)
+async def deactivate_shortened_urls(
+    data: UrlDeactivate,
+    user: User = Depends(get_user),
+    redis: Redis = Depends(get_redis),
+    session: AsyncSession = Depends(db_session),
+) -> Any:
+    """Deactivate a campaign's links at once. Links that are unknown, not yours or already inactive are skipped."""
+    urls = await UrlController.deactivate_many(shortened_urls=data.shortened_urls, owner_id=user.id, session=session)
+    deactivated = [url.shortened_url for url in urls]
+    await evict_urls(redis, deactivated)
+    return UrlDeactivated(deactivated=deactivated)
@@ -1,3 +1,13 @@
 from .token import Token, TokenPayload
 from .user import User, UserCreate
-from .url import Url, UrlCreate
+from .url import (
+    RedirectResolve,
+    RedirectsResolved,
+    ResolvedRedirect,
+    TrendingUrl,
+    Url,
+    UrlCreate,
+    UrlDeactivate,
+    UrlDeactivated,
+    UrlStats,
+)
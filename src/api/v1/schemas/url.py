@@ -1,10 +1,25 @@
+from datetime import date, datetime, timezone
+from typing import Dict, List
 from uuid import UUID
 
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, HttpUrl, conint, conlist, validator
+
+from src.core.config import settings
+from src.models.url import RedirectType
 
 
 class UrlCreate(BaseModel):
     original_url: HttpUrl
+    expires_at: datetime | None = None
+    max_clicks: conint(gt=0) | None = None  # type: ignore[valid-type]
+    redirect_type: RedirectType = RedirectType.found
+
+    @validator("expires_at")
+    def naive_utc(cls, expires_at: datetime | None) -> datetime | None:
+        # Timestamps are stored as naive UTC.
+        if expires_at is not None and expires_at.tzinfo is not None:
+            return expires_at.astimezone(timezone.utc).replace(tzinfo=None)
+        return expires_at
 
 
 class Url(UrlCreate):
@@ -15,3 +30,44 @@ class Url(UrlCreate):
 
     class Config:
         orm_mode = True
+
+
+class UrlDeactivate(BaseModel):
+    shortened_urls: conlist(str, min_items=1, max_items=settings.url_bulk_deactivate_max_links)  # type: ignore[valid-type]
+
+
+class UrlDeactivated(BaseModel):
+    deactivated: List[str]
+
+
+class TrendingUrl(BaseModel):
+    shortened_url: str
+    # Clicks, each weighing half as much every `trending_half_life` seconds
+    score: float
+
+
+class UrlStats(BaseModel):
+    shortened_url: str
+    start: date
+    end: date
+    # All-time redirects
+    clicks: int
+    # Estimated from HyperLogLog sketches, with a standard error of 0.81%
+    unique_visitors: int
+
+
+class RedirectResolve(BaseModel):
+    shortened_urls: conlist(str, min_items=1, max_items=settings.redirect_resolve_max_codes)  # type: ignore[valid-type]
+
+
+class ResolvedRedirect(BaseModel):
+    original_url: str
+    status_code: int
+
+
+class RedirectsResolved(BaseModel):
+    redirects: Dict[str, ResolvedRedirect]
+    # Codes without an active link
+    not_found: List[str]
+    # Share of the codes found in the redirect cache
+    cache_hit_ratio: float
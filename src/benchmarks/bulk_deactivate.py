@@ -0,0 +1,115 @@
+"""
+Throughput of retiring a whole campaign of links.
+
+Seeds `--links` active links for a benchmark user, caches them all in Redis, then deactivates
+and evicts them the way `POST /urls/deactivate` does: one `UPDATE ... RETURNING` per shard and
+one pipelined round trip of `UNLINK`s. For comparison, `--per-link` of them are first retired
+one by one, the way `DELETE /urls/{shortened_url}` does. Both are reported in links per second.
+
+    python -m src.benchmarks.bulk_deactivate --links 100000
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, List
+from uuid import UUID
+
+from redis.asyncio import Redis
+from sqlalchemy import text
+
+from src.controllers import UrlController
+from src.core.cache import evict_urls, url_cache_key
+from src.core.config import settings
+from src.core.database import AsyncSessionLocal, async_engine
+
+BENCHMARK_EMAIL = "bulk-deactivate-benchmark@example.com"
+
+
+def campaign_code(index: int) -> str:
+    return f"bd{index:08d}"
+
+
+async def seed(links: int, redis: Redis) -> UUID:
+    async with async_engine.begin() as connection:
+        owner_id = (
+            await connection.execute(
+                text(
+                    'INSERT INTO "user" (email, password, is_active, is_superuser) VALUES (:email, \'\', true, false) '
+                    "ON CONFLICT (email) DO UPDATE SET email = EXCLUDED.email RETURNING id"
+                ),
+                {"email": BENCHMARK_EMAIL},
+            )
+        ).scalar_one()
+        await connection.execute(text("DELETE FROM url WHERE owner_id = :owner_id"), {"owner_id": owner_id})
+        await connection.execute(
+            text(
+                "INSERT INTO url (original_url, shortened_url, is_active, clicks, owner_id) "
+                "SELECT 'https://example.com/' || i, 'bd' || lpad(i::text, 8, '0'), true, 0, :owner_id "
+                "FROM generate_series(0, :stop) AS i"
+            ),
+            {"owner_id": owner_id, "stop": links - 1},
+        )
+    async with redis.pipeline(transaction=False) as pipeline:
+        for index in range(links):
+            pipeline.set(url_cache_key(campaign_code(index)), f"302 0 https://example.com/{index}", ex=settings.url_cache_ttl)
+        await pipeline.execute()
+    return owner_id
+
+
+async def per_link(codes: List[str], owner_id: UUID, redis: Redis) -> float:
+    async with AsyncSessionLocal() as session:
+        start = time.perf_counter()
+        for code in codes:
+            await UrlController.deactivate(shortened_url=code, owner_id=owner_id, session=session)
+            await redis.delete(url_cache_key(code))
+        return time.perf_counter() - start
+
+
+async def bulk(codes: List[str], owner_id: UUID, redis: Redis) -> Dict[str, float]:
+    async with AsyncSessionLocal() as session:
+        start = time.perf_counter()
+        urls = await UrlController.deactivate_many(shortened_urls=codes, owner_id=owner_id, session=session)
+        update_seconds = time.perf_counter() - start
+        await evict_urls(redis, [url.shortened_url for url in urls])
+        return {"deactivated": len(urls), "update_seconds": update_seconds, "seconds": time.perf_counter() - start}
+
+
+async def run(links: int, per_link_count: int) -> Dict[str, Any]:
+    redis = Redis.from_url(f"redis://{settings.redis_host}:{settings.redis_port}", decode_responses=True)
+    owner_id = await seed(links, redis)
+    codes = [campaign_code(index) for index in range(links)]
+    per_link_seconds = await per_link(codes[:per_link_count], owner_id, redis)
+    bulk_result = await bulk(codes[per_link_count:], owner_id, redis)
+    remaining = await redis.exists(*(url_cache_key(code) for code in codes[:1000]))
+    await redis.close()
+    await async_engine.dispose()
+    bulk_links = links - per_link_count
+    return {
+        "benchmark": "bulk_deactivate",
+        "links": links,
+        "per_link": {
+            "links": per_link_count,
+            "links_per_second": round(per_link_count / per_link_seconds, 1) if per_link_seconds else None,
+        },
+        "bulk": {
+            "links": bulk_links,
+            "deactivated": bulk_result["deactivated"],
+            "update_ms": round(bulk_result["update_seconds"] * 1000, 1),
+            "total_ms": round(bulk_result["seconds"] * 1000, 1),
+            "links_per_second": round(bulk_links / bulk_result["seconds"], 1) if bulk_result["seconds"] else None,
+        },
+        "cache_keys_left": remaining,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--links", type=int, default=100_000)
+    parser.add_argument("--per-link", type=int, default=1_000, help="Links retired one by one before the bulk call.")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.links, args.per_link)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Rows per second of the set-based `Objects` write methods against the per-object path.
+
+For `--rows` links owned by a benchmark user, times:
+
+- create: `Objects.create` once per row (INSERT, commit, refresh SELECT), against one
+  `Objects.create_many` call (multi-row INSERT ... RETURNING, one commit).
+- update: loading each row, setting it and committing, against one `Objects.update_where`.
+- delete: `session.delete` and commit per row, against one `Objects.delete_where`.
+
+The per-object path is timed on `--per-object-rows` rows (it is slow) and reported as rows per
+second, so both paths can be compared.
+
+    python -m src.benchmarks.bulk_writes --rows 10000
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, List
+from uuid import UUID
+
+from sqlalchemy import text
+
+from src.core.database import AsyncSessionLocal, async_engine
+from src.models import Url
+
+BENCHMARK_EMAIL = "bulk-writes-benchmark@example.com"
+
+
+async def benchmark_user() -> UUID:
+    async with async_engine.begin() as connection:
+        owner_id = (
+            await connection.execute(
+                text(
+                    'INSERT INTO "user" (email, password, is_active, is_superuser) VALUES (:email, \'\', true, false) '
+                    "ON CONFLICT (email) DO UPDATE SET email = EXCLUDED.email RETURNING id"
+                ),
+                {"email": BENCHMARK_EMAIL},
+            )
+        ).scalar_one()
+        await connection.execute(text("DELETE FROM url WHERE owner_id = :owner_id"), {"owner_id": owner_id})
+    return owner_id
+
+
+def url_rows(owner_id: UUID, prefix: str, count: int) -> List[Dict[str, Any]]:
+    return [
+        {"original_url": f"https://example.com/{index}", "shortened_url": f"{prefix}{index:07d}", "owner_id": owner_id}
+        for index in range(count)
+    ]
+
+
+def rate(rows: int, seconds: float) -> float:
+    return round(rows / seconds, 1) if seconds else 0.0
+
+
+async def per_object(owner_id: UUID, rows: int) -> Dict[str, float]:
+    codes = [row["shortened_url"] for row in url_rows(owner_id, "bo", rows)]
+    async with AsyncSessionLocal() as session:
+        start = time.perf_counter()
+        for row in url_rows(owner_id, "bo", rows):
+            await Url.objects(session).create(row)
+        create_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for code in codes:
+            url = await Url.objects(session).get(Url.shortened_url == code)
+            assert url is not None
+            url.is_active = False
+            await session.commit()
+        update_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for code in codes:
+            await session.delete(await Url.objects(session).get(Url.shortened_url == code))
+            await session.commit()
+        delete_seconds = time.perf_counter() - start
+    return {"create": rate(rows, create_seconds), "update": rate(rows, update_seconds), "delete": rate(rows, delete_seconds)}
+
+
+async def set_based(owner_id: UUID, rows: int) -> Dict[str, float]:
+    async with AsyncSessionLocal() as session:
+        start = time.perf_counter()
+        await Url.objects(session).create_many(url_rows(owner_id, "bs", rows))
+        create_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await Url.objects(session).update_where({"is_active": False}, Url.owner_id == owner_id)
+        update_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await Url.objects(session).delete_where(Url.owner_id == owner_id)
+        delete_seconds = time.perf_counter() - start
+    return {"create": rate(rows, create_seconds), "update": rate(rows, update_seconds), "delete": rate(rows, delete_seconds)}
+
+
+async def run(rows: int, per_object_rows: int) -> Dict[str, Any]:
+    owner_id = await benchmark_user()
+    per_object_rates = await per_object(owner_id, per_object_rows)
+    set_based_rates = await set_based(owner_id, rows)
+    await async_engine.dispose()
+    return {
+        "benchmark": "bulk_writes",
+        "rows": rows,
+        "per_object_rows": per_object_rows,
+        "rows_per_second": {"per_object": per_object_rates, "set_based": set_based_rates},
+        "speedup": {
+            operation: round(set_based_rates[operation] / per_object_rates[operation], 1) if per_object_rates[operation] else None
+            for operation in set_based_rates
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--per-object-rows", type=int, default=1_000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.rows, args.per_object_rows)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
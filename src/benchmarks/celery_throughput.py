@@ -0,0 +1,90 @@
+"""
+Throughput of the click pipeline on an in-memory broker.
+
+Publishes click messages the way the API does and drains them with `ClickBatcher`, for several
+serializers and batch sizes. A batch size of 1 is the per-message (one task, one transaction)
+baseline. By default the database write is stubbed out so the numbers isolate broker and
+serialization overhead; pass `--database` to apply the batches to the configured database.
+
+    python -m src.benchmarks.celery_throughput --messages 100000
+"""
+import argparse
+import json
+import random
+import time
+from typing import Any, Dict, List
+
+from kombu import Connection, Consumer
+
+from src.celery.consumer import ClickBatcher
+from src.celery.worker import CLICKS_QUEUE
+
+
+def run(messages: int, batch_size: int, serializer: str, codes: List[str], database: bool) -> Dict[str, Any]:
+    transactions = 0
+
+    def apply(counts: Dict[str, int]) -> None:
+        nonlocal transactions
+        transactions += 1
+        if database:
+            from src.celery.tasks import apply_click_counts
+
+            apply_click_counts(counts)
+
+    with Connection("memory://") as connection:
+        producer = connection.Producer(serializer=serializer)
+        start = time.perf_counter()
+        for _ in range(messages):
+            producer.publish(
+                {random.choice(codes): 1},
+                exchange=CLICKS_QUEUE.exchange,
+                routing_key=CLICKS_QUEUE.routing_key,
+                declare=[CLICKS_QUEUE],
+            )
+        publish_seconds = time.perf_counter() - start
+
+        batcher = ClickBatcher(apply, max_messages=batch_size)
+        consumed = 0
+
+        def on_message(body: Dict[str, int], message: Any) -> None:
+            nonlocal consumed
+            consumed += 1
+            batcher.add(body, message)
+
+        start = time.perf_counter()
+        with Consumer(connection, queues=[CLICKS_QUEUE], callbacks=[on_message], accept=[serializer]):
+            while consumed < messages:
+                connection.drain_events(timeout=1)
+        batcher.flush()
+        consume_seconds = time.perf_counter() - start
+
+    return {
+        "serializer": serializer,
+        "batch_size": batch_size,
+        "messages": messages,
+        "transactions": transactions,
+        "publish_per_second": round(messages / publish_seconds),
+        "consume_per_second": round(messages / consume_seconds),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--serializers", nargs="+", default=["json", "msgpack"])
+    parser.add_argument("--codes", type=int, default=10000, help="Number of distinct short codes clicked.")
+    parser.add_argument("--database", action="store_true", help="Apply batches to the configured database.")
+    args = parser.parse_args()
+
+    codes = [f"{index:07d}" for index in range(args.codes)]
+    results = [
+        run(args.messages, batch_size, serializer, codes, args.database)
+        for serializer in args.serializers
+        for batch_size in args.batch_sizes
+    ]
+    print(json.dumps({"benchmark": "celery_throughput", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Compares the redirect-only edge application (`src.edge`) with the full API (`src.main`).
+
+Reports, for each application, the cold-start time (median time to import it in a fresh
+interpreter), the number of modules it imports, and in-process redirect throughput over links
+seeded by `src.benchmarks.load`.
+
+    python -m src.benchmarks.load --seed-rows 100000 --scenarios redirect --duration 1
+    python -m src.benchmarks.edge --links 100000
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import time
+from typing import Any, Dict
+
+from httpx import AsyncClient
+
+from src.benchmarks.import_time import cold_start
+from src.benchmarks.load import API_PREFIX, ZipfSampler, seeded_code
+
+APPLICATIONS = {
+    "api": ("src.main", f"{API_PREFIX}/redirect/"),
+    "edge": ("src.edge", "/"),
+}
+
+
+async def throughput(module: str, prefix: str, links: int, concurrency: int, duration: float) -> Dict[str, Any]:
+    app = importlib.import_module(module).app
+    sampler = ZipfSampler(links, 1.1)
+    requests = errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(client: AsyncClient) -> None:
+        nonlocal requests, errors
+        while time.perf_counter() < deadline:
+            response = await client.get(f"{prefix}{seeded_code(sampler.sample())}", follow_redirects=False)
+            requests += 1
+            errors += response.status_code != 302
+
+    async with AsyncClient(app=app, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return {"requests": requests, "errors": errors, "throughput": round(requests / elapsed, 1)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--links", type=int, default=1_000_000, help="Number of links seeded by src.benchmarks.load.")
+    parser.add_argument("--cold-start-runs", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+
+    results = [
+        {"application": name, **cold_start(f"import {module}", args.cold_start_runs)}
+        for name, (module, _) in APPLICATIONS.items()
+    ]
+
+    async def measure_throughput() -> None:
+        # Both applications share the engine's pool, so they run on the same event loop.
+        for result, (module, prefix) in zip(results, APPLICATIONS.values()):
+            result.update(await throughput(module, prefix, args.links, args.concurrency, args.duration))
+
+    asyncio.run(measure_throughput())
+    print(json.dumps({"benchmark": "edge", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Expiry sweep on a large `url` table.
+
+Seeds `--rows` links (a `--expired-ratio` share of them already expired, the rest expiring in
+the future or never) into the configured database, then checks that the sweep statement walks
+the partial index on `expires_at` and times `deactivate_expired_urls`. The sweep time should
+track the number of expired rows, not the table size.
+
+    python -m src.benchmarks.expiry_sweep --rows 20000000 --expired-ratio 0.001
+"""
+import argparse
+import json
+import time
+from typing import Any, Dict
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from src.celery.tasks import deactivate_expired_urls, expired_urls_statement
+from src.celery.utils import get_engine
+
+BENCHMARK_EMAIL = "expiry-sweep-benchmark@example.com"
+SEED_CHUNK_SIZE = 1_000_000
+
+
+def seed(rows: int, expired_ratio: float) -> None:
+    with get_engine().begin() as connection:
+        owner_id = connection.execute(
+            text(
+                'INSERT INTO "user" (email, password, is_active, is_superuser) VALUES (:email, \'\', true, false) '
+                "ON CONFLICT (email) DO UPDATE SET email = EXCLUDED.email RETURNING id"
+            ),
+            {"email": BENCHMARK_EMAIL},
+        ).scalar_one()
+        connection.execute(text("DELETE FROM url WHERE owner_id = :owner_id"), {"owner_id": owner_id})
+    expired_every = max(1, round(1 / expired_ratio)) if expired_ratio else 0
+    for start in range(0, rows, SEED_CHUNK_SIZE):
+        with get_engine().begin() as connection:
+            connection.execute(
+                text(
+                    "INSERT INTO url (original_url, shortened_url, is_active, clicks, owner_id, expires_at) "
+                    "SELECT 'https://example.com/' || i, 'xs' || i, true, 0, :owner_id, "
+                    "CASE WHEN :expired_every > 0 AND i % :expired_every = 0 "
+                    "THEN TIMEZONE('utc', CURRENT_TIMESTAMP) - interval '1 hour' "
+                    "WHEN i % 2 = 0 THEN TIMEZONE('utc', CURRENT_TIMESTAMP) + interval '30 days' END "
+                    "FROM generate_series(:start, :stop) AS i"
+                ),
+                {
+                    "owner_id": owner_id,
+                    "expired_every": expired_every,
+                    "start": start,
+                    "stop": min(rows, start + SEED_CHUNK_SIZE) - 1,
+                },
+            )
+    with get_engine().connect() as connection:
+        connection.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM ANALYZE url"))
+
+
+def explain(batch_size: int) -> str:
+    statement = expired_urls_statement(batch_size).compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    )
+    with get_engine().connect() as connection:
+        plan = connection.execute(text(f"EXPLAIN {statement}")).scalars().all()
+    return "\n".join(plan)
+
+
+def run(rows: int, expired_ratio: float, batch_size: int, skip_seed: bool) -> Dict[str, Any]:
+    if not skip_seed:
+        start = time.perf_counter()
+        seed(rows, expired_ratio)
+        seed_seconds = round(time.perf_counter() - start, 3)
+    else:
+        seed_seconds = None
+    plan = explain(batch_size)
+    start = time.perf_counter()
+    deactivated = deactivate_expired_urls(batch_size)
+    sweep_seconds = time.perf_counter() - start
+    return {
+        "benchmark": "expiry_sweep",
+        "rows": rows,
+        "expired_ratio": expired_ratio,
+        "batch_size": batch_size,
+        "seed_seconds": seed_seconds,
+        "deactivated": deactivated,
+        "sweep_seconds": round(sweep_seconds, 3),
+        "deactivated_per_second": round(deactivated / sweep_seconds) if sweep_seconds else None,
+        "uses_expiry_index": "ix_url_expires_at_active" in plan,
+        "plan": plan,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--expired-ratio", type=float, default=0.001)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse the rows seeded by a previous run.")
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.expired_ratio, args.batch_size, args.skip_seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
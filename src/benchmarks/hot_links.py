@@ -0,0 +1,126 @@
+"""
+Hot-link snapshot against a per-process dict, for `--links` synthetic links.
+
+- lookup: median nanoseconds per hit over `--lookups` lookups, with `HotLinkSnapshot.get` and
+  with a dict of `CachedRedirect`s, the per-process alternative.
+- memory: `--processes` worker processes each load the links (mapping the snapshot and reading
+  every entry, or building the dict), and report how much their RSS and PSS grew. PSS splits
+  shared pages between the processes mapping them, so it shows what each worker really costs
+  the host. Needs Linux (`/proc/self/smaps_rollup`).
+
+    python -m src.benchmarks.hot_links --links 100000 --processes 8
+"""
+import argparse
+import json
+import multiprocessing
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from src.core.cache import CachedRedirect
+from src.core.hot_links import HotLinkSnapshot, write_snapshot
+
+ROUNDS = 5
+
+
+def link_code(index: int) -> str:
+    return f"hl{index:08d}"
+
+
+def redirects(links: int) -> Dict[str, CachedRedirect]:
+    return {
+        link_code(index): CachedRedirect(f"https://example.com/campaign/{index}?utm_source=benchmark") for index in range(links)
+    }
+
+
+def memory_kb() -> Dict[str, int]:
+    usage = {}
+    with open("/proc/self/smaps_rollup") as smaps:
+        for line in smaps:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss"):
+                usage[key.lower()] = int(value.split()[0])
+    return usage
+
+
+def lookup_ns(get: Any, codes: List[str]) -> float:
+    rounds = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter_ns()
+        for code in codes:
+            get(code)
+        rounds.append((time.perf_counter_ns() - start) / len(codes))
+    return round(statistics.median(rounds), 1)
+
+
+def worker(kind: str, path: str, links: int, ready: Any, done: Any, results: Any) -> None:
+    before = memory_kb()
+    if kind == "snapshot":
+        snapshot = HotLinkSnapshot(Path(path), max_age=3600)
+        found = sum(snapshot.get(link_code(index)) is not None for index in range(links))
+    else:
+        cache = redirects(links)
+        found = len(cache)
+    ready.wait()
+    after = memory_kb()
+    results.put({"found": found, "rss_kb": after["rss"] - before["rss"], "pss_kb": after["pss"] - before["pss"]})
+    done.wait()
+
+
+def per_process_memory(kind: str, path: Path, links: int, processes: int) -> Dict[str, Any]:
+    context = multiprocessing.get_context("spawn")
+    # Every worker measures once they have all loaded the links, so shared pages are shared.
+    ready, done, results = context.Barrier(processes), context.Event(), context.Queue()
+    workers = [
+        context.Process(target=worker, args=(kind, str(path), links, ready, done, results)) for _ in range(processes)
+    ]
+    for process in workers:
+        process.start()
+    usages = [results.get() for _ in workers]
+    done.set()
+    for process in workers:
+        process.join()
+    return {
+        "found": usages[0]["found"],
+        "rss_mb": round(statistics.mean(usage["rss_kb"] for usage in usages) / 1024, 1),
+        "pss_mb": round(statistics.mean(usage["pss_kb"] for usage in usages) / 1024, 1),
+    }
+
+
+def run(links: int, lookups: int, processes: int) -> Dict[str, Any]:
+    links_redirects = redirects(links)
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "hot-links"
+        start = time.perf_counter()
+        write_snapshot(path, links_redirects)
+        build_seconds = time.perf_counter() - start
+        codes = random.choices(list(links_redirects), k=lookups)
+        snapshot = HotLinkSnapshot(path, max_age=3600)
+        lookup = {"snapshot": lookup_ns(snapshot.get, codes), "dict": lookup_ns(links_redirects.get, codes)}
+        snapshot.close()
+        memory = {kind: per_process_memory(kind, path, links, processes) for kind in ("snapshot", "dict")}
+        return {
+            "benchmark": "hot_links",
+            "links": links,
+            "processes": processes,
+            "snapshot_mb": round(path.stat().st_size / 1024 / 1024, 1),
+            "build_ms": round(build_seconds * 1000, 1),
+            "lookup_ns": lookup,
+            "per_process_memory": memory,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--links", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args()
+    print(json.dumps(run(args.links, args.lookups, args.processes), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Cold-start benchmark: time to import each entry point in a fresh interpreter.
+
+For the API (`src.main`), the edge application (`src.edge`) and the Celery worker (the app plus
+the task modules it loads on start), reports the median import time over `--runs` runs, the
+number of modules loaded, and the top-level packages costing the most (from `-X importtime`).
+Startup time bounds how fast new instances can take traffic when autoscaling.
+
+    python -m src.benchmarks.import_time --runs 10
+"""
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Any, Dict, List
+
+ENTRY_POINTS = {
+    "api": "import src.main",
+    "edge": "import src.edge",
+    "worker": "import src.celery.worker; src.celery.worker.celery.loader.import_default_modules()",
+}
+
+TIMED_IMPORT = """
+import sys, time
+start = time.perf_counter()
+{statement}
+print(time.perf_counter() - start, len(sys.modules))
+"""
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)")
+
+
+def cold_start(statement: str, runs: int) -> Dict[str, Any]:
+    seconds: List[float] = []
+    modules = 0
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", TIMED_IMPORT.format(statement=statement)], capture_output=True, text=True, check=True
+        ).stdout.split()
+        seconds.append(float(output[0]))
+        modules = int(output[1])
+    return {"cold_start_ms": round(statistics.median(seconds) * 1000, 1), "modules": modules}
+
+
+def heaviest_packages(statement: str, top: int) -> Dict[str, float]:
+    """Self import time of every module, summed by top-level package, in milliseconds."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement], capture_output=True, text=True, check=True
+    ).stderr
+    packages: Dict[str, float] = defaultdict(float)
+    for match in IMPORTTIME_LINE.finditer(stderr):
+        packages[match.group(4).split(".")[0]] += int(match.group(1)) / 1000
+    heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {package: round(milliseconds, 1) for package, milliseconds in heaviest}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10, help="Number of heaviest packages to report.")
+    parser.add_argument("--entry-points", nargs="+", choices=list(ENTRY_POINTS), default=list(ENTRY_POINTS))
+    args = parser.parse_args()
+
+    results = []
+    for name in args.entry_points:
+        statement = ENTRY_POINTS[name]
+        results.append({
+            "entry_point": name,
+            **cold_start(statement, args.runs),
+            "heaviest_packages_ms": heaviest_packages(statement, args.top),
+        })
+    print(json.dumps({"benchmark": "import_time", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+End-to-end load test of the service.
+
+Seeds `--seed-rows` links for a benchmark user, then runs each scenario for `--duration` seconds
+with `--concurrency` concurrent clients and prints a machine-readable JSON report (also written
+to `--output`), so runs can be compared over time:
+
+- redirect: Zipf-distributed redirects over the seeded links, so a few links are very hot.
+- mixed: authenticated create / list / retrieve / delete traffic.
+- login: bursts of concurrent logins.
+
+By default requests go to the application in-process, and database queries per request are
+counted from the engine. With `--base-url` they go to a running server instead, and database
+queries are not reported. Redis commands per request come from `INFO commandstats`, so the
+Redis instance should not serve other traffic during the run.
+
+    python -m src.benchmarks.load --seed-rows 1000000 --duration 30 --concurrency 50
+"""
+import argparse
+import asyncio
+import bisect
+import itertools
+import json
+import random
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+
+from httpx import AsyncClient
+from redis.asyncio import Redis
+from sqlalchemy import event, text
+
+from src.core.config import settings
+from src.core.database import async_engine
+from src.core.security import PasswordManager
+
+BENCHMARK_EMAIL = "load-benchmark@example.com"
+BENCHMARK_PASSWORD = "load-benchmark"
+SEED_CHUNK_SIZE = 500_000
+API_PREFIX = "/api/v1"
+
+
+def seeded_code(index: int) -> str:
+    return f"lb{index:08d}"
+
+
+class ZipfSampler:
+    """Samples indexes in [0, size) with probability proportional to 1 / (rank + 1) ** exponent."""
+
+    def __init__(self, size: int, exponent: float) -> None:
+        self.cumulative_weights = list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(size)))
+        self.total = self.cumulative_weights[-1]
+
+    def sample(self) -> int:
+        return bisect.bisect_left(self.cumulative_weights, random.random() * self.total)
+
+
+class QueryCounter:
+    """Counts the statements the in-process application sends to the database."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self.on_execute)
+
+    def on_execute(self, *args: Any) -> None:
+        self.count += 1
+
+
+async def seed(rows: int) -> None:
+    password = PasswordManager.get_password_hash(BENCHMARK_PASSWORD)
+    async with async_engine.begin() as connection:
+        owner_id = (
+            await connection.execute(
+                text(
+                    'INSERT INTO "user" (email, password, is_active, is_superuser) VALUES (:email, :password, true, false) '
+                    "ON CONFLICT (email) DO UPDATE SET password = EXCLUDED.password RETURNING id"
+                ),
+                {"email": BENCHMARK_EMAIL, "password": password},
+            )
+        ).scalar_one()
+        await connection.execute(text("DELETE FROM url WHERE owner_id = :owner_id"), {"owner_id": owner_id})
+    for start in range(0, rows, SEED_CHUNK_SIZE):
+        async with async_engine.begin() as connection:
+            await connection.execute(
+                text(
+                    "INSERT INTO url (original_url, shortened_url, is_active, clicks, owner_id) "
+                    "SELECT 'https://example.com/' || i, 'lb' || lpad(i::text, 8, '0'), true, 0, :owner_id "
+                    "FROM generate_series(CAST(:start AS integer), CAST(:stop AS integer)) AS i"
+                ),
+                {"owner_id": owner_id, "start": start, "stop": min(rows, start + SEED_CHUNK_SIZE) - 1},
+            )
+    async with async_engine.connect() as connection:
+        await connection.execution_options(isolation_level="AUTOCOMMIT")
+        await connection.execute(text("ANALYZE url"))
+
+
+async def redis_commands(redis: Redis) -> int:
+    stats = await redis.info("commandstats")
+    return sum(command["calls"] for name, command in stats.items() if name != "cmdstat_info")
+
+
+async def login(client: AsyncClient) -> None:
+    response = await client.post(f"{API_PREFIX}/users/login", json={"email": BENCHMARK_EMAIL, "password": BENCHMARK_PASSWORD})
+    response.raise_for_status()
+    client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+
+
+def redirect_scenario(sampler: ZipfSampler) -> Callable[[AsyncClient], Awaitable[int]]:
+    async def request(client: AsyncClient) -> int:
+        response = await client.get(f"{API_PREFIX}/redirect/{seeded_code(sampler.sample())}", follow_redirects=False)
+        return response.status_code
+
+    return request
+
+
+def mixed_scenario() -> Callable[[AsyncClient], Awaitable[int]]:
+    created: List[str] = []
+
+    async def create(client: AsyncClient) -> int:
+        response = await client.post(f"{API_PREFIX}/urls", json={"original_url": f"https://example.com/{random.random()}"})
+        if response.status_code == 201:
+            created.append(response.json()["shortened_url"])
+        return response.status_code
+
+    async def list_(client: AsyncClient) -> int:
+        return (await client.get(f"{API_PREFIX}/urls", params={"size": 50})).status_code
+
+    async def retrieve(client: AsyncClient) -> int:
+        if not created:
+            return await create(client)
+        return (await client.get(f"{API_PREFIX}/urls/{random.choice(created)}")).status_code
+
+    async def delete(client: AsyncClient) -> int:
+        if not created:
+            return await create(client)
+        return (await client.delete(f"{API_PREFIX}/urls/{created.pop()}")).status_code
+
+    operations = [create, list_, retrieve, delete]
+    weights = [4, 3, 2, 1]
+
+    async def request(client: AsyncClient) -> int:
+        return await random.choices(operations, weights)[0](client)
+
+    return request
+
+
+def login_scenario() -> Callable[[AsyncClient], Awaitable[int]]:
+    async def request(client: AsyncClient) -> int:
+        response = await client.post(f"{API_PREFIX}/users/login", json={"email": BENCHMARK_EMAIL, "password": BENCHMARK_PASSWORD})
+        return response.status_code
+
+    return request
+
+
+async def run_scenario(
+    name: str,
+    request: Callable[[AsyncClient], Awaitable[int]],
+    clients: List[AsyncClient],
+    duration: float,
+    redis: Redis,
+    query_counter: QueryCounter | None,
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(client: AsyncClient) -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                status_code = await request(client)
+            except Exception:
+                status_code = 599
+            latencies.append(time.perf_counter() - start)
+            if status_code >= 400:
+                errors += 1
+
+    queries_before = query_counter.count if query_counter else 0
+    redis_before = await redis_commands(redis)
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(client) for client in clients))
+    elapsed = time.perf_counter() - start
+    redis_after = await redis_commands(redis)
+
+    requests = len(latencies)
+    percentiles = statistics.quantiles(latencies, n=100) if requests > 1 else [0.0] * 99
+    return {
+        "scenario": name,
+        "requests": requests,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput": round(requests / elapsed, 1),
+        "latency_ms": {
+            "p50": round(percentiles[49] * 1000, 2),
+            "p95": round(percentiles[94] * 1000, 2),
+            "p99": round(percentiles[98] * 1000, 2),
+        },
+        "db_queries_per_request": (
+            round((query_counter.count - queries_before) / requests, 3) if query_counter and requests else None
+        ),
+        # Subtract the INFO call that closes the measurement.
+        "redis_commands_per_request": round((redis_after - redis_before - 1) / requests, 3) if requests else None,
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.seed_rows:
+        await seed(args.seed_rows)
+    query_counter = None
+    if args.base_url:
+        client_options: Dict[str, Any] = {"base_url": args.base_url}
+    else:
+        from src.main import app
+
+        client_options = {"app": app, "base_url": "http://bench"}
+        query_counter = QueryCounter()
+
+    scenarios: Dict[str, Callable[[AsyncClient], Awaitable[int]]] = {
+        "redirect": redirect_scenario(ZipfSampler(args.seed_rows or args.links, args.zipf_exponent)),
+        "mixed": mixed_scenario(),
+        "login": login_scenario(),
+    }
+    redis = Redis.from_url(f"redis://{settings.redis_host}:{settings.redis_port}", decode_responses=True)
+    clients = [AsyncClient(timeout=30, **client_options) for _ in range(args.concurrency)]
+    results = []
+    try:
+        await asyncio.gather(*(login(client) for client in clients))
+        for name in args.scenarios:
+            results.append(await run_scenario(name, scenarios[name], clients, args.duration, redis, query_counter))
+    finally:
+        await asyncio.gather(*(client.aclose() for client in clients))
+        await redis.close()
+    return {
+        "benchmark": "load",
+        "target": args.base_url or "in-process",
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "links": args.seed_rows or args.links,
+        "zipf_exponent": args.zipf_exponent,
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed-rows", type=int, default=0, help="Links to seed before running. 0 reuses a previous seed.")
+    parser.add_argument("--links", type=int, default=1_000_000, help="Number of links seeded by a previous run.")
+    parser.add_argument("--zipf-exponent", type=float, default=1.1)
+    parser.add_argument("--scenarios", nargs="+", choices=["redirect", "mixed", "login"], default=["redirect", "mixed", "login"])
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--base-url", help="Benchmark a running server instead of the in-process application.")
+    parser.add_argument("--output", type=Path, help="Also write the JSON report to this file.")
+    args = parser.parse_args()
+
+    report = json.dumps(asyncio.run(run(args)), indent=2)
+    if args.output:
+        args.output.write_text(report)
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark of the CPU cost of logging on the redirect path.
+
+Replays the records the redirect endpoint logs on a cache hit, with the previous setup (eager
+f-strings, stream handler called synchronously) and with the current one (lazy formatting, queue
+handler drained by a listener thread) at several sample rates. CPU time is process-wide, so it
+includes the listener thread's formatting and writes.
+
+    python -m src.benchmarks.request_logging --number 100000
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from logging.config import dictConfig
+from typing import Any, Callable, Dict, List
+
+from src.logging import LogConfig, SampledLogger, start_log_listener
+
+ORIGINAL_URL = "https://example.com/some/long/path?utm_source=benchmark"
+SHORTENED_URL = "aZ3kQ9x"
+
+
+def log_eagerly(logger: Any) -> None:
+    logger.info(f"Retrieving original URL for shortened URL '{SHORTENED_URL}' from Redis cache.")
+    logger.info(f"Found original URL '{ORIGINAL_URL}' for shortened URL '{SHORTENED_URL}' in Redis cache.")
+
+
+def log_lazily(logger: Any) -> None:
+    logger.info("Retrieving original URL for shortened URL '%s' from Redis cache.", SHORTENED_URL)
+    logger.info("Found original URL '%s' for shortened URL '%s' in Redis cache.", ORIGINAL_URL, SHORTENED_URL)
+
+
+def configure(stream: Any) -> None:
+    config = LogConfig().dict()
+    config["handlers"]["default"]["stream"] = stream
+    config["loggers"]["root"]["level"] = "INFO"
+    dictConfig(config)
+
+
+def measure(name: str, log: Callable[[Any], None], number: int, queued: bool, sample_rate: float) -> Dict[str, Any]:
+    with open(os.devnull, "w") as stream:
+        configure(stream)
+        logger: Any = logging.getLogger("src.core.redirects")
+        if queued:
+            logger = SampledLogger(logger, sample_rate)
+        listener = start_log_listener() if queued else None
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        for _ in range(number):
+            log(logger)
+        # Request time is what the caller waits for; the listener keeps writing in the background.
+        request_seconds = time.perf_counter() - wall_start
+        if listener:
+            listener.stop()
+        cpu_seconds = time.process_time() - cpu_start
+    return {
+        "name": name,
+        "sample_rate": sample_rate,
+        "redirects": number,
+        "cpu_us_per_redirect": round(cpu_seconds / number * 1e6, 2),
+        "request_us_per_redirect": round(request_seconds / number * 1e6, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=100_000, help="Redirects logged per measurement.")
+    parser.add_argument("--sample-rates", type=float, nargs="+", default=[1.0, 0.1, 0.01])
+    args = parser.parse_args()
+
+    results: List[Dict[str, Any]] = [measure("eager_sync", log_eagerly, args.number, queued=False, sample_rate=1.0)]
+    for sample_rate in args.sample_rates:
+        results.append(measure("lazy_queued", log_lazily, args.number, queued=True, sample_rate=sample_rate))
+    print(json.dumps({"benchmark": "request_logging", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
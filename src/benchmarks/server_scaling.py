@@ -0,0 +1,112 @@
+"""
+Benchmark of the production server's scaling across cores.
+
+Starts the gunicorn server (`src/gunicorn_conf.py`) with each of `--workers` worker counts, drives
+Zipf-distributed redirects over links seeded by `src.benchmarks.load` from `--client-processes`
+load generator processes, and prints throughput, latency and speedup over the first worker count
+as JSON. Give the load generators their own cores, or they become the bottleneck.
+
+    python -m src.benchmarks.load --seed-rows 100000 --scenarios redirect --duration 1
+    python -m src.benchmarks.server_scaling --links 100000 --workers 1 2 4 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+from httpx import AsyncClient
+
+from src.benchmarks.load import API_PREFIX, ZipfSampler, seeded_code
+
+
+def wait_for_port(port: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise TimeoutError(f"The server did not listen on port {port} within {timeout}s.")
+
+
+async def drive(base_url: str, links: int, zipf_exponent: float, concurrency: int, duration: float) -> List[float]:
+    sampler = ZipfSampler(links, zipf_exponent)
+    latencies: List[float] = []
+    deadline = time.perf_counter() + duration
+
+    async def worker(client: AsyncClient) -> None:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await client.get(f"{API_PREFIX}/redirect/{seeded_code(sampler.sample())}", follow_redirects=False)
+            if response.status_code == 302:
+                latencies.append(time.perf_counter() - start)
+
+    async with AsyncClient(base_url=base_url, timeout=30) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return latencies
+
+
+def drive_process(*args: Any) -> List[float]:
+    return asyncio.run(drive(*args))
+
+
+def measure(workers: int, args: argparse.Namespace) -> Dict[str, Any]:
+    env = {**os.environ, "SERVER_WORKERS": str(workers), "SERVER_PORT": str(args.port), "LOG_REQUEST_SAMPLE_RATE": "0"}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "python:src.gunicorn_conf", "src.main:app"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(args.port, timeout=60)
+        base_url = f"http://127.0.0.1:{args.port}"
+        # Warm up every worker's connection pools before measuring.
+        asyncio.run(drive(base_url, args.links, args.zipf_exponent, args.concurrency, 2))
+        with ProcessPoolExecutor(args.client_processes) as executor:
+            futures = [
+                executor.submit(drive_process, base_url, args.links, args.zipf_exponent, args.concurrency, args.duration)
+                for _ in range(args.client_processes)
+            ]
+            latencies = [latency for future in futures for latency in future.result()]
+    finally:
+        server.terminate()
+        server.wait()
+    percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "throughput": round(len(latencies) / args.duration, 1),
+        "latency_ms": {
+            "p50": round(percentiles[49] * 1000, 2),
+            "p99": round(percentiles[98] * 1000, 2),
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--links", type=int, default=1_000_000, help="Number of links seeded by src.benchmarks.load.")
+    parser.add_argument("--zipf-exponent", type=float, default=1.1)
+    parser.add_argument("--client-processes", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent requests per load generator process.")
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+
+    results = [measure(workers, args) for workers in args.workers]
+    for result in results:
+        result["speedup"] = round(result["throughput"] / results[0]["throughput"], 2) if results[0]["throughput"] else None
+    print(json.dumps({"benchmark": "server_scaling", "cores": len(os.sched_getaffinity(0)), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
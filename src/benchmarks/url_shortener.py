@@ -0,0 +1,67 @@
+"""
+Micro-benchmarks for the short-code generation hot path in `src.core.url_shortener`.
+
+Compares the reference implementation (full hexdigest, full Base62 encoding, then truncation)
+with the prefix-only path used by `generate_unique_shortened_url`, for single codes and for
+bulk generation.
+
+    python -m src.benchmarks.url_shortener --number 100000
+"""
+import argparse
+import json
+import timeit
+from typing import Any, Callable, Dict, List
+
+from src.core.url_shortener import (
+    ALLOWED_CHARACTERS,
+    ALLOWED_URL_LENGTH,
+    create_hashed_url_variant,
+    create_shortened_url_variant,
+    create_shortened_url_variants,
+)
+
+
+def measure(name: str, function: Callable[[], Any], number: int, codes_per_call: int, repeat: int) -> Dict[str, Any]:
+    best = min(timeit.repeat(function, number=number, repeat=repeat))
+    codes = number * codes_per_call
+    return {
+        "name": name,
+        "codes": codes,
+        "ns_per_code": round(best / codes * 1e9, 1),
+        "codes_per_second": round(codes / best),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=100_000, help="Codes generated per measurement.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--length", type=int, default=ALLOWED_URL_LENGTH)
+    args = parser.parse_args()
+
+    urls: List[str] = [f"https://example.com/campaign/{index}" for index in range(1000)]
+    length = args.length
+    batches = max(1, args.number // len(urls))
+
+    results = [
+        measure(
+            "reference",
+            lambda: [create_hashed_url_variant(url, 0, ALLOWED_CHARACTERS)[:length] for url in urls],
+            batches, len(urls), args.repeat,
+        ),
+        measure(
+            "prefix_only",
+            lambda: [create_shortened_url_variant(url, 0, length) for url in urls],
+            batches, len(urls), args.repeat,
+        ),
+        measure(
+            "prefix_only_batch",
+            lambda: create_shortened_url_variants(urls, 0, length),
+            batches, len(urls), args.repeat,
+        ),
+    ]
+    print(json.dumps({"benchmark": "url_shortener", "length": length, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Count clicks from CDN access logs and publish them to the click pipeline.
+
+With `CLICK_SOURCE=cdn`, redirects served by the application do not count clicks: browsers and
+CDNs may serve permanent redirects from their caches, so only the CDN sees every click. Feed its
+access logs (combined log format by default) to this command, e.g. from a log shipper:
+
+    python -m src.celery.cdn_logs /var/log/cdn/access.log
+    zcat access.log.gz | python -m src.celery.cdn_logs -
+"""
+import argparse
+import fileinput
+import re
+from collections import Counter
+from typing import Iterable, Pattern
+
+from src.celery.tasks import publish_click_counts
+
+ACCESS_LOG_PATTERN = re.compile(r'"GET (?P<path>\S+) HTTP/[\d.]+" (?P<status>\d{3}) ')
+# Redirects of the API and of the edge application.
+REDIRECT_PATH_PATTERN = re.compile(r"^(?:/api/v1/redirect)?/(?P<shortened_url>[A-Za-z0-9]+)(?:\?|$)")
+REDIRECT_STATUSES = {"301", "302", "308"}
+
+
+def count_clicks(lines: Iterable[str], pattern: Pattern[str] = ACCESS_LOG_PATTERN) -> Counter:
+    """Count the redirects in access log lines, by short code."""
+    counts: Counter = Counter()
+    for line in lines:
+        match = pattern.search(line)
+        if match is None or match.group("status") not in REDIRECT_STATUSES:
+            continue
+        path = REDIRECT_PATH_PATTERN.match(match.group("path"))
+        if path is not None:
+            counts[path.group("shortened_url")] += 1
+    return counts
+
+
+def access_log_pattern(pattern: str) -> Pattern[str]:
+    return re.compile(pattern)
+
+
+def publish_clicks(lines: Iterable[str], pattern: Pattern[str]) -> None:
+    counts = count_clicks(lines, pattern)
+    if counts:
+        publish_click_counts(dict(counts))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", default=["-"], help="Access log files, or - for standard input.")
+    parser.add_argument(
+        "--pattern",
+        type=access_log_pattern,
+        default=ACCESS_LOG_PATTERN,
+        help="Regular expression with `path` and `status` groups.",
+    )
+    parser.add_argument("--batch-lines", type=int, default=100_000, help="Lines aggregated into each published batch.")
+    args = parser.parse_args()
+
+    batch = []
+    with fileinput.input(args.files) as lines:
+        for line in lines:
+            batch.append(line)
+            if len(batch) >= args.batch_lines:
+                publish_clicks(batch, args.pattern)
+                batch.clear()
+    publish_clicks(batch, args.pattern)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from typing import Callable, Dict
+
+from src.celery.journal import ClickJournal
+from src.core.config import ClickOverflowPolicy, settings
+from src.core.metrics import CLICK_PUBLISH_LATENCY
+
+logger = logging.getLogger(__name__)
+
+RETRY_BACKOFF_SECONDS = 0.1
+
+
+def publish_click_counts(counts: Dict[str, int]) -> None:
+    # Imported on the first publish, from the publisher thread, to keep the Celery app and kombu
+    # off the startup path of the API.
+    from src.celery.tasks import publish_click_counts
+
+    publish_click_counts(counts)
+
+
+class ClickEventQueue:
+    """
+    In-process bounded queue of click events, published to the broker by a background sender.
+
+    `put` never blocks and never raises: the redirect response does not wait on the broker.
+    The sender aggregates up to `batch_size` clicks (or whatever arrived within `batch_interval`)
+    into a single message, and publishes it from a dedicated thread with retries, so a slow or
+    unreachable broker never stalls the event loop. `publish` must bound its own wait on the
+    broker: a publish is never abandoned for a new attempt, since the abandoned one could still
+    reach the broker and the batch would be counted twice. Clicks that do not fit in the queue,
+    or that could not be published after all retries, are handled by the overflow policy: dropped,
+    or spilled to the local click journal from another thread. Journaled clicks are replayed into
+    the click pipeline as soon as a publish succeeds again.
+    """
+
+    def __init__(
+        self,
+        publish: Callable[[Dict[str, int]], None],
+        max_size: int,
+        batch_size: int,
+        batch_interval: float,
+        publish_retries: int,
+        overflow_policy: ClickOverflowPolicy,
+        journal: ClickJournal,
+    ) -> None:
+        self._publish = publish
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.publish_retries = publish_retries
+        self.overflow_policy = overflow_policy
+        self.journal = journal
+        self.dropped = 0
+        self.spilled = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="click-publisher")
+        self._journal_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="click-journal")
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue[str] = asyncio.Queue(maxsize=max_size)
+        self._sender: asyncio.Task | None = None
+        self._in_flight: Counter = Counter()
+        self._publishing: asyncio.Future | None = None
+        self._unspilled: Counter = Counter()
+        self._spiller: asyncio.Task | None = None
+
+    @classmethod
+    def from_settings(cls) -> "ClickEventQueue":
+        return cls(
+            publish=publish_click_counts,
+            max_size=settings.click_queue_max_size,
+            batch_size=settings.click_batch_size,
+            batch_interval=settings.click_batch_interval,
+            publish_retries=settings.click_publish_retries,
+            overflow_policy=settings.click_overflow_policy,
+            journal=ClickJournal(
+                directory=settings.click_journal_dir,
+                segment_size=settings.click_journal_segment_size,
+                max_segments=settings.click_journal_max_segments,
+                fsync_every=settings.click_journal_fsync_every,
+                fsync_interval=settings.click_journal_fsync_interval,
+            ),
+        )
+
+    def put(self, shortened_url: str) -> None:
+        """Record a click without waiting. Must be called from the event loop."""
+        self._ensure_sender()
+        try:
+            self._queue.put_nowait(shortened_url)
+        except asyncio.QueueFull:
+            self._overflow(Counter({shortened_url: 1}))
+
+    async def close(self) -> None:
+        """Stop the sender and make a last attempt to publish the clicks still queued."""
+        if self._sender is not None:
+            self._sender.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._sender
+            self._sender = None
+        publishing, self._publishing = self._publishing, None
+        if publishing is not None:
+            # The sender was cancelled while publishing its batch: the batch is sent again only if
+            # that publish failed.
+            with suppress(Exception):
+                await publishing
+                self._in_flight = Counter()
+        counts = self._in_flight + self._drain()
+        self._in_flight = Counter()
+        if counts:
+            await self._send(counts)
+        if self._spiller is not None:
+            await self._spiller
+            self._spiller = None
+        self.journal.close()
+
+    def _ensure_sender(self) -> None:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # The queue and the sender task are bound to the loop they were created on.
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+            self._sender = None
+            self._spiller = None
+        if self._sender is None or self._sender.done():
+            self._sender = loop.create_task(self._run())
+
+    def _drain(self) -> Counter:
+        counts: Counter = Counter()
+        while True:
+            try:
+                counts[self._queue.get_nowait()] += 1
+            except asyncio.QueueEmpty:
+                break
+        return counts
+
+    async def _run(self) -> None:
+        while True:
+            await self._next_batch()
+            published = await self._send(self._in_flight)
+            self._in_flight = Counter()
+            if published and self.journal.pending:
+                await self._replay()
+
+    async def _next_batch(self) -> None:
+        """
+        Collect the next batch into `_in_flight` as the clicks are dequeued, so `close` still
+        publishes them if the sender is cancelled halfway through.
+        """
+        loop = asyncio.get_running_loop()
+        self._in_flight[await self._queue.get()] += 1
+        size = 1
+        deadline = loop.time() + self.batch_interval
+        while size < self.batch_size:
+            try:
+                shortened_url = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    shortened_url = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            self._in_flight[shortened_url] += 1
+            size += 1
+
+    async def _send(self, counts: Counter) -> bool:
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.publish_retries + 1):
+            start = time.perf_counter()
+            self._publishing = loop.run_in_executor(self._executor, self._publish, dict(counts))
+            try:
+                # Shielded: cancelling the sender must not abandon the publish either.
+                await asyncio.shield(self._publishing)
+                self._publishing = None
+                CLICK_PUBLISH_LATENCY.observe(time.perf_counter() - start)
+                return True
+            except Exception:
+                self._publishing = None
+                logger.warning("Publishing %d clicks failed (attempt %d).", sum(counts.values()), attempt + 1, exc_info=True)
+                await asyncio.sleep(RETRY_BACKOFF_SECONDS * 2**attempt)
+        self._overflow(counts)
+        return False
+
+    async def _replay(self) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            replayed = await loop.run_in_executor(self._executor, self.journal.replay, self._publish)
+        except Exception:
+            logger.warning("Replaying journaled clicks failed.", exc_info=True)
+        else:
+            if replayed:
+                logger.info("Replayed %d journaled clicks.", replayed)
+
+    def _overflow(self, counts: Counter) -> None:
+        if self.overflow_policy == ClickOverflowPolicy.spill:
+            # Journaled by the spiller, so the event loop never waits on the disk.
+            self._unspilled += counts
+            if self._spiller is None or self._spiller.done():
+                self._spiller = asyncio.get_running_loop().create_task(self._spill())
+        else:
+            self._drop(sum(counts.values()))
+
+    async def _spill(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._unspilled:
+            counts, self._unspilled = self._unspilled, Counter()
+            clicks = sum(counts.values())
+            try:
+                await loop.run_in_executor(self._journal_executor, self.journal.append, dict(counts))
+                self.spilled += clicks
+            except (OSError, ValueError):
+                logger.exception("Spilling %d clicks to the journal failed.", clicks)
+                self._drop(clicks)
+
+    def _drop(self, clicks: int) -> None:
+        self.dropped += clicks
+        logger.warning("Dropped %d clicks.", clicks)
+
+
+click_queue = ClickEventQueue.from_settings()
@@ -0,0 +1,82 @@
+import logging
+from collections import Counter
+from typing import Any, Callable, Dict, List
+
+from celery import bootsteps
+from kombu import Consumer
+from kombu.message import Message
+
+from src.celery.tasks import apply_click_counts
+from src.celery.worker import CLICKS_QUEUE, celery
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ClickBatcher:
+    """
+    Buffers click messages and applies them in a single transaction.
+
+    Messages are acknowledged only after the transaction commits (late acks), and requeued if it
+    fails, so a worker crash never loses clicks.
+    """
+
+    def __init__(self, apply: Callable[[Dict[str, int]], Any], max_messages: int) -> None:
+        self.apply = apply
+        self.max_messages = max_messages
+        self.messages: List[Message] = []
+        self.counts: Counter = Counter()
+
+    def add(self, body: Dict[str, int], message: Message) -> None:
+        self.counts.update(body)
+        self.messages.append(message)
+        if len(self.messages) >= self.max_messages:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.messages:
+            return
+        messages, counts = self.messages, self.counts
+        self.messages, self.counts = [], Counter()
+        try:
+            self.apply(dict(counts))
+        except Exception:
+            logger.exception("Applying %d click messages failed, requeueing them.", len(messages))
+            for message in messages:
+                message.requeue()
+            return
+        for message in messages:
+            message.ack()
+
+
+class ClickBatchConsumer(bootsteps.ConsumerStep):
+    """Worker bootstep draining the clicks queue in batches of up to `click_consumer_batch_size` messages."""
+
+    def __init__(self, parent: Any, **kwargs: Any) -> None:
+        super().__init__(parent, **kwargs)
+        self.batcher = ClickBatcher(apply_click_counts, settings.click_consumer_batch_size)
+        self.flush_timer: Any = None
+
+    def get_consumers(self, channel: Any) -> List[Consumer]:
+        return [
+            Consumer(
+                channel,
+                queues=[CLICKS_QUEUE],
+                callbacks=[self.batcher.add],
+                accept=[settings.celery_serializer, "json"],
+                prefetch_count=settings.click_consumer_batch_size,
+            )
+        ]
+
+    def start(self, c: Any) -> None:
+        super().start(c)
+        self.flush_timer = c.timer.call_repeatedly(settings.click_consumer_flush_interval, self.batcher.flush)
+
+    def stop(self, c: Any) -> None:
+        if self.flush_timer is not None:
+            self.flush_timer.cancel()
+        self.batcher.flush()
+        super().stop(c)
+
+
+celery.steps["consumer"].add(ClickBatchConsumer)
@@ -0,0 +1,196 @@
+import fcntl
+import json
+import logging
+import mmap
+import os
+import shutil
+import struct
+import threading
+import time
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+# Every record is a little-endian (payload length, crc32 of payload) header followed by the payload.
+RECORD_HEADER = struct.Struct("<II")
+SEGMENT_GLOB = "*.seg"
+LOCK_FILE_NAME = ".lock"
+
+
+def read_records(segment: Path) -> Iterator[Dict[str, int]]:
+    """Yield the click counts stored in a segment, stopping at the first empty or torn record."""
+    try:
+        data = segment.read_bytes()
+    except FileNotFoundError:
+        return
+    offset = 0
+    while offset + RECORD_HEADER.size <= len(data):
+        length, checksum = RECORD_HEADER.unpack_from(data, offset)
+        payload = data[offset + RECORD_HEADER.size:offset + RECORD_HEADER.size + length]
+        if length == 0 or len(payload) != length or zlib.crc32(payload) != checksum:
+            return
+        yield json.loads(payload)
+        offset += RECORD_HEADER.size + length
+
+
+class ClickJournal:
+    """
+    Append-only, memory-mapped journal of click counts that could not be handed to the broker.
+
+    Each API process owns one journal directory (locked with `flock` while the process is alive),
+    made of fixed-size, pre-allocated segment files. Appends are plain memory copies into the
+    current segment; `msync` is batched every `fsync_every` records or `fsync_interval` seconds.
+    When a segment is full a new one is started, and the oldest segments are discarded once there
+    are more than `max_segments`, which caps the disk usage at `segment_size * max_segments`.
+
+    `replay` publishes the sealed segments, merged into one message per segment, and deletes them
+    once published. It also adopts the journals left behind by processes that are no longer alive.
+    Journals are named after the pid and start time of their process: a container restarts its
+    process with the same pid, whose new run must adopt the previous run's journal too.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        segment_size: int,
+        max_segments: int,
+        fsync_every: int,
+        fsync_interval: float,
+        name: str | None = None,
+    ) -> None:
+        self.root = directory
+        self.segment_size = segment_size
+        self.max_segments = max_segments
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.path = directory / f"journal-{name or f'{os.getpid()}-{time.time_ns()}'}"
+        self.discarded = 0
+        self._lock = threading.Lock()
+        self._lock_file: int | None = None
+        self._segments: List[Path] = []
+        self._mmap: mmap.mmap | None = None
+        self._offset = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._orphans_checked = False
+
+    @property
+    def pending(self) -> bool:
+        """Whether there may be journaled clicks waiting to be replayed."""
+        return bool(self._segments) or not self._orphans_checked
+
+    def append(self, counts: Dict[str, int]) -> None:
+        payload = json.dumps(counts, separators=(",", ":")).encode()
+        record_size = RECORD_HEADER.size + len(payload)
+        if record_size > self.segment_size:
+            raise ValueError(f"Record of {record_size} bytes does not fit in a {self.segment_size} bytes segment.")
+        with self._lock:
+            if self._mmap is None or self._offset + record_size > self.segment_size:
+                self._rotate()
+            assert self._mmap is not None
+            RECORD_HEADER.pack_into(self._mmap, self._offset, len(payload), zlib.crc32(payload))
+            self._mmap[self._offset + RECORD_HEADER.size:self._offset + record_size] = payload
+            self._offset += record_size
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def sync(self) -> None:
+        with self._lock:
+            self._sync()
+
+    def replay(self, publish: Callable[[Dict[str, int]], None]) -> int:
+        """Publish every journaled click. Blocking: call it off the event loop. Returns the number of clicks replayed."""
+        replayed = 0
+        if not self._orphans_checked:
+            for orphan in self._orphans():
+                replayed += self._replay_orphan(orphan, publish)
+            self._orphans_checked = True
+        with self._lock:
+            self._seal()
+            segments = list(self._segments)
+        for segment in segments:
+            replayed += self._replay_segment(segment, publish)
+            with self._lock:
+                if segment in self._segments:
+                    self._segments.remove(segment)
+        return replayed
+
+    def close(self) -> None:
+        """Flush the journal and release it. Unreplayed segments are left for the next process."""
+        with self._lock:
+            self._seal()
+            if self._lock_file is not None:
+                os.close(self._lock_file)
+                self._lock_file = None
+
+    def _acquire(self) -> None:
+        if self._lock_file is None:
+            self.path.mkdir(parents=True, exist_ok=True)
+            self._lock_file = os.open(self.path / LOCK_FILE_NAME, os.O_CREAT | os.O_RDWR)
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            self._segments = sorted(self.path.glob(SEGMENT_GLOB))
+
+    def _rotate(self) -> None:
+        self._seal()
+        self._acquire()
+        index = int(self._segments[-1].stem) + 1 if self._segments else 0
+        segment = self.path / f"{index:010d}.seg"
+        with segment.open("wb") as segment_file:
+            segment_file.truncate(self.segment_size)
+        with segment.open("r+b") as segment_file:
+            self._mmap = mmap.mmap(segment_file.fileno(), self.segment_size)
+        self._segments.append(segment)
+        self._offset = 0
+        while len(self._segments) > self.max_segments:
+            oldest = self._segments.pop(0)
+            self.discarded += sum(sum(counts.values()) for counts in read_records(oldest))
+            oldest.unlink(missing_ok=True)
+            logger.warning("Click journal is full, discarded segment %s.", oldest.name)
+
+    def _seal(self) -> None:
+        if self._mmap is not None:
+            self._sync()
+            self._mmap.close()
+            self._mmap = None
+            if self._offset == 0:
+                self._segments.pop().unlink(missing_ok=True)
+
+    def _sync(self) -> None:
+        if self._mmap is not None and self._unsynced:
+            self._mmap.flush()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _orphans(self) -> List[Path]:
+        if not self.root.exists():
+            return []
+        return [path for path in sorted(self.root.glob("journal-*")) if path != self.path]
+
+    def _replay_orphan(self, orphan: Path, publish: Callable[[Dict[str, int]], None]) -> int:
+        lock_file = os.open(orphan / LOCK_FILE_NAME, os.O_CREAT | os.O_RDWR)
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            # Still owned by a live process.
+            os.close(lock_file)
+            return 0
+        try:
+            replayed = sum(self._replay_segment(segment, publish) for segment in sorted(orphan.glob(SEGMENT_GLOB)))
+            shutil.rmtree(orphan, ignore_errors=True)
+        finally:
+            os.close(lock_file)
+        return replayed
+
+    @staticmethod
+    def _replay_segment(segment: Path, publish: Callable[[Dict[str, int]], None]) -> int:
+        counts: Counter = Counter()
+        for record in read_records(segment):
+            counts.update(record)
+        if counts:
+            publish(dict(counts))
+        segment.unlink(missing_ok=True)
+        return sum(counts.values())
@@ -1,13 +1,248 @@
-from src.celery.utils import db_session
-from src.celery.worker import celery
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, List, Sequence, cast
+
+from redis.exceptions import RedisError
+from sqlalchemy import Executable, Integer, Row, String, Update, case, column, select, update, values
+
+from src.celery.utils import db_session, evict_cached_urls, get_redis, run_async
+from src.celery.worker import CLICKS_QUEUE, celery
+from src.core.cache import url_cache_key, url_cache_ttl
+from src.core.config import CeleryDatabaseMode, settings
+from src.core.database import AsyncSessionLocal
+from src.core.outbox import invalidations_statement, relay_invalidations
+from src.core.redirects import cached_redirect
+from src.core.sharding import find_many_on_shards, shards
+from src.core.trending import TRENDING_KEY, record_clicks
+from src.helpers.sql import utcnow
 from src.models import Url
 
+logger = logging.getLogger(__name__)
 
-@celery.task
+
+def click_counts_statement(counts: Dict[str, int]) -> Update:
+    """
+    Add aggregated click counts, keyed by shortened URL, with a single UPDATE ... FROM (VALUES ...).
+    Links reaching their `max_clicks` are deactivated by the same statement.
+    """
+    increments = values(
+        column("shortened_url", String), column("clicks", Integer), name="increments"
+    ).data(list(counts.items()))
+    clicks = Url.clicks + increments.c.clicks
+    return (
+        update(Url)
+        .where(Url.shortened_url == increments.c.shortened_url)
+        .values(
+            clicks=clicks,
+            is_active=case((Url.max_clicks <= clicks, False), else_=Url.is_active),
+        )
+        .returning(Url.shortened_url, Url.is_active, Url.max_clicks)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def expired_urls_statement(batch_size: int) -> Update:
+    """Deactivate up to `batch_size` expired links, walking the partial index on `expires_at`."""
+    expired = (
+        select(Url.id)
+        .where(Url.is_active == True, Url.expires_at <= utcnow())  # noqa: E712
+        .order_by(Url.expires_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    return (
+        update(Url)
+        .where(Url.id.in_(expired.scalar_subquery()))
+        .values(is_active=False)
+        .returning(Url.shortened_url)
+        .execution_options(synchronize_session=False)
+    )
+
+
+Invalidated = Callable[[Sequence[Row]], List[str]]
+
+
+async def execute_async(statement: Executable, shard: str | None = None, invalidated: Invalidated | None = None) -> Sequence[Row]:
+    async with (shards.session(shard) if shard is not None else AsyncSessionLocal()) as session:
+        rows = (await session.execute(statement)).all()
+        shortened_urls = invalidated(rows) if invalidated else []
+        if shortened_urls:
+            await session.execute(invalidations_statement(shortened_urls))
+        await session.commit()
+        return rows
+
+
+def execute(statement: Executable, shard: str | None = None, invalidated: Invalidated | None = None) -> Sequence[Row]:
+    """
+    Execute a statement in its own transaction, on the primary database or on `shard`, with the
+    engine selected by `celery_database_mode`. The cached redirects of the codes `invalidated`
+    picks from the returned rows are queued for invalidation in the same transaction.
+    """
+    if settings.celery_database_mode == CeleryDatabaseMode.asyncio:
+        return run_async(execute_async(statement, shard, invalidated))
+    with db_session(shard) as db:
+        rows = db.execute(statement).all()
+        shortened_urls = invalidated(rows) if invalidated else []
+        if shortened_urls:
+            db.execute(invalidations_statement(shortened_urls))
+        db.commit()
+        return rows
+
+
+def used_up(rows: Sequence[Row]) -> List[str]:
+    """Links of `click_counts_statement` rows that were deactivated by reaching their `max_clicks`."""
+    return [row.shortened_url for row in rows if row.max_clicks is not None and not row.is_active]
+
+
+def apply_sharded_click_counts(counts: Dict[str, int]) -> List[Row]:
+    """
+    Apply click counts with one statement per shard. While resharding, codes not found on their
+    owner are retried on their previous owner, then on their owner again, in case the row was
+    moved in between.
+    """
+    owners: List[Callable[[str], str]] = [shards.owner]
+    if shards.previous_ring is not None:
+        owners += [shards.previous_ring.owner, shards.owner]
+    rows: List[Row] = []
+    for owner in owners:
+        counts_by_shard: Dict[str, Dict[str, int]] = defaultdict(dict)
+        for shortened_url, clicks in counts.items():
+            counts_by_shard[owner(shortened_url)][shortened_url] = clicks
+        for shard, shard_counts in counts_by_shard.items():
+            rows.extend(execute(click_counts_statement(shard_counts), shard, used_up))
+        applied = {row.shortened_url for row in rows}
+        counts = {shortened_url: clicks for shortened_url, clicks in counts.items() if shortened_url not in applied}
+        if not counts:
+            break
+    return rows
+
+
+def apply_click_counts(counts: Dict[str, int]) -> int:
+    """
+    Apply aggregated click counts in one transaction (one per shard when sharded), add them to
+    the trending scores, and evict the links that used up their clicks.
+    """
+    rows: Sequence[Row]
+    if shards.enabled:
+        rows = apply_sharded_click_counts(counts)
+    else:
+        rows = execute(click_counts_statement(counts), invalidated=used_up)
+    try:
+        # Only links that exist are scored.
+        record_clicks(get_redis(), {row.shortened_url: counts[row.shortened_url] for row in rows})
+    except RedisError:
+        # The counts are committed: failing here would requeue and count them twice.
+        logger.exception("Updating the trending scores of %d links failed.", len(counts))
+    try:
+        # Evicted right away; the invalidations queued with the counts are relayed in any case.
+        evict_cached_urls(used_up(rows))
+    except RedisError:
+        # As above, the counts are committed.
+        logger.exception("Evicting the links that used up their clicks failed.")
+    return len(rows)
+
+
+async def increment_click_count_async(shortened_url: str) -> int:
+    async with AsyncSessionLocal() as session:
+        url = await Url.objects(session).get(Url.shortened_url == shortened_url)
+        if url is None:
+            return 0
+        url.clicks += 1
+        await session.commit()
+        return url.clicks
+
+
+@celery.task(acks_late=True)
 def increment_click_count(shortened_url: str) -> int:
+    if settings.celery_database_mode == CeleryDatabaseMode.asyncio:
+        return run_async(increment_click_count_async(shortened_url))
     with db_session() as db:
         url = db.query(Url).filter(Url.shortened_url == shortened_url).first()
-        if url:
-            url.clicks += 1
-            db.commit()
+        if url is None:
+            return 0
+        url.clicks += 1
+        db.commit()
         return url.clicks
+
+
+@celery.task(acks_late=True)
+def increment_click_counts(counts: Dict[str, int]) -> int:
+    """Apply a batch of aggregated click counts, keyed by shortened URL, in one transaction."""
+    return apply_click_counts(counts)
+
+
+@celery.task(acks_late=True)
+def deactivate_expired_urls(batch_size: int | None = None) -> int:
+    """
+    Deactivate expired links in batches, evicting each batch from the cache with one pipeline.
+    Only expired rows are visited, however large the table is.
+    """
+    batch_size = batch_size or settings.url_expiry_sweep_batch_size
+    deactivated = 0
+    databases: List[str | None] = [*shards.names] or [None]
+    for shard in databases:
+        while True:
+            rows = execute(expired_urls_statement(batch_size), shard, lambda rows: [row.shortened_url for row in rows])
+            shortened_urls = [row.shortened_url for row in rows]
+            evict_cached_urls(shortened_urls)
+            deactivated += len(shortened_urls)
+            if len(shortened_urls) < batch_size:
+                break
+    return deactivated
+
+
+@celery.task
+def relay_cache_invalidations(batch_size: int | None = None) -> int:
+    """Apply the queued cache invalidations to Redis and publish them to the in-process caches."""
+    return run_async(relay_invalidations(batch_size or settings.cache_invalidation_batch_size))
+
+
+async def get_redirectables(shortened_urls: List[str]) -> List[Url]:
+    async with AsyncSessionLocal() as session:
+        return await find_many_on_shards(
+            session,
+            shortened_urls,
+            lambda shard_session, codes: Url.redirectables(shard_session).get_all(Url.shortened_url.in_(codes)),
+        )
+
+
+@celery.task
+def warm_trending_urls(limit: int | None = None) -> int:
+    """
+    Cache the redirects of the top trending links that are not cached yet, so the clicks of a
+    link taking off keep hitting the cache when its entry expires. Returns the number cached.
+    """
+    redis = get_redis()
+    top_codes = cast(List[bytes], redis.zrevrange(TRENDING_KEY, 0, (limit or settings.trending_cache_warm_links) - 1))
+    shortened_urls = [code.decode() for code in top_codes]
+    pipeline = redis.pipeline(transaction=False)
+    for shortened_url in shortened_urls:
+        pipeline.exists(url_cache_key(shortened_url))
+    missing = [shortened_url for shortened_url, cached in zip(shortened_urls, pipeline.execute()) if not cached]
+    if not missing:
+        return 0
+    urls = run_async(get_redirectables(missing))
+    pipeline = redis.pipeline(transaction=False)
+    for url in urls:
+        ttl = url_cache_ttl(url.expires_at)
+        if ttl:
+            pipeline.set(url_cache_key(url.shortened_url), cached_redirect(url).dumps(), ex=ttl, nx=True)
+    pipeline.execute()
+    return len(urls)
+
+
+def publish_click_counts(counts: Dict[str, int]) -> None:
+    """
+    Publish a batch of click counts to the clicks queue, drained by `ClickBatchConsumer`.
+    Blocking: call it off the event loop. Waits on the broker for `click_publish_timeout` at most.
+    """
+    with celery.producer_pool.acquire(block=True, timeout=settings.click_publish_timeout) as producer:
+        producer.publish(
+            counts,
+            exchange=CLICKS_QUEUE.exchange,
+            routing_key=CLICKS_QUEUE.routing_key,
+            declare=[CLICKS_QUEUE],
+            serializer=settings.celery_serializer,
+            delivery_mode="persistent",
+            timeout=settings.click_publish_timeout,
+        )
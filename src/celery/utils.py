@@ -1,24 +1,90 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import asyncio
+import threading
 from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Coroutine, Generator, Sequence, TypeVar
+
+from celery.signals import worker_process_init
+from redis import Redis
+from sqlalchemy import Engine, create_engine
+from sqlalchemy.orm import Session
+
+from src.core.cache import url_cache_key
 from src.core.config import settings
+from src.core.database import async_engine, engine_options
+from src.core.sharding import shards
+
+_T = TypeVar("_T")
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
 
 
-def get_sync_database_url() -> str:
-    db_url = settings.test_database_url if settings.test_database_url else settings.database_url
+def get_sync_database_url(shard: str | None = None) -> str:
+    if shard is not None:
+        db_url = shards.urls[shard]
+    else:
+        db_url = settings.test_database_url if settings.test_database_url else settings.database_url
     if db_url.startswith("postgresql+asyncpg://"):
         return db_url.replace("postgresql+asyncpg://", "postgresql://", 1)
     return db_url
 
 
-engine = create_engine(get_sync_database_url())
-SessionLocal = sessionmaker(bind=engine)
+@lru_cache
+def get_engine(shard: str | None = None) -> Engine:
+    return create_engine(get_sync_database_url(shard), **engine_options())
+
+
+@lru_cache
+def get_redis() -> Redis:
+    return Redis(host=settings.redis_host, port=settings.redis_port)
+
+
+def evict_cached_urls(shortened_urls: Sequence[str]) -> None:
+    """Remove URLs from the redirect cache with one pipelined round trip."""
+    if not shortened_urls:
+        return
+    pipeline = get_redis().pipeline(transaction=False)
+    for shortened_url in shortened_urls:
+        pipeline.unlink(url_cache_key(shortened_url))
+    pipeline.execute()
 
 
 @contextmanager
-def db_session():
-    db = SessionLocal()
+def db_session(shard: str | None = None) -> Generator[Session, None, None]:
+    db = Session(bind=get_engine(shard))
     try:
         yield db
     finally:
         db.close()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Return the event loop of this worker process, running in a background thread.
+
+    Every task thread of the process submits its coroutines to this one loop, so they share the
+    asyncpg pool of `async_engine` and can run many database operations concurrently.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="celery-asyncio", daemon=True).start()
+    return _loop
+
+
+def run_async(coroutine: Coroutine[Any, Any, _T]) -> _T:
+    """Run a coroutine on the worker's event loop and wait for its result."""
+    return asyncio.run_coroutine_threadsafe(coroutine, get_event_loop()).result()
+
+
+@worker_process_init.connect
+def reset_after_fork(**kwargs: Any) -> None:
+    # Neither the event loop thread nor pooled connections survive a fork.
+    global _loop
+    _loop = None
+    async_engine.sync_engine.dispose(close=False)
+    shards.reset_after_fork()
+    get_engine.cache_clear()
+    get_redis.cache_clear()
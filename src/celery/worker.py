@@ -1,11 +1,36 @@
 from celery import Celery
+from kombu import Exchange, Queue
 
 from src.core.config import settings
 
+CLICKS_QUEUE = Queue("clicks", Exchange("clicks", type="direct"), routing_key="clicks", durable=True)
+
 
 celery = Celery(
     __name__,
     broker=settings.celery_broker_url,
+    include=["src.celery.tasks", "src.celery.consumer"],
 )
 
-celery.autodiscover_tasks(['src.celery.celery'])
+celery.conf.update(
+    task_serializer=settings.celery_serializer,
+    result_serializer=settings.celery_serializer,
+    accept_content=[settings.celery_serializer, "json"],
+    task_ignore_result=True,
+    worker_concurrency=settings.celery_worker_concurrency,
+    worker_prefetch_multiplier=settings.celery_prefetch_multiplier,
+    beat_schedule={
+        "deactivate-expired-urls": {
+            "task": "src.celery.tasks.deactivate_expired_urls",
+            "schedule": settings.url_expiry_sweep_interval,
+        },
+        "warm-trending-urls": {
+            "task": "src.celery.tasks.warm_trending_urls",
+            "schedule": settings.trending_cache_warm_interval,
+        },
+        "relay-cache-invalidations": {
+            "task": "src.celery.tasks.relay_cache_invalidations",
+            "schedule": settings.cache_invalidation_relay_interval,
+        },
+    },
+)
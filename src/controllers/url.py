@@ -1,42 +1,142 @@
+from typing import List, Sequence, Tuple
 from uuid import UUID
 
 from fastapi import HTTPException
+from sqlalchemy import String, any_, literal
+from sqlalchemy.dialects.postgresql import ARRAY, insert
 
 from src import models
 from src.api.v1 import schemas
 from src.core.database import AsyncSession
+from src.core.outbox import queue_invalidations
+from src.core.sharding import find_many_on_shards, find_on_shards, gather_shards, run_on_owner
 from src.models import Url
-from src.core.url_shortener import ensure_valid_and_unique_alias, generate_unique_shortened_url
+from src.core.url_shortener import ensure_valid_and_unique_alias, generate_unique_shortened_url, url_hash
 
 
 class UrlController:
     @staticmethod
     async def create(
-        url_data: schemas.UrlCreate, owner_id: UUID, alias: str | None, session: AsyncSession
-    ) -> models.Url:
+        url_data: schemas.UrlCreate, owner_id: UUID, alias: str | None, session: AsyncSession, idempotent: bool = False
+    ) -> Tuple[models.Url, bool]:
+        """
+        Create a link, returned with True. With `idempotent`, an active link of the owner's to the
+        same URL, with the same settings, is returned with False instead.
+
+        When sharded, links are placed by their code, so the unique hash only deduplicates links
+        within a shard: concurrent idempotent creates of a URL may land on different shards and
+        both create a link.
+        """
+        if idempotent:
+            url = await UrlController.find_by_original_url(url_data.original_url, owner_id, session)
+            if url:
+                return UrlController.ensure_same_settings(url, url_data), False
         if alias:
             await ensure_valid_and_unique_alias(alias, session)
             shortened_url = alias
-        else: 
+        else:
             shortened_url = await generate_unique_shortened_url(session, url_data.original_url)
-        url_data = schemas.Url(
+        data = schemas.Url(
             original_url=url_data.original_url,
             shortened_url=shortened_url,
             is_active=True,
             clicks=0,
             owner_id=owner_id,
-        )
-        url = await models.Url.objects(session).create(url_data.dict())
+            expires_at=url_data.expires_at,
+            max_clicks=url_data.max_clicks,
+            redirect_type=url_data.redirect_type,
+        ).dict()
+        hashed_url = url_hash(url_data.original_url)
+
+        async def create_on(shard_session: AsyncSession) -> Tuple[models.Url, bool]:
+            # Only the owner's first active link for a URL holds its hash, so the unique index allows
+            # any number of links to the same URL and idempotent creates find that first one.
+            url = await shard_session.scalar(
+                insert(Url)
+                .values(**data, url_hash=hashed_url)
+                .on_conflict_do_nothing(index_elements=[Url.owner_id, Url.url_hash], index_where=Url.is_active.expression)
+                .returning(Url)
+            )
+            if url is None:
+                if idempotent:
+                    # A concurrent create committed the link first.
+                    url = await Url.objects(shard_session).get(
+                        Url.owner_id == owner_id, Url.url_hash == hashed_url, Url.is_active
+                    )
+                    if url is not None:
+                        return UrlController.ensure_same_settings(url, url_data), False
+                url = (await shard_session.execute(insert(Url).values(**data, url_hash=None).returning(Url))).scalar_one()
+            await shard_session.commit()
+            return url, True
+
+        return await run_on_owner(session, shortened_url, create_on)
+
+    @staticmethod
+    def ensure_same_settings(url: models.Url, url_data: schemas.UrlCreate) -> models.Url:
+        """`url`, for an idempotent create of `url_data`, which must not ask for other settings."""
+        settings = (url_data.expires_at, url_data.max_clicks, url_data.redirect_type)
+        if (url.expires_at, url.max_clicks, url.redirect_type) != settings:
+            raise HTTPException(
+                status_code=409, detail="You already have an active link to this URL, with different settings."
+            )
         return url
-    
+
+    @staticmethod
+    async def find_by_original_url(
+        original_url: str, owner_id: UUID, session: AsyncSession
+    ) -> models.Url | None:
+        """
+        The owner's active link to `original_url`, matched on its normalized form, if there is one.
+        One index lookup, on every shard when sharded.
+        """
+        hashed_url = url_hash(original_url)
+        urls = await gather_shards(
+            session,
+            lambda shard_session: Url.objects(shard_session).get(
+                # Bare, as in the predicate of the partial index on the hash.
+                Url.owner_id == owner_id, Url.url_hash == hashed_url, Url.is_active
+            ),
+        )
+        return next((url for url in urls if url is not None), None)
+
     @staticmethod
     async def deactivate(
         shortened_url: str, owner_id: UUID, session: AsyncSession
     ) -> models.Url:
-        url = await Url.objects(session).get(Url.shortened_url == shortened_url, Url.owner_id == owner_id, Url.is_active == True)
+        async def deactivate_on(shard_session: AsyncSession) -> models.Url | None:
+            urls = await Url.objects(shard_session).update_where(
+                {"is_active": False},
+                Url.shortened_url == shortened_url,
+                Url.owner_id == owner_id,
+                Url.is_active.is_(True),
+                commit=False,
+            )
+            # The cached redirect is invalidated if and only if the link is deactivated.
+            await queue_invalidations(shard_session, [url.shortened_url for url in urls])
+            await shard_session.commit()
+            return urls[0] if urls else None
+
+        url = await find_on_shards(session, shortened_url, deactivate_on)
         if not url:
             raise HTTPException(status_code=404, detail="URL not found or you do not have permission to modify it.")
-        url.is_active = False
-        await session.commit()
-        await session.refresh(url)
         return url
+
+    @staticmethod
+    async def deactivate_many(
+        shortened_urls: List[str], owner_id: UUID, session: AsyncSession
+    ) -> List[models.Url]:
+        """Deactivate the owner's active links among `shortened_urls` with one UPDATE per shard."""
+        async def deactivate_on(shard_session: AsyncSession, shard_codes: List[str]) -> Sequence[models.Url]:
+            urls = await Url.objects(shard_session).update_where(
+                {"is_active": False},
+                # One array parameter, however many codes there are.
+                Url.shortened_url == any_(literal(shard_codes, ARRAY(String))),
+                Url.owner_id == owner_id,
+                Url.is_active.is_(True),
+                commit=False,
+            )
+            await queue_invalidations(shard_session, [url.shortened_url for url in urls])
+            await shard_session.commit()
+            return urls
+
+        return await find_many_on_shards(session, list(dict.fromkeys(shortened_urls)), deactivate_on)
@@ -15,7 +15,7 @@ class UserController:
         user_dict = user_data.dict()
         hashed_password = PasswordManager.get_password_hash(user_data.password)
         user_dict.update({"password": hashed_password, "is_superuser": is_superuser})
-        user = await User.objects(session).create(user_dict)
+        user = await User.objects(session).create(user_dict, refresh=False)
         return user
 
     @staticmethod
@@ -0,0 +1,57 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Sequence
+
+from redis.asyncio import Redis
+
+from src.core.config import settings
+
+EVICT_CHUNK_SIZE = 1000
+
+
+def url_cache_key(shortened_url: str) -> str:
+    return f"url:{shortened_url}"
+
+
+def url_cache_ttl(expires_at: datetime | None, now: datetime | None = None) -> int:
+    """Seconds to cache a URL for: `url_cache_ttl`, shortened so the entry never outlives the link."""
+    if expires_at is None:
+        return settings.url_cache_ttl
+    remaining = (expires_at - (now or datetime.utcnow())).total_seconds()
+    return max(0, min(settings.url_cache_ttl, int(remaining)))
+
+
+async def evict_urls(redis: Redis, shortened_urls: Sequence[str]) -> None:
+    """Remove URLs from the redirect cache in one round trip, with chunked `UNLINK`s in a pipeline."""
+    if not shortened_urls:
+        return
+    async with redis.pipeline(transaction=False) as pipeline:
+        for start in range(0, len(shortened_urls), EVICT_CHUNK_SIZE):
+            pipeline.unlink(*(url_cache_key(shortened_url) for shortened_url in shortened_urls[start:start + EVICT_CHUNK_SIZE]))
+        await pipeline.execute()
+
+
+@dataclass
+class CachedRedirect:
+    """
+    What the redirect cache stores for a link, serialized as `"<status> <cache_until> <url>"`.
+
+    `cache_until` is the Unix time until which browsers and CDNs may cache the redirect: 0 if they
+    must not (temporary and click-limited links), None if only `redirect_cache_max_age` bounds it.
+    """
+
+    original_url: str
+    status_code: int = 302
+    cache_until: int | None = 0
+
+    def dumps(self) -> str:
+        cache_until = "-" if self.cache_until is None else self.cache_until
+        return f"{self.status_code} {cache_until} {self.original_url}"
+
+    @classmethod
+    def loads(cls, value: str) -> "CachedRedirect":
+        if not value[:1].isdigit():
+            # Entry written before redirect policies: a bare URL.
+            return cls(value)
+        status_code, cache_until, original_url = value.split(" ", 2)
+        return cls(original_url, int(status_code), None if cache_until == "-" else int(cache_until))
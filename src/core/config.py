@@ -1,4 +1,6 @@
 from enum import Enum
+from pathlib import Path
+from typing import Dict, List
 
 from pydantic import BaseSettings, PostgresDsn
 
@@ -11,6 +13,27 @@ class LogLevel(str, Enum):
     debug = "DEBUG"
 
 
+class ClickOverflowPolicy(str, Enum):
+    drop = "drop"
+    spill = "spill"
+
+
+class ClickSource(str, Enum):
+    origin = "origin"
+    cdn = "cdn"
+
+
+class CacheWriteThrough(str, Enum):
+    off = "off"
+    always = "always"
+    high_traffic = "high_traffic"
+
+
+class CeleryDatabaseMode(str, Enum):
+    sync = "sync"
+    asyncio = "asyncio"
+
+
 class Settings(BaseSettings):
     # Auth
     access_token_expire_minutes: float
@@ -22,11 +45,70 @@ class Settings(BaseSettings):
     database_url: PostgresDsn
     test_database_url: PostgresDsn | None
     log_level: LogLevel = LogLevel.debug
+    # Share of the per-request records below WARNING kept on hot routes
+    log_request_sample_rate: float = 1.0
     server_url: str
+    admin_enabled: bool = True
+
+    # Production server settings (see src/gunicorn_conf.py)
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    server_workers: int | None = None
+    server_keepalive: int = 5
+    server_backlog: int = 2048
+    server_graceful_timeout: int = 30
+    server_metrics_dir: Path = Path("/tmp/url-shortener/metrics")
+    # Load balancers trusted to set X-Forwarded-For and X-Forwarded-Proto, comma-separated, or *
+    server_forwarded_allow_ips: str = "127.0.0.1"
+
+    # Database pool settings, shared by the API and the Celery workers
+    database_echo: bool = False
+    database_pool_size: int = 10
+    database_max_overflow: int = 20
+    database_pool_timeout: float = 30
+    database_pool_recycle: int = 1800
+
+    # URL sharding settings (see src/core/sharding.py): shard name -> database URL, the names on
+    # the hash ring (all shards by default), and the previous ring while resharding
+    database_shards: Dict[str, str] = {}
+    database_shard_ring: List[str] | None = None
+    database_previous_shard_ring: List[str] | None = None
 
     # Redis settings
     redis_host: str
     redis_port: int 
+    url_cache_ttl: int = 3600
+    # Cache new links when they are created: never, always, or for owners flagged high-traffic
+    url_cache_write_through: CacheWriteThrough = CacheWriteThrough.high_traffic
+    # Cache invalidation outbox (see src/core/outbox.py): seconds between relay runs, and
+    # invalidations relayed per transaction
+    cache_invalidation_relay_interval: float = 1.0
+    cache_invalidation_batch_size: int = 1000
+
+    # Redirect settings
+    redirect_cache_max_age: int = 86400
+    click_source: ClickSource = ClickSource.origin
+    # Most codes `POST /redirect/resolve` resolves in one request
+    redirect_resolve_max_codes: int = 1000
+    # Trending links (see src/core/trending.py): seconds for a click's weight to halve, and
+    # number of links scored
+    trending_half_life: float = 3600
+    trending_max_links: int = 10000
+    # Hot-link snapshot (see src/core/hot_links.py), off unless a path is set: file shared by the
+    # host's processes, number of trending links in it, seconds between rebuilds, and age after
+    # which readers ignore it
+    hot_link_snapshot_path: Path | None = None
+    hot_link_snapshot_links: int = 10000
+    hot_link_snapshot_interval: float = 60
+    hot_link_snapshot_max_age: float = 300
+    # Unique visitors (see src/core/visitors.py): buffered visitors before new ones are dropped,
+    # seconds between flushes to Redis, and days each link-day sketch is kept
+    visitor_log_max_size: int = 100000
+    visitor_log_flush_interval: float = 1.0
+    visitor_retention_days: int = 400
+    visitor_stats_max_days: int = 366
+    # Largest campaign `POST /urls/deactivate` retires in one request
+    url_bulk_deactivate_max_links: int = 100_000
     
     # RabbitMQ settings
     rabbitmq_port : int
@@ -35,7 +117,36 @@ class Settings(BaseSettings):
     rabbitmq_default_user: str
     rabbitmq_default_pass: str
 
+    # Click pipeline settings
+    click_queue_max_size: int = 10000
+    click_batch_size: int = 500
+    click_batch_interval: float = 0.5
+    click_publish_timeout: float = 2.0
+    click_publish_retries: int = 3
+    click_overflow_policy: ClickOverflowPolicy = ClickOverflowPolicy.spill
+    click_journal_dir: Path = Path("/tmp/url-shortener/clicks")
+    click_journal_segment_size: int = 1024 * 1024
+    click_journal_max_segments: int = 64
+    click_journal_fsync_every: int = 100
+    click_journal_fsync_interval: float = 1.0
+
+    # Profiling settings
+    profiling_sample_rate: float = 0.0
+    profiling_header_enabled: bool = False
+    profiling_dir: Path = Path("/tmp/url-shortener/profiles")
+
     # Celery settings
+    celery_worker_concurrency: int | None = None
+    celery_prefetch_multiplier: int = 4
+    celery_serializer: str = "msgpack"
+    celery_database_mode: CeleryDatabaseMode = CeleryDatabaseMode.sync
+    click_consumer_batch_size: int = 1000
+    click_consumer_flush_interval: float = 1.0
+    url_expiry_sweep_interval: float = 60
+    url_expiry_sweep_batch_size: int = 5000
+    trending_cache_warm_interval: float = 60
+    trending_cache_warm_links: int = 100
+
     @property
     def celery_broker_url(self) -> str:
         return f"amqp://{self.rabbitmq_default_user}:{self.rabbitmq_default_pass}@{self.rabbitmq_host}:{self.rabbitmq_port}/{self.rabbitmq_default_vhost}"
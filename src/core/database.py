@@ -2,9 +2,9 @@ import uuid
 from datetime import datetime
 from typing import Any, Dict, Generic, Sequence, Type, TypeVar
 
-from fastapi import HTTPException
+from starlette.exceptions import HTTPException
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy import func, select
+from sqlalchemy import delete, func, insert, select, text, update
 from sqlalchemy.orm import (
     DeclarativeBase,
     Mapped,
@@ -16,11 +16,30 @@ from sqlalchemy.orm import (
 from sqlalchemy.sql import Select
 
 from src.core.config import settings
+from src.core.metrics import TimedAsyncAdaptedQueuePool
+from src.core.profiling import profiled
 from src.helpers.casing import snakecase
 from src.helpers.sql import random_uuid, utcnow
 
 
-async_engine = create_async_engine(settings.database_url, echo=True)
+# Below this many rows, approximate counts fall back to an exact count(*), which is then cheap.
+APPROXIMATE_COUNT_THRESHOLD = 100_000
+
+
+def engine_options() -> Dict[str, Any]:
+    """Pool configuration shared by every engine of the application, in the API and the Celery workers."""
+    return {
+        "echo": settings.database_echo,
+        "pool_size": settings.database_pool_size,
+        "max_overflow": settings.database_max_overflow,
+        "pool_timeout": settings.database_pool_timeout,
+        "pool_recycle": settings.database_pool_recycle,
+    }
+
+
+async_engine = create_async_engine(
+    settings.database_url, poolclass=TimedAsyncAdaptedQueuePool, **engine_options()
+)
 AsyncSessionLocal = sessionmaker(
     bind=async_engine,
     class_=AsyncSession,
@@ -65,10 +84,12 @@ class Objects(Generic[_Model]):
             base_statement = base_statement.where(*queryset_filters)
         self.base_statement = base_statement
 
+    @profiled("db")
     async def all(self) -> Sequence[_Model]:
         result = await self.session.execute(self.base_statement)
         return result.scalars().unique().all()
 
+    @profiled("db")
     async def get(self, *where_clause: Any) -> _Model | None:
         statement = self.base_statement.where(*where_clause)
         result = await self.session.execute(statement)
@@ -82,12 +103,26 @@ class Objects(Generic[_Model]):
             )
         return obj
 
+    @profiled("db")
     async def get_all(self, *where_clause: Any) -> Sequence[_Model]:
         statement = self.base_statement.where(*where_clause)
         result = await self.session.execute(statement)
         return result.scalars().unique().all()
 
-    async def count(self, *where_clause: Any) -> int:
+    @profiled("db")
+    async def count(self, *where_clause: Any, approximate: bool = False) -> int:
+        """
+        Count the rows. With `approximate=True`, a count of the whole table is read from the
+        planner statistics (`pg_class.reltuples`, kept up to date by autovacuum) instead of
+        scanning it, unless the table is small or has never been analyzed.
+        """
+        if approximate and not self.queryset_filters and not where_clause:
+            estimate = await self.session.scalar(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = quote_ident(:table)::regclass"),
+                {"table": self.cls.__tablename__},
+            )
+            if estimate is not None and estimate >= APPROXIMATE_COUNT_THRESHOLD:
+                return estimate
         statement = select(func.count()).select_from(self.cls)
         if self.queryset_filters:
             statement = statement.where(*self.queryset_filters)
@@ -96,13 +131,61 @@ class Objects(Generic[_Model]):
         result = await self.session.execute(statement)
         return result.scalar_one()
 
-    async def create(self, data: Dict[str, Any]) -> _Model:
+    def _where(self, *where_clause: Any) -> Sequence[Any]:
+        return [*(self.queryset_filters or ()), *where_clause]
+
+    @profiled("db")
+    async def create(self, data: Dict[str, Any], refresh: bool = True) -> _Model:
+        """
+        Insert one row and commit. With `refresh=False` the row is written with
+        INSERT ... RETURNING, so server defaults come back inline instead of from a SELECT
+        after the commit.
+        """
+        if not refresh:
+            obj = (await self.session.execute(insert(self.cls).values(**data).returning(self.cls))).scalar_one()
+            await self.session.commit()
+            return obj
         obj = self.cls(**data)
         self.session.add(obj)
         await self.session.commit()
         await self.session.refresh(obj)
         return obj
 
+    @profiled("db")
+    async def create_many(self, rows: Sequence[Dict[str, Any]]) -> Sequence[_Model]:
+        """
+        Insert rows with batched multi-row INSERT ... RETURNING statements, in one transaction,
+        and return them in the order of `rows`.
+        """
+        if not rows:
+            return []
+        result = await self.session.scalars(insert(self.cls).returning(self.cls, sort_by_parameter_order=True), rows)
+        objs = result.all()
+        await self.session.commit()
+        return objs
+
+    @profiled("db")
+    async def update_where(self, values: Dict[str, Any], *where_clause: Any, commit: bool = True) -> Sequence[_Model]:
+        """
+        Update every matching row with one UPDATE ... RETURNING, commit, and return the updated rows.
+        With `commit=False` the caller may write more in the same transaction and commits it.
+        """
+        statement = update(self.cls).where(*self._where(*where_clause)).values(**values).returning(self.cls)
+        result = await self.session.scalars(statement)
+        objs = result.all()
+        if commit:
+            await self.session.commit()
+        return objs
+
+    @profiled("db")
+    async def delete_where(self, *where_clause: Any) -> Sequence[_Model]:
+        """Delete every matching row with one DELETE ... RETURNING, commit, and return the deleted rows."""
+        statement = delete(self.cls).where(*self._where(*where_clause)).returning(self.cls)
+        result = await self.session.scalars(statement)
+        objs = result.all()
+        await self.session.commit()
+        return objs
+
 
 @declarative_mixin
 class TableIdMixin:
@@ -0,0 +1,232 @@
+"""
+Hot-link snapshot: a read-only, memory-mapped hash table of the top trending links, shared by every
+process of a host as the first tier of redirect lookups.
+
+A sidecar on each host rebuilds the file every `hot_link_snapshot_interval` seconds from the
+trending scores and swaps it in atomically with a rename. Each worker process maps the file, so
+its pages live once in the host's page cache however many workers read them, and a lookup hashes
+the code and probes the table in place without deserializing anything.
+
+Only active links without an expiry or a click limit are included. Links deactivated since the
+build are revoked in each process as the outbox relay publishes their invalidations (see
+src/core/outbox.py); one whose invalidation was missed keeps redirecting from the snapshot until
+the next rebuild. Readers ignore snapshots older than `hot_link_snapshot_max_age`, in case the
+sidecar stops.
+
+    python -m src.core.hot_links
+"""
+import argparse
+import asyncio
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List
+
+from redis.asyncio import Redis
+
+from src.core.cache import CachedRedirect
+from src.core.config import settings
+from src.core.database import AsyncSessionLocal
+from src.core.outbox import invalidation_listener
+from src.core.sharding import find_many_on_shards
+from src.core.trending import TRENDING_KEY
+from src.models import Url
+
+logger = logging.getLogger(__name__)
+
+# Header: magic, slot count (a power of two), entry count, build time.
+HEADER = struct.Struct("<4sIId")
+MAGIC = b"HLS1"
+# Slot: CRC-32 of the code (0 if empty) and offset of its record. Codes are compared on a match.
+SLOT = struct.Struct("<II")
+# Record: status code, cache_until (-1 for None), code length and URL length, then code and URL.
+RECORD = struct.Struct("<HqII")
+# Seconds between checks for a new snapshot file.
+CHECK_INTERVAL = 1.0
+
+
+def code_hash(shortened_url: bytes) -> int:
+    # 0 marks empty slots.
+    return zlib.crc32(shortened_url) or 1
+
+
+def write_snapshot(path: Path, redirects: Dict[str, CachedRedirect], built_at: float | None = None) -> None:
+    """Write a snapshot next to `path` and rename it over `path`, so readers never see a partial file."""
+    slot_count = 2
+    while slot_count < 2 * len(redirects):
+        slot_count *= 2
+    slots = bytearray(SLOT.size * slot_count)
+    records = bytearray()
+    data_offset = HEADER.size + len(slots)
+    mask = slot_count - 1
+    for shortened_url, redirect in redirects.items():
+        code, original_url = shortened_url.encode(), redirect.original_url.encode()
+        cache_until = -1 if redirect.cache_until is None else redirect.cache_until
+        hashed = code_hash(code)
+        index = hashed & mask
+        while SLOT.unpack_from(slots, index * SLOT.size)[0]:
+            index = (index + 1) & mask
+        SLOT.pack_into(slots, index * SLOT.size, hashed, data_offset + len(records))
+        records += RECORD.pack(redirect.status_code, cache_until, len(code), len(original_url)) + code + original_url
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f".{path.name}.{os.getpid()}")
+    with open(temporary, "wb") as snapshot_file:
+        snapshot_file.write(HEADER.pack(MAGIC, slot_count, len(redirects), built_at or time.time()))
+        snapshot_file.write(slots)
+        snapshot_file.write(records)
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+    os.replace(temporary, path)
+
+
+class HotLinkSnapshot:
+    """
+    Reader of the snapshot at `path`. The file is remapped when it has been replaced, checked at
+    most every `CHECK_INTERVAL` seconds; a missing, invalid or stale file is a miss for every code.
+    """
+
+    def __init__(self, path: Path | None, max_age: float) -> None:
+        self.path = path
+        self.max_age = max_age
+        self._map: mmap.mmap | None = None
+        self._identity: tuple[int, int] | None = None
+        self._mask = 0
+        self._built_at = 0.0
+        self._checked_at = 0.0
+        # Codes invalidated since the snapshot was built, with the time they were.
+        self._revoked: Dict[str, float] = {}
+
+    @classmethod
+    def from_settings(cls) -> "HotLinkSnapshot":
+        return cls(settings.hot_link_snapshot_path, settings.hot_link_snapshot_max_age)
+
+    def get(self, shortened_url: str) -> CachedRedirect | None:
+        if self.path is None:
+            return None
+        now = time.time()
+        if now - self._checked_at >= CHECK_INTERVAL:
+            self._checked_at = now
+            self._refresh()
+        snapshot = self._map
+        if snapshot is None or now - self._built_at > self.max_age or shortened_url in self._revoked:
+            return None
+        code = shortened_url.encode()
+        hashed = code_hash(code)
+        index = hashed & self._mask
+        while True:
+            slot_hash, offset = SLOT.unpack_from(snapshot, HEADER.size + index * SLOT.size)
+            if not slot_hash:
+                return None
+            if slot_hash == hashed:
+                status_code, cache_until, code_length, url_length = RECORD.unpack_from(snapshot, offset)
+                start = offset + RECORD.size + code_length
+                if snapshot[offset + RECORD.size:start] == code:
+                    original_url = snapshot[start:start + url_length].decode()
+                    return CachedRedirect(original_url, status_code, None if cache_until < 0 else cache_until)
+            index = (index + 1) & self._mask
+
+    def revoke(self, shortened_urls: List[str]) -> None:
+        """Stop serving codes whose cached redirects were invalidated, until a newer snapshot."""
+        now = time.time()
+        self._revoked.update((shortened_url, now) for shortened_url in shortened_urls)
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+        self._map, self._identity = None, None
+
+    def _refresh(self) -> None:
+        assert self.path is not None
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self.close()
+            return
+        identity = (stat.st_ino, stat.st_mtime_ns)
+        if identity == self._identity:
+            return
+        try:
+            with open(self.path, "rb") as snapshot_file:
+                # The mapping keeps the file alive after the next snapshot is renamed over it.
+                snapshot = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, slot_count, _, built_at = HEADER.unpack_from(snapshot)
+            if magic != MAGIC:
+                raise ValueError(f"Not a hot-link snapshot: {self.path}")
+        except (OSError, ValueError, struct.error):
+            logger.warning("Could not map the hot-link snapshot.", exc_info=True)
+            return
+        self.close()
+        self._map, self._identity = snapshot, identity
+        self._mask, self._built_at = slot_count - 1, built_at
+        # Snapshots are stamped before their links are read: newer ones reflect the invalidation.
+        self._revoked = {
+            shortened_url: revoked_at for shortened_url, revoked_at in self._revoked.items() if revoked_at >= built_at
+        }
+
+
+async def snapshot_redirects(limit: int) -> Dict[str, CachedRedirect]:
+    """The redirects of the `limit` top trending links that are active and neither expire nor run out of clicks."""
+    # src.core.redirects reads the snapshot.
+    from src.core.redirects import cached_redirect
+
+    async with Redis.from_url(f"redis://{settings.redis_host}:{settings.redis_port}", decode_responses=True) as redis:
+        shortened_urls: List[str] = await redis.zrevrange(TRENDING_KEY, 0, limit - 1)
+    if not shortened_urls:
+        return {}
+    async with AsyncSessionLocal() as session:
+        urls = await find_many_on_shards(
+            session,
+            shortened_urls,
+            lambda shard_session, codes: Url.redirectables(shard_session).get_all(
+                Url.shortened_url.in_(codes), Url.expires_at == None, Url.max_clicks == None  # noqa: E711
+            ),
+        )
+    return {url.shortened_url: cached_redirect(url) for url in urls}
+
+
+async def build(path: Path, limit: int) -> int:
+    built_at = time.time()
+    redirects = await snapshot_redirects(limit)
+    write_snapshot(path, redirects, built_at)
+    return len(redirects)
+
+
+async def run(path: Path, limit: int, interval: float) -> None:
+    """Rebuild the snapshot every `interval` seconds, keeping the previous one if a build fails."""
+    while True:
+        started = time.monotonic()
+        try:
+            logger.info("Wrote %d links to the hot-link snapshot.", await build(path, limit))
+        except Exception:
+            logger.warning("Building the hot-link snapshot failed.", exc_info=True)
+        await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", type=Path, default=settings.hot_link_snapshot_path)
+    parser.add_argument("--links", type=int, default=settings.hot_link_snapshot_links)
+    parser.add_argument("--interval", type=float, default=settings.hot_link_snapshot_interval)
+    parser.add_argument("--once", action="store_true", help="Build the snapshot once and exit.")
+    args = parser.parse_args()
+    if args.path is None:
+        parser.error("HOT_LINK_SNAPSHOT_PATH is not set.")
+    logging.basicConfig(level=logging.INFO)
+    if args.once:
+        logger.info("Wrote %d links to the hot-link snapshot.", asyncio.run(build(args.path, args.links)))
+    else:
+        asyncio.run(run(args.path, args.links, args.interval))
+
+
+hot_links = HotLinkSnapshot.from_settings()
+if hot_links.path is not None:
+    invalidation_listener.subscribe(hot_links.revoke)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import os
+import time
+from typing import Any, Callable, Dict
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.multiprocess import MultiProcessCollector
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Set PROMETHEUS_MULTIPROC_DIR before the process starts to aggregate metrics across uvicorn workers.
+MULTIPROCESS_MODE = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency, by route template.",
+    ["method", "route", "status"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+REDIRECT_CACHE_REQUESTS = Counter(
+    "redirect_cache_requests_total",
+    "Redirect cache lookups, by result (snapshot hit, hit or miss).",
+    ["result"],
+)
+DB_POOL_CHECKOUT = Histogram(
+    "db_pool_checkout_seconds",
+    "Time spent waiting for a database connection from the pool.",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+CLICK_PUBLISH_LATENCY = Histogram(
+    "click_publish_seconds",
+    "Time spent publishing a batch of clicks to the broker.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+REDIRECT_BATCH_CACHE_HIT_RATIO = Histogram(
+    "redirect_batch_cache_hit_ratio",
+    "Share of the codes of each batch resolve request found in the redirect cache.",
+    buckets=(0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99, 1),
+)
+CODE_GENERATION_RETRIES = Counter(
+    "code_generation_retries_total",
+    "Short code generation attempts that collided with an existing code.",
+)
+
+
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Connection pool recording how long each checkout waits."""
+
+    def _do_get(self) -> Any:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT.observe(time.perf_counter() - start)
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware observing the latency of every HTTP request.
+
+    Requests are labelled with the template of the route that served them (e.g.
+    `/api/v1/redirect/{shortened_url}`), never with the raw path, to keep cardinality bounded.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.route_templates: Dict[Callable, str] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        app = scope["app"]
+        root_path = scope.get("root_path", "")
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = self.route_template(app, scope.get("endpoint"))
+            if route is None and scope.get("root_path", "") != root_path:
+                # Mounted applications (e.g. the admin) are labelled with their mount path.
+                route = scope["root_path"][len(root_path):]
+            REQUEST_LATENCY.labels(scope["method"], route or "unmatched", str(status_code)).observe(
+                time.perf_counter() - start
+            )
+
+    def route_template(self, app: Any, endpoint: Any) -> str | None:
+        if not self.route_templates:
+            self.route_templates = {
+                route.endpoint: route.path for route in app.router.routes if hasattr(route, "endpoint")
+            }
+        return self.route_templates.get(endpoint)
+
+
+def metrics(request: Request) -> Response:
+    registry = REGISTRY
+    if MULTIPROCESS_MODE:
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+    return Response(generate_latest(registry), headers={"Content-Type": CONTENT_TYPE_LATEST})
@@ -0,0 +1,131 @@
+"""
+Transactional outbox for cache invalidation.
+
+Code changing a link writes its shortened URL to the `cache_invalidation` table in the same
+transaction, so the invalidation is committed if and only if the change is. A relay, the
+`relay_cache_invalidations` beat task, drains the table in batches: it unlinks the Redis entries
+with one pipeline, publishes the codes on `INVALIDATIONS_CHANNEL` for the in-process caches of
+every API and edge process, and only then deletes the rows. A crash or a Redis error leaves the
+rows to be relayed again, so every invalidation is applied at least once, and cached redirects
+can be kept for as long as `url_cache_ttl` says without going stale.
+"""
+import asyncio
+import logging
+from contextlib import suppress
+from typing import Callable, List, Sequence
+
+from redis.asyncio import Redis
+from sqlalchemy import Insert, String, delete, func, insert, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from src.core.cache import evict_urls
+from src.core.config import settings
+from src.core.database import AsyncSession, AsyncSessionLocal
+from src.core.sharding import shards
+from src.models import CacheInvalidation
+
+logger = logging.getLogger(__name__)
+
+INVALIDATIONS_CHANNEL = "cache:invalidations"
+# Seconds before resubscribing after the subscription failed.
+RESUBSCRIBE_DELAY = 1.0
+
+
+def invalidations_statement(shortened_urls: Sequence[str]) -> Insert:
+    """Queue invalidations, for the sync and async sessions alike, binding the codes as one array."""
+    codes = select(func.unnest(literal(list(shortened_urls), ARRAY(String))))
+    return insert(CacheInvalidation).from_select([CacheInvalidation.shortened_url], codes)
+
+
+async def queue_invalidations(session: AsyncSession, shortened_urls: Sequence[str]) -> None:
+    """Queue invalidations in the session's transaction: the caller commits them with its changes."""
+    if shortened_urls:
+        await session.execute(invalidations_statement(shortened_urls))
+
+
+async def relay_batch(session: AsyncSession, redis: Redis, batch_size: int) -> int:
+    """Apply and publish up to `batch_size` queued invalidations, then delete them. Returns how many."""
+    rows = (
+        await session.execute(
+            select(CacheInvalidation.id, CacheInvalidation.shortened_url)
+            .order_by(CacheInvalidation.id)
+            .limit(batch_size)
+            # Concurrent relays take different batches.
+            .with_for_update(skip_locked=True)
+        )
+    ).all()
+    if not rows:
+        return 0
+    shortened_urls = list(dict.fromkeys(row.shortened_url for row in rows))
+    await evict_urls(redis, shortened_urls)
+    await redis.publish(INVALIDATIONS_CHANNEL, " ".join(shortened_urls))
+    await session.execute(delete(CacheInvalidation).where(CacheInvalidation.id.in_([row.id for row in rows])))
+    await session.commit()
+    return len(rows)
+
+
+async def relay_invalidations(batch_size: int) -> int:
+    """Relay every queued invalidation, from the primary database and from every shard."""
+    relayed = 0
+    async with Redis.from_url(f"redis://{settings.redis_host}:{settings.redis_port}", decode_responses=True) as redis:
+        # The primary's outbox also gets the admin's edits, and those queued before sharding.
+        for shard in [None, *shards.names]:
+            while True:
+                async with (shards.session(shard) if shard is not None else AsyncSessionLocal()) as session:
+                    batch = await relay_batch(session, redis, batch_size)
+                relayed += batch
+                if batch < batch_size:
+                    break
+    return relayed
+
+
+class InvalidationListener:
+    """
+    Subscribes to `INVALIDATIONS_CHANNEL` in the background and hands the invalidated codes to
+    the in-process caches registered with `subscribe`. Messages published while disconnected are
+    lost, so in-process caches must still bound their own staleness.
+    """
+
+    def __init__(self, redis_url: str) -> None:
+        self.redis_url = redis_url
+        self.handlers: List[Callable[[List[str]], None]] = []
+        self._task: asyncio.Task | None = None
+
+    @classmethod
+    def from_settings(cls) -> "InvalidationListener":
+        return cls(f"redis://{settings.redis_host}:{settings.redis_port}")
+
+    def subscribe(self, handler: Callable[[List[str]], None]) -> None:
+        self.handlers.append(handler)
+
+    def start(self) -> None:
+        """Start listening, if any in-process cache subscribed. Must be called from the event loop."""
+        if self.handlers and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def dispatch(self, message: str) -> None:
+        shortened_urls = message.split()
+        for handler in self.handlers:
+            handler(shortened_urls)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with Redis.from_url(self.redis_url, decode_responses=True) as redis:
+                    async with redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                        await pubsub.subscribe(INVALIDATIONS_CHANNEL)
+                        async for message in pubsub.listen():
+                            self.dispatch(message["data"])
+            except Exception:
+                logger.warning("Listening for cache invalidations failed, resubscribing.", exc_info=True)
+            await asyncio.sleep(RESUBSCRIBE_DELAY)
+
+
+invalidation_listener = InvalidationListener.from_settings()
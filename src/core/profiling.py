@@ -0,0 +1,172 @@
+import asyncio
+import cProfile
+import functools
+import json
+import random
+import re
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Generator, List, TypeVar
+
+from starlette.responses import JSONResponse
+from redis.asyncio import Redis
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.config import settings
+
+PROFILE_HEADER = b"x-profile"
+
+_T = TypeVar("_T")
+
+
+class RequestBreakdown:
+    """
+    Wall-clock time of one request, split by category. Categories are exclusive: time spent in
+    a nested section (e.g. the DB query of the auth dependency) is only counted for the inner one.
+    """
+
+    def __init__(self) -> None:
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.started = self._mark = time.perf_counter()
+        self._stack: List[str] = []
+
+    def enter(self, category: str) -> None:
+        now = time.perf_counter()
+        if self._stack:
+            self.seconds[self._stack[-1]] += now - self._mark
+        self._stack.append(category)
+        self._mark = now
+
+    def exit(self) -> None:
+        now = time.perf_counter()
+        self.seconds[self._stack.pop()] += now - self._mark
+        self._mark = now
+
+    def as_dict(self) -> Dict[str, float]:
+        total = time.perf_counter() - self.started
+        breakdown = dict(self.seconds)
+        breakdown["other"] = total - sum(breakdown.values())
+        breakdown["total"] = total
+        return breakdown
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{category};dur={seconds * 1000:.2f}" for category, seconds in self.as_dict().items())
+
+
+_breakdown: ContextVar[RequestBreakdown | None] = ContextVar("request_breakdown", default=None)
+
+
+@contextmanager
+def profile_section(category: str) -> Generator[None, None, None]:
+    breakdown = _breakdown.get()
+    if breakdown is None:
+        yield
+        return
+    breakdown.enter(category)
+    try:
+        yield
+    finally:
+        breakdown.exit()
+
+
+def profiled(category: str) -> Callable[[Callable[..., Awaitable[_T]]], Callable[..., Awaitable[_T]]]:
+    """Count the time spent in a coroutine function under `category` for profiled requests."""
+
+    def decorator(function: Callable[..., Awaitable[_T]]) -> Callable[..., Awaitable[_T]]:
+        @functools.wraps(function)
+        async def wrapper(*args: Any, **kwargs: Any) -> _T:
+            breakdown = _breakdown.get()
+            if breakdown is None:
+                return await function(*args, **kwargs)
+            breakdown.enter(category)
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                breakdown.exit()
+
+        return wrapper
+
+    return decorator
+
+
+class ProfiledJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        with profile_section("serialization"):
+            return super().render(content)
+
+
+class ProfiledRedis(Redis):
+    @profiled("redis")
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        return await super().execute_command(*args, **options)
+
+
+class ProfilingMiddleware:
+    """
+    Opt-in per-request profiling.
+
+    A request is profiled when it carries an `X-Profile` header (if `profiling_header_enabled`)
+    or is sampled at `profiling_sample_rate`. Profiled requests get a `Server-Timing` header with
+    the time spent in auth, db, redis, serialization and other code, and a cProfile dump plus the
+    breakdown are written to `profiling_dir`. Only one request runs under cProfile at a time, and
+    its profile also covers whatever other requests run concurrently on the event loop.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: float = settings.profiling_sample_rate,
+        header_enabled: bool = settings.profiling_header_enabled,
+        directory: Path = settings.profiling_dir,
+    ) -> None:
+        self.app = app
+        self.sample_rate = sample_rate
+        self.header_enabled = header_enabled
+        self.directory = directory
+        self._profiling = False
+
+    def should_profile(self, scope: Scope) -> bool:
+        if self.header_enabled and any(name == PROFILE_HEADER for name, _ in scope["headers"]):
+            return True
+        return random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        breakdown = RequestBreakdown()
+        token = _breakdown.set(breakdown)
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", breakdown.server_timing())
+            await send(message)
+
+        profiler = None
+        if not self._profiling:
+            self._profiling = True
+            profiler = cProfile.Profile()
+            profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+            _breakdown.reset(token)
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.dump, scope, breakdown.as_dict(), profiler)
+
+    def dump(self, scope: Scope, breakdown: Dict[str, float], profiler: cProfile.Profile | None) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_") or "root"
+        name = self.directory / f"{time.time_ns()}-{scope['method']}-{path[:64]}"
+        name.with_suffix(".json").write_text(
+            json.dumps({"method": scope["method"], "path": scope["path"], "seconds": breakdown}, indent=2)
+        )
+        if profiler is not None:
+            profiler.dump_stats(name.with_suffix(".prof"))
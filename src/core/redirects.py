@@ -0,0 +1,151 @@
+import calendar
+import time
+from email.utils import formatdate
+from typing import Dict, Iterable, Sequence, Tuple
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import String, any_, literal
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import RedirectResponse
+
+from src.celery.clicks import click_queue
+from src.core.cache import CachedRedirect, url_cache_key, url_cache_ttl
+from src.core.config import CacheWriteThrough, ClickSource, settings
+from src.core.hot_links import hot_links
+from src.core.metrics import REDIRECT_BATCH_CACHE_HIT_RATIO, REDIRECT_CACHE_REQUESTS
+from src.core.sharding import find_many_on_shards, find_on_shards
+from src.core.visitors import visitor_log
+from src.logging import get_sampled_logger
+from src.models import RedirectType, Url, User
+
+logger = get_sampled_logger(__name__)
+
+
+def cached_redirect(url: Url) -> CachedRedirect:
+    cache_until: int | None = 0
+    # Click-limited links must reach us on every click to enforce the limit.
+    if RedirectType(url.redirect_type).permanent and url.max_clicks is None:
+        # Expiry timestamps are naive UTC.
+        cache_until = None if url.expires_at is None else calendar.timegm(url.expires_at.utctimetuple())
+    return CachedRedirect(url.original_url, url.redirect_type, cache_until)
+
+
+async def cache_redirects(redis: Redis, urls: Iterable[Url]) -> Dict[str, CachedRedirect]:
+    """Cache the redirects of `urls` in one pipeline, each until its link expires, and return them."""
+    redirects = {}
+    async with redis.pipeline(transaction=False) as pipeline:
+        for url in urls:
+            redirect = redirects[url.shortened_url] = cached_redirect(url)
+            ttl = url_cache_ttl(url.expires_at)
+            if ttl:
+                pipeline.set(url_cache_key(url.shortened_url), redirect.dumps(), ex=ttl)
+        await pipeline.execute()
+    return redirects
+
+
+async def write_through(redis: Redis, urls: Sequence[Url], owner: User) -> None:
+    """
+    Cache links that were just created, per `url_cache_write_through`, so their first clicks do not
+    miss the cache. The links are committed already: a Redis failure is logged, not raised.
+    """
+    policy = settings.url_cache_write_through
+    if not urls or policy == CacheWriteThrough.off or (policy == CacheWriteThrough.high_traffic and not owner.is_high_traffic):
+        return
+    try:
+        await cache_redirects(redis, urls)
+    except RedisError:
+        logger.warning("Caching %d new links failed.", len(urls), exc_info=True)
+
+
+async def resolve_redirect(shortened_url: str, redis: Redis, session: AsyncSession) -> CachedRedirect | None:
+    """
+    Look up a redirect, from the host's hot-link snapshot, the Redis cache or else from the
+    database, caching it. Returns None if there is no link to redirect to. Shared by the API and
+    the edge application.
+    """
+    redirect = hot_links.get(shortened_url)
+    if redirect is not None:
+        REDIRECT_CACHE_REQUESTS.labels("snapshot").inc()
+        return redirect
+    # Log Redis retrieval for demo purposes, showcasing cache usage.
+    logger.info("Retrieving original URL for shortened URL '%s' from Redis cache.", shortened_url)
+    cached = await redis.get(url_cache_key(shortened_url))
+    if cached is not None:
+        REDIRECT_CACHE_REQUESTS.labels("hit").inc()
+        redirect = CachedRedirect.loads(cached)
+        # Log Redis retrieval for demo purposes, showcasing cache usage.
+        logger.info("Found original URL '%s' for shortened URL '%s' in Redis cache.", redirect.original_url, shortened_url)
+        return redirect
+    REDIRECT_CACHE_REQUESTS.labels("miss").inc()
+    # Log Redis retrieval for demo purposes, showcasing cache usage.
+    logger.info(
+        "Original URL for shortened URL '%s' not found in Redis cache. Attempting to retrieve from database.", shortened_url
+    )
+    url = await find_on_shards(
+        session, shortened_url, lambda shard_session: Url.redirectables(shard_session).get(Url.shortened_url == shortened_url)
+    )
+    if not url:
+        return None
+    redirect = cached_redirect(url)
+    # The entry expires with the link, so cache hits never need to check the expiry.
+    ttl = url_cache_ttl(url.expires_at)
+    if ttl:
+        await redis.set(url_cache_key(shortened_url), redirect.dumps(), ex=ttl)
+    return redirect
+
+
+async def resolve_redirects(
+    shortened_urls: Sequence[str], redis: Redis, session: AsyncSession
+) -> Tuple[Dict[str, CachedRedirect], float]:
+    """
+    Look up many redirects at once: one `MGET` of their cache entries, one query per shard for the
+    misses, and one pipeline caching what it found. Returns the redirects found, by shortened URL,
+    and the share of the codes that were cached.
+    """
+    codes = list(dict.fromkeys(shortened_urls))
+    if not codes:
+        return {}, 0.0
+    cached = await redis.mget([url_cache_key(shortened_url) for shortened_url in codes])
+    redirects = {shortened_url: CachedRedirect.loads(value) for shortened_url, value in zip(codes, cached) if value is not None}
+    hits = len(redirects)
+    REDIRECT_CACHE_REQUESTS.labels("hit").inc(hits)
+    REDIRECT_CACHE_REQUESTS.labels("miss").inc(len(codes) - hits)
+    missing = [shortened_url for shortened_url in codes if shortened_url not in redirects]
+    if missing:
+        urls = await find_many_on_shards(
+            session,
+            missing,
+            # One array parameter, however many codes there are.
+            lambda shard_session, shard_codes: Url.redirectables(shard_session).get_all(
+                Url.shortened_url == any_(literal(shard_codes, ARRAY(String)))
+            ),
+        )
+        redirects.update(await cache_redirects(redis, urls))
+    hit_ratio = hits / len(codes)
+    REDIRECT_BATCH_CACHE_HIT_RATIO.observe(hit_ratio)
+    return redirects, hit_ratio
+
+
+def redirect_response(shortened_url: str, redirect: CachedRedirect, visitor: str | None = None) -> RedirectResponse:
+    """
+    Build the redirect response, with caching headers allowing browsers and CDNs to serve permanent
+    redirects themselves until the link expires, and count the click and the `visitor` unless CDN
+    logs count clicks.
+    """
+    now = time.time()
+    max_age = 0
+    if redirect.cache_until is None:
+        max_age = settings.redirect_cache_max_age
+    elif redirect.cache_until:
+        max_age = max(0, min(settings.redirect_cache_max_age, redirect.cache_until - int(now)))
+    if max_age:
+        headers = {"Cache-Control": f"public, max-age={max_age}", "Expires": formatdate(now + max_age, usegmt=True)}
+    else:
+        headers = {"Cache-Control": "no-store"}
+    if settings.click_source == ClickSource.origin:
+        click_queue.put(shortened_url)
+        if visitor is not None:
+            visitor_log.add(shortened_url, visitor)
+    return RedirectResponse(redirect.original_url, status_code=redirect.status_code, headers=headers)
@@ -1,28 +1,38 @@
 from datetime import datetime, timedelta
-from typing import Tuple
+from functools import lru_cache
+from typing import TYPE_CHECKING, Tuple
 
 from fastapi import HTTPException, Request, Response
 from fastapi.security.utils import get_authorization_scheme_param
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from pydantic import ValidationError
 
 from src.api.v1.schemas import Token, TokenPayload
 from src.core.config import settings
 from src.core.database import AsyncSession
+from src.core.profiling import profiled
 from src.models import User
 
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
 
 class PasswordManager:
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    @staticmethod
+    @lru_cache
+    def pwd_context() -> "CryptContext":
+        # Only signups and logins hash passwords, so passlib is loaded on first use.
+        from passlib.context import CryptContext
+
+        return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
     @classmethod
     def verify_password(cls, plain_password: str, hashed_password: str) -> bool:
-        return cls.pwd_context.verify(plain_password, hashed_password)
+        return cls.pwd_context().verify(plain_password, hashed_password)
 
     @classmethod
     def get_password_hash(cls, password: str) -> str:
-        return cls.pwd_context.hash(password)
+        return cls.pwd_context().hash(password)
 
 
 class AuthManager:
@@ -97,6 +107,7 @@ class AuthManager:
             raise self.credentials_exception
         return token
 
+    @profiled("auth")
     async def __call__(self, request: Request, session: AsyncSession) -> User:
         token = self._get_token(request)
         return await self.get_user_from_token(token, session)
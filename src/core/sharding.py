@@ -0,0 +1,276 @@
+"""
+Horizontal sharding of the `url` table across several Postgres databases.
+
+Short codes map to shards through a consistent hash ring, so adding a shard only moves the keys of
+the ring ranges it takes over. Users stay on the primary database (`DATABASE_URL`); shards hold
+`url` rows only, without the foreign key to `user`, which cannot span databases.
+
+Sharding is off unless `DATABASE_SHARDS` is set, and every helper below then runs its operation
+with the session it is given. Shards have their own Alembic history (src/alembic/shards), applied
+to the shards of the current ring. To reshard online, set `DATABASE_PREVIOUS_SHARD_RING` to the
+ring being left: lookups fall back to a key's previous owner while `reshard` moves the rows, and
+the setting is removed once it has finished. The links already on the primary database are
+moved the same way, with the primary listed in `DATABASE_SHARDS` and as the previous ring.
+
+    cd src && alembic -n shards upgrade head
+    python -m src.core.sharding reshard --batch-size 1000
+"""
+import argparse
+import asyncio
+import bisect
+import hashlib
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Sequence, TypeVar
+
+from sqlalchemy import case, delete, exists, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from src.core.config import settings
+from src.core.database import engine_options
+from src.core.metrics import TimedAsyncAdaptedQueuePool
+from src.models import Url
+
+_T = TypeVar("_T")
+
+VIRTUAL_NODES = 128
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring mapping keys to shard names, with `virtual_nodes` points per shard."""
+
+    def __init__(self, names: Sequence[str], virtual_nodes: int = VIRTUAL_NODES) -> None:
+        if not names:
+            raise ValueError("A hash ring needs at least one shard.")
+        points = sorted((_hash(f"{name}#{index}"), name) for name in names for index in range(virtual_nodes))
+        self.names = sorted(set(names))
+        self._tokens = [token for token, _ in points]
+        self._owners = [name for _, name in points]
+
+    def owner(self, key: str) -> str:
+        return self._owners[bisect.bisect(self._tokens, _hash(key)) % len(self._tokens)]
+
+
+class Shards:
+    def __init__(
+        self,
+        urls: Dict[str, str],
+        ring: Sequence[str] | None = None,
+        previous_ring: Sequence[str] | None = None,
+    ) -> None:
+        self.urls = urls
+        self.ring = HashRing(ring or list(urls)) if urls else None
+        self.previous_ring = HashRing(previous_ring) if urls and previous_ring else None
+        self.engines: Dict[str, AsyncEngine] = {}
+        self._sessionmakers: Dict[str, async_sessionmaker[AsyncSession]] = {}
+
+    @classmethod
+    def from_settings(cls) -> "Shards":
+        return cls(settings.database_shards, settings.database_shard_ring, settings.database_previous_shard_ring)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ring is not None
+
+    @property
+    def names(self) -> List[str]:
+        """Every shard that may hold rows: the ring's, and during a resharding, the previous ring's."""
+        names = set(self.ring.names if self.ring else [])
+        if self.previous_ring:
+            names.update(self.previous_ring.names)
+        return sorted(names)
+
+    def owner(self, shortened_url: str) -> str:
+        assert self.ring is not None
+        return self.ring.owner(shortened_url)
+
+    def read_candidates(self, shortened_url: str) -> List[str]:
+        """Shards that may hold a code: its owner, then during a resharding its previous owner."""
+        owner = self.owner(shortened_url)
+        if self.previous_ring is None:
+            return [owner]
+        previous_owner = self.previous_ring.owner(shortened_url)
+        return [owner] if previous_owner == owner else [owner, previous_owner]
+
+    def engine(self, name: str) -> AsyncEngine:
+        if name not in self.engines:
+            self.engines[name] = create_async_engine(
+                self.urls[name], poolclass=TimedAsyncAdaptedQueuePool, **engine_options()
+            )
+        return self.engines[name]
+
+    def session(self, name: str) -> AsyncSession:
+        if name not in self._sessionmakers:
+            self._sessionmakers[name] = async_sessionmaker(
+                bind=self.engine(name), class_=AsyncSession, expire_on_commit=False, autoflush=False
+            )
+        return self._sessionmakers[name]()
+
+    def reset_after_fork(self) -> None:
+        for engine in self.engines.values():
+            engine.sync_engine.dispose(close=False)
+
+
+shards = Shards.from_settings()
+
+
+async def run_on_owner(
+    session: AsyncSession, shortened_url: str, operation: Callable[[AsyncSession], Awaitable[_T]]
+) -> _T:
+    """Run a write on the shard owning `shortened_url`."""
+    if not shards.enabled:
+        return await operation(session)
+    async with shards.session(shards.owner(shortened_url)) as shard_session:
+        return await operation(shard_session)
+
+
+async def find_on_shards(
+    session: AsyncSession, shortened_url: str, operation: Callable[[AsyncSession], Awaitable[_T | None]]
+) -> _T | None:
+    """
+    Run a lookup on the shard owning `shortened_url`, and while resharding, on its previous owner
+    if the first one found nothing. Results are detached from their session, so lookups that
+    modify the row must commit inside `operation`.
+    """
+    if not shards.enabled:
+        return await operation(session)
+    for name in shards.read_candidates(shortened_url):
+        async with shards.session(name) as shard_session:
+            result = await operation(shard_session)
+        if result is not None:
+            return result
+    return None
+
+
+async def find_many_on_shards(
+    session: AsyncSession,
+    shortened_urls: Sequence[str],
+    operation: Callable[[AsyncSession, List[str]], Awaitable[Sequence[Url]]],
+) -> List[Url]:
+    """
+    Run a lookup of many codes with one call per shard, each given the codes the shard owns, and
+    while resharding, once more per previous owner for the codes that were not found.
+    """
+    if not shards.enabled:
+        return list(await operation(session, list(shortened_urls)))
+    owners: List[Callable[[str], str]] = [shards.owner]
+    if shards.previous_ring is not None:
+        owners.append(shards.previous_ring.owner)
+
+    async def run(name: str, shard_codes: List[str]) -> Sequence[Url]:
+        async with shards.session(name) as shard_session:
+            return await operation(shard_session, shard_codes)
+
+    found: List[Url] = []
+    pending = list(shortened_urls)
+    for owner in owners:
+        codes_by_shard: Dict[str, List[str]] = defaultdict(list)
+        for shortened_url in pending:
+            codes_by_shard[owner(shortened_url)].append(shortened_url)
+        for urls in await asyncio.gather(*(run(name, codes) for name, codes in codes_by_shard.items())):
+            found.extend(urls)
+        matched = {url.shortened_url for url in found}
+        pending = [shortened_url for shortened_url in pending if shortened_url not in matched]
+        if not pending:
+            break
+    return found
+
+
+async def gather_shards(session: AsyncSession, operation: Callable[[AsyncSession], Awaitable[_T]]) -> List[_T]:
+    """Run a query on every shard concurrently and return each shard's result."""
+    if not shards.enabled:
+        return [await operation(session)]
+
+    async def run(name: str) -> _T:
+        async with shards.session(name) as shard_session:
+            return await operation(shard_session)
+
+    return list(await asyncio.gather(*(run(name) for name in shards.names)))
+
+
+def url_hash_guard(url: Url) -> Any:
+    """
+    The hash of a link being moved, unless its owner already has an active link holding it on the
+    target: hashes are unique per shard, and the target's link stays the one idempotent creates find.
+    """
+    if url.url_hash is None or not url.is_active:
+        return url.url_hash
+    taken = exists(select(Url.id).where(Url.owner_id == url.owner_id, Url.url_hash == url.url_hash, Url.is_active.is_(True)))
+    return case((taken, None), else_=url.url_hash)
+
+
+async def move_batch(source: str, after: Any, batch_size: int) -> tuple[Any, int]:
+    """
+    Move the rows of one batch of `source` whose owner has changed, and return the last id seen
+    and the number of rows moved. The rows stay locked on the source until they are committed on
+    their new owner, then they are deleted from the source.
+    """
+    columns = [column.key for column in Url.__table__.columns]
+    async with shards.session(source) as source_session:
+        statement = select(Url).order_by(Url.id).limit(batch_size).with_for_update()
+        if after is not None:
+            statement = statement.where(Url.id > after)
+        urls = (await source_session.execute(statement)).scalars().all()
+        if not urls:
+            return None, 0
+        moving: Dict[str, List[Url]] = defaultdict(list)
+        for url in urls:
+            owner = shards.owner(url.shortened_url)
+            if owner != source:
+                moving[owner].append(url)
+        for target, target_urls in moving.items():
+            async with shards.session(target) as target_session:
+                await target_session.execute(
+                    insert(Url)
+                    .values(
+                        [
+                            {**{column: getattr(url, column) for column in columns}, "url_hash": url_hash_guard(url)}
+                            for url in target_urls
+                        ]
+                    )
+                    .on_conflict_do_nothing(index_elements=[Url.shortened_url])
+                )
+                await target_session.commit()
+        moved_ids = [url.id for target_urls in moving.values() for url in target_urls]
+        if moved_ids:
+            await source_session.execute(delete(Url).where(Url.id.in_(moved_ids)))
+        await source_session.commit()
+    return urls[-1].id, len(moved_ids)
+
+
+async def reshard(batch_size: int) -> int:
+    """
+    Move every row that is not on its owner shard, one batch at a time, while serving traffic. To
+    shard the links of the primary database, list it in `DATABASE_SHARDS` and as the only shard of
+    `DATABASE_PREVIOUS_SHARD_RING`, with `DATABASE_SHARD_RING` naming the new shards: its rows are
+    moved to the ring, and it is removed from both settings once this has finished.
+    """
+    moved = 0
+    for source in shards.names:
+        after = None
+        while True:
+            after, batch_moved = await move_batch(source, after, batch_size)
+            if after is None:
+                break
+            moved += batch_moved
+    return moved
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    reshard_parser = commands.add_parser("reshard", help="Move rows to the shard owning them on the current ring.")
+    reshard_parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    if not shards.enabled:
+        parser.error("DATABASE_SHARDS is not set.")
+    print(f"Moved {asyncio.run(reshard(args.batch_size))} rows.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Trending links: a time-decayed click score per short code, in a Redis sorted set.
+
+Clicks are added with forward decay: a click at time `t` adds `2 ** ((t - epoch) / half_life)`,
+so every score decays by half each `trending_half_life` seconds relative to newer clicks without
+ever rewriting old entries. Reading divides by the weight of the current time to get clicks,
+decayed to now. When the weights grow too large, the set is rescaled and the epoch moved. The
+set is trimmed to the `trending_max_links` highest scores after every batch, so its memory is
+bounded however many links there are.
+"""
+import time
+from typing import Dict, List, Tuple
+
+from redis import Redis as SyncRedis
+from redis.asyncio import Redis
+
+from src.core.config import settings
+
+TRENDING_KEY = "trending:urls"
+TRENDING_EPOCH_KEY = "trending:epoch"
+
+# Rescale after this many half-lives, long before the weights (2 ** 64) lose precision.
+RESCALE_HALF_LIVES = 64
+
+# Adds a batch of click counts atomically: one ZINCRBY, O(log n), per code.
+# KEYS: sorted set, epoch. ARGV: now, half-life, max links, then code / clicks pairs.
+RECORD_CLICKS_SCRIPT = """
+local now = tonumber(ARGV[1])
+local half_life = tonumber(ARGV[2])
+local epoch = tonumber(redis.call('GET', KEYS[2]))
+if not epoch then
+    epoch = now
+    redis.call('SET', KEYS[2], epoch)
+end
+local exponent = (now - epoch) / half_life
+if exponent > %(rescale)d then
+    redis.call('ZUNIONSTORE', KEYS[1], 1, KEYS[1], 'WEIGHTS', 2 ^ -exponent)
+    redis.call('SET', KEYS[2], now)
+    exponent = 0
+end
+local weight = 2 ^ exponent
+for i = 4, #ARGV, 2 do
+    redis.call('ZINCRBY', KEYS[1], tonumber(ARGV[i + 1]) * weight, ARGV[i])
+end
+redis.call('ZREMRANGEBYRANK', KEYS[1], 0, -tonumber(ARGV[3]) - 1)
+""" % {"rescale": RESCALE_HALF_LIVES}
+
+
+def record_clicks(redis: SyncRedis, counts: Dict[str, int], now: float | None = None) -> None:
+    """Add a batch of click counts, keyed by shortened URL, to the trending scores."""
+    if not counts:
+        return
+    args: List[float | int | str] = [now or time.time(), settings.trending_half_life, settings.trending_max_links]
+    for shortened_url, clicks in counts.items():
+        args += [shortened_url, clicks]
+    redis.register_script(RECORD_CLICKS_SCRIPT)(keys=[TRENDING_KEY, TRENDING_EPOCH_KEY], args=args)
+
+
+async def trending_urls(redis: Redis, limit: int, now: float | None = None) -> List[Tuple[str, float]]:
+    """The `limit` links with the highest click scores, decayed to now, highest first."""
+    async with redis.pipeline(transaction=True) as pipeline:
+        pipeline.get(TRENDING_EPOCH_KEY)
+        pipeline.zrevrange(TRENDING_KEY, 0, limit - 1, withscores=True)
+        epoch, scores = await pipeline.execute()
+    if epoch is None:
+        return []
+    scale = 2 ** -(((now or time.time()) - float(epoch)) / settings.trending_half_life)
+    return [(shortened_url, score * scale) for shortened_url, score in scores]
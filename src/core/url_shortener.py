@@ -1,18 +1,35 @@
 import hashlib
 import string
+from bisect import bisect_right
+from typing import Iterable, List
+from urllib.parse import urlsplit, urlunsplit
 
 from fastapi import HTTPException, status
 
 from src.models import Url
 from src.core.database import AsyncSession
+from src.core.metrics import CODE_GENERATION_RETRIES
+from src.core.sharding import find_on_shards
 
 ALLOWED_URL_LENGTH = 7
 ALLOWED_CHARACTERS = string.ascii_letters + string.digits
 MAX_RETRIES = 10
+URL_HASH_SIZE = 16
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# 62 ** 43 > 2 ** 256, so these cover every SHA-256 digest.
+_BASE62_POWERS = [62**exponent for exponent in range(44)]
+_BASE62_PAIRS = [first + second for first in ALLOWED_CHARACTERS for second in ALLOWED_CHARACTERS]
+# Number of Base62 digits of the smallest number of each bit length; larger ones may need one more.
+_BASE62_DIGITS_BY_BIT_LENGTH = [0] + [bisect_right(_BASE62_POWERS, 1 << (bits - 1)) for bits in range(1, 257)]
 
 
 async def check_shortened_url_exists(session: AsyncSession, shortened_url: str) -> bool:
-    return await Url.objects(session).get(Url.shortened_url == shortened_url) is not None
+    async def get(shard_session: AsyncSession) -> Url | None:
+        return await Url.objects(shard_session).get(Url.shortened_url == shortened_url)
+
+    return await find_on_shards(session, shortened_url, get) is not None
 
 
 def base62_encode(num: int, characters: str) -> str:
@@ -48,12 +65,52 @@ def create_hashed_url_variant(original_url: str, attempt: int, characters: str)
     return base62_encode(num, characters)
 
 
+def _base62_encode_fixed(num: int, digits: int) -> str:
+    """Encode a number of exactly `digits` Base62 digits, two digits per lookup."""
+    pairs = []
+    for _ in range(digits // 2):
+        num, rem = divmod(num, 3844)
+        pairs.append(_BASE62_PAIRS[rem])
+    if digits % 2:
+        pairs.append(ALLOWED_CHARACTERS[num])
+    return "".join(reversed(pairs))
+
+
+def _digest_prefix(digest: bytes, length: int) -> str:
+    num = int.from_bytes(digest, "big")
+    if num == 0:
+        return ALLOWED_CHARACTERS[0]
+    digits = _BASE62_DIGITS_BY_BIT_LENGTH[num.bit_length()]
+    if num >= _BASE62_POWERS[digits]:
+        digits += 1
+    if digits <= length:
+        return _base62_encode_fixed(num, digits)
+    return _base62_encode_fixed(num // _BASE62_POWERS[digits - length], length)
+
+
+def create_shortened_url_variant(original_url: str, attempt: int, length: int = ALLOWED_URL_LENGTH) -> str:
+    """
+    Return `create_hashed_url_variant(original_url, attempt, ALLOWED_CHARACTERS)[:length]`.
+
+    Instead of encoding the whole 256-bit hash, it finds the number of Base62 digits of the
+    hash, keeps only the leading `length` of them with a single integer division, and
+    encodes that small number.
+    """
+    return _digest_prefix(hashlib.sha256(f"{original_url}{attempt}".encode()).digest(), length)
+
+
+def create_shortened_url_variants(original_urls: Iterable[str], attempt: int, length: int = ALLOWED_URL_LENGTH) -> List[str]:
+    """`create_shortened_url_variant` for many URLs at once, for bulk creation."""
+    sha256 = hashlib.sha256
+    return [_digest_prefix(sha256(f"{original_url}{attempt}".encode()).digest(), length) for original_url in original_urls]
+
+
 async def generate_unique_shortened_url(session: AsyncSession, original_url: str, length: int = ALLOWED_URL_LENGTH, max_retries: int = MAX_RETRIES) -> str:
     for attempt in range(max_retries):
-        hashed_url_variant = create_hashed_url_variant(original_url, attempt, ALLOWED_CHARACTERS)
-        shortened_fixed_length = str(hashed_url_variant[:length])
+        shortened_fixed_length = create_shortened_url_variant(original_url, attempt, length)
         if not await check_shortened_url_exists(session, shortened_fixed_length):
             return shortened_fixed_length
+        CODE_GENERATION_RETRIES.inc()
     raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Failed to generate a unique shortened URL after multiple attempts.")
 
 
@@ -62,3 +119,26 @@ async def ensure_valid_and_unique_alias(alias: str, session: AsyncSession) -> No
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Alias must be at least 7 characters long and only contain alphanumeric characters.")
     if await check_shortened_url_exists(session, alias):
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="The provided alias is already in use.")
+
+
+def normalize_url(original_url: str) -> str:
+    """
+    The form of a URL used to spot repeats: scheme and host lowercased, the default port dropped
+    and an empty path written as "/". The path, query and fragment are kept as they are.
+    """
+    parts = urlsplit(original_url)
+    scheme = parts.scheme.lower()
+    netloc = parts.hostname or ""
+    if ":" in netloc:
+        netloc = f"[{netloc}]"
+    if parts.port is not None and parts.port != _DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{parts.port}"
+    if parts.username is not None:
+        userinfo = parts.username if parts.password is None else f"{parts.username}:{parts.password}"
+        netloc = f"{userinfo}@{netloc}"
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, parts.fragment))
+
+
+def url_hash(original_url: str) -> bytes:
+    """Fixed-size digest of the normalized URL, stored in `Url.url_hash`."""
+    return hashlib.blake2b(normalize_url(original_url).encode(), digest_size=URL_HASH_SIZE).digest()
@@ -0,0 +1,65 @@
+"""
+Redirect-only ASGI application for edge nodes:
+
+    gunicorn -c python:src.gunicorn_conf src.edge:app
+
+Serves `GET /{shortened_url}` with the same cache lookup and click pipeline as the API's redirect
+endpoint, without the management API, admin interface, authentication or dependency injection, so
+redirect nodes start fast and can be scaled independently of the API.
+"""
+from logging.config import dictConfig
+
+from redis.asyncio import Redis
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from src.celery.clicks import click_queue
+from src.core.config import settings
+from src.core.database import AsyncSessionLocal
+from src.core.metrics import MetricsMiddleware, metrics
+from src.core.redirects import redirect_response, resolve_redirect
+from src.core.outbox import invalidation_listener
+from src.core.visitors import visitor_id, visitor_log
+from src.logging import LogConfig, start_log_listener
+
+dictConfig(LogConfig().dict())
+log_listener = start_log_listener()
+
+# One connection pool for the whole process.
+redis = Redis.from_url(f"redis://{settings.redis_host}:{settings.redis_port}", encoding="utf-8", decode_responses=True)
+
+
+async def redirect(request: Request) -> Response:
+    shortened_url = request.path_params["shortened_url"]
+    async with AsyncSessionLocal() as session:
+        redirect = await resolve_redirect(shortened_url, redis, session)
+    if redirect is None:
+        return JSONResponse({"detail": "URL not found."}, status_code=404)
+    visitor = visitor_id(request.client and request.client.host, request.headers.get("user-agent"))
+    return redirect_response(shortened_url, redirect, visitor)
+
+
+def startup() -> None:
+    invalidation_listener.start()
+
+
+async def shutdown() -> None:
+    await click_queue.close()
+    await visitor_log.close()
+    await invalidation_listener.close()
+    await redis.close()
+    log_listener.stop()
+
+
+app = Starlette(
+    routes=[
+        # Short codes are alphanumeric, so they never collide with this path.
+        Route("/-/metrics", metrics),
+        Route("/{shortened_url}", redirect),
+    ],
+    on_startup=[startup],
+    on_shutdown=[shutdown],
+)
+app.add_middleware(MetricsMiddleware)
@@ -0,0 +1,49 @@
+"""
+Gunicorn configuration of the production server:
+
+    gunicorn -c python:src.gunicorn_conf src.main:app
+
+Runs one uvicorn worker per available core, on uvloop and httptools. The application is imported
+by each worker after the fork (no `preload_app`), since neither the connection pools nor the
+background threads of the click and log queues survive a fork. On SIGTERM, workers stop accepting
+connections, finish in-flight requests and run the shutdown handlers, which flush pending click
+events, within `SERVER_GRACEFUL_TIMEOUT` seconds. Behind a load balancer, list its addresses in
+`SERVER_FORWARDED_ALLOW_IPS`, so the client address of requests (used to count unique visitors) is
+read from its X-Forwarded-For header rather than being the balancer's.
+"""
+import os
+import shutil
+from typing import Any
+
+from uvicorn.workers import UvicornWorker
+
+from src.core.config import settings
+
+
+class UvloopWorker(UvicornWorker):
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on", "proxy_headers": True}
+
+
+bind = f"{settings.server_host}:{settings.server_port}"
+workers = settings.server_workers or len(os.sched_getaffinity(0))
+worker_class = "src.gunicorn_conf.UvloopWorker"
+keepalive = settings.server_keepalive
+backlog = settings.server_backlog
+graceful_timeout = settings.server_graceful_timeout
+forwarded_allow_ips = settings.server_forwarded_allow_ips
+timeout = settings.server_graceful_timeout + 30
+
+# Workers write their Prometheus samples to a shared directory, aggregated by `/metrics`.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", str(settings.server_metrics_dir))
+
+
+def on_starting(server: Any) -> None:
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+
+
+def child_exit(server: Any, worker: Any) -> None:
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
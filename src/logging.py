@@ -1,8 +1,46 @@
+import logging
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+
 from pydantic import BaseModel
 
 from src.core.config import settings
 
 
+class SampledLogger(logging.LoggerAdapter):
+    """
+    Logger for per-request records on hot routes, keeping a `rate` share of the records below
+    WARNING. Warnings and errors are always kept. Sampling happens before the record is built, so
+    dropped records cost a random draw.
+    """
+
+    def __init__(self, logger: logging.Logger, rate: float) -> None:
+        super().__init__(logger, {})
+        self.rate = rate
+
+    def isEnabledFor(self, level: int) -> bool:
+        return self.logger.isEnabledFor(level) and (level >= logging.WARNING or random.random() < self.rate)
+
+
+def get_sampled_logger(name: str) -> SampledLogger:
+    return SampledLogger(logging.getLogger(name), settings.log_request_sample_rate)
+
+
+class LogQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Leave the record untouched: formatting happens on the listener thread, not the request's.
+        return record
+
+
+class RootLogListener(QueueListener):
+    """Drains the queue into the original root handlers, and puts them back on the root logger when stopped."""
+
+    def stop(self) -> None:
+        super().stop()
+        logging.getLogger().handlers = list(self.handlers)
+
+
 class LogConfig(BaseModel):
     LOGGER_NAME: str = "root"
     LOG_FORMAT: str = "%(levelprefix)s | %(asctime)s | %(message)s"
@@ -28,3 +66,17 @@ class LogConfig(BaseModel):
     loggers = {
         LOGGER_NAME: {"handlers": ["default"], "level": LOG_LEVEL},
     }
+
+
+def start_log_listener() -> RootLogListener:
+    """
+    Put the root handlers behind a queue drained by a background thread, so logging callers only
+    pay for an enqueue and never block on the stream. Stop the returned listener to flush it and
+    restore the root handlers.
+    """
+    root = logging.getLogger()
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = RootLogListener(log_queue, *root.handlers, respect_handler_level=True)
+    root.handlers = [LogQueueHandler(log_queue)]
+    listener.start()
+    return listener
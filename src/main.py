@@ -3,19 +3,24 @@ from logging.config import dictConfig
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi_pagination import add_pagination
-from sqladmin import Admin
 
-from src.admin import AdminAuth, UserAdmin, UrlAdmin
+from src.celery.clicks import click_queue
 from src.core.config import settings
 from src.core.database import async_engine
-from src.logging import LogConfig
+from src.core.metrics import MetricsMiddleware, metrics
+from src.core.profiling import ProfiledJSONResponse, ProfilingMiddleware
+from src.core.outbox import invalidation_listener
+from src.core.visitors import visitor_log
+from src.logging import LogConfig, start_log_listener
 from src.urls import router
 
 dictConfig(LogConfig().dict())
+log_listener = start_log_listener()
 
-app = FastAPI()
+app = FastAPI(default_response_class=ProfiledJSONResponse)
 
 app.include_router(router)
+app.add_route("/metrics", metrics, include_in_schema=False)
 
 origins = [
     settings.server_url,
@@ -29,10 +34,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.profiling_sample_rate or settings.profiling_header_enabled:
+    app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 add_pagination(app)
 
-authentication_backend = AdminAuth(secret_key="")
-admin = Admin(app=app, engine=async_engine, authentication_backend=authentication_backend)
+if settings.admin_enabled:
+    # SQLAdmin and WTForms are only imported by the nodes serving the admin interface.
+    from src.admin import AdminAuth, KeysetAdmin, UserAdmin, UrlAdmin
+
+    authentication_backend = AdminAuth(secret_key="")
+    admin = KeysetAdmin(app=app, engine=async_engine, authentication_backend=authentication_backend)
+
+    admin.add_view(UserAdmin)
+    admin.add_view(UrlAdmin)
+
+
+@app.on_event("startup")
+def listen_for_invalidations() -> None:
+    invalidation_listener.start()
+
+
+@app.on_event("shutdown")
+async def flush_click_events() -> None:
+    await click_queue.close()
+    await visitor_log.close()
+    await invalidation_listener.close()
+
 
-admin.add_view(UserAdmin)
-admin.add_view(UrlAdmin)
+@app.on_event("shutdown")
+def stop_log_listener() -> None:
+    log_listener.stop()
@@ -1,2 +1,3 @@
 from .user import User
-from .url import Url
+from .url import RedirectType, Url
+from .cache_invalidation import CacheInvalidation
@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Identity
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.core.database import SQLBase
+from src.helpers.sql import utcnow
+
+
+class CacheInvalidation(SQLBase):
+    """
+    Outbox of links whose cached redirects must be invalidated, written in the transaction that
+    changes them and drained by `relay_cache_invalidations` (see src/core/outbox.py).
+    """
+
+    id: Mapped[int] = mapped_column(BigInteger, Identity(), primary_key=True)
+    shortened_url: Mapped[str]
+    created_at: Mapped[datetime] = mapped_column(server_default=utcnow())
+
+    def __str__(self) -> str:
+        return f"Invalidation of {self.shortened_url}"
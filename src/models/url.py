@@ -1,15 +1,30 @@
 import typing
+from datetime import datetime
+from enum import Enum
 from uuid import UUID
 
-from sqlalchemy import ForeignKey, CheckConstraint
+from sqlalchemy import ForeignKey, CheckConstraint, Index, LargeBinary, SmallInteger, or_, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from src.core.database import DatedTableMixin, SQLBase
+from src.core.database import AsyncSession, DatedTableMixin, Objects, SQLBase
+from src.helpers.sql import utcnow
 
 if typing.TYPE_CHECKING:
     from src.models import User
 
 
+class RedirectType(int, Enum):
+    """Status code of a link's redirects. Permanent redirects may be cached by browsers and CDNs."""
+
+    moved_permanently = 301
+    found = 302
+    permanent_redirect = 308
+
+    @property
+    def permanent(self) -> bool:
+        return self != RedirectType.found
+
+
 class Url(SQLBase, DatedTableMixin):
     original_url: Mapped[str]
     shortened_url: Mapped[str] = mapped_column(unique=True, index=True)
@@ -17,8 +32,34 @@ class Url(SQLBase, DatedTableMixin):
     clicks: Mapped[int] = mapped_column(default=0)
     owner_id: Mapped[UUID] = mapped_column(ForeignKey("user.id"), index=True)
     owner: Mapped["User"] = relationship("User", back_populates="urls")
+    expires_at: Mapped[datetime | None] = mapped_column(default=None)
+    max_clicks: Mapped[int | None] = mapped_column(default=None)
+    redirect_type: Mapped[int] = mapped_column(SmallInteger, default=RedirectType.found, server_default=text("302"))
+    # Digest of the normalized original URL, held by the owner's active link for it, if any.
+    url_hash: Mapped[bytes | None] = mapped_column(LargeBinary(16), default=None)
 
-    __table_args__ = (CheckConstraint('clicks >= 0', name='clicks_positive'),)
+    __table_args__ = (
+        CheckConstraint('clicks >= 0', name='clicks_positive'),
+        CheckConstraint('max_clicks > 0', name='max_clicks_positive'),
+        CheckConstraint('redirect_type IN (301, 302, 308)', name='redirect_type_valid'),
+        # Only active links with an expiry are indexed, so the expiry sweep stays O(expired rows).
+        Index("ix_url_expires_at_active", "expires_at", postgresql_where=text("is_active AND expires_at IS NOT NULL")),
+        # Keyset paging of the admin list view, newest first.
+        Index("ix_url_created_at_id", "created_at", "id"),
+        # Idempotent creates find an owner's active link for a URL with one lookup.
+        Index("ix_url_owner_id_url_hash", "owner_id", "url_hash", unique=True, postgresql_where=text("is_active")),
+    )
 
     def __str__(self) -> str:
         return f"URL {self.shortened_url}"
+
+    @classmethod
+    def redirectables(cls, session: AsyncSession) -> Objects["Url"]:
+        """Active links that have neither expired nor used up their clicks."""
+        return Objects(
+            cls,
+            session,
+            cls.is_active == True,  # noqa: E712
+            or_(cls.expires_at == None, cls.expires_at > utcnow()),  # noqa: E711
+            or_(cls.max_clicks == None, cls.clicks < cls.max_clicks),  # noqa: E711
+        )
@@ -1,7 +1,7 @@
 import typing
 from typing import List
 
-from sqlalchemy import select
+from sqlalchemy import Index, select, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.core.database import DatedTableMixin, Objects, AsyncSession, SQLBase
@@ -15,8 +15,15 @@ class User(SQLBase, DatedTableMixin):
     password: Mapped[str]
     is_active: Mapped[bool] = mapped_column(default=True)
     is_superuser: Mapped[bool] = mapped_column(default=False)
+    # New links are cached on creation under the `high_traffic` write-through policy.
+    is_high_traffic: Mapped[bool] = mapped_column(default=False, server_default=text("false"))
     urls: Mapped[List["Url"]] = relationship("Url", back_populates="owner")
 
+    __table_args__ = (
+        # Keyset paging of the admin list view, newest first.
+        Index("ix_user_created_at_id", "created_at", "id"),
+    )
+
     def __str__(self) -> str:
         return self.email
 
@@ -25,11 +32,17 @@ class User(SQLBase, DatedTableMixin):
         return Objects(cls, session, User.is_active == True)  # noqa: E712
 
     async def get_urls(self, session: AsyncSession, include_deleted: bool = False) -> List["Url"]:
+        from src.core.sharding import gather_shards
         from src.models import Url
 
         statement = select(Url).where(Url.owner_id == self.id)
         if not include_deleted:
             statement = statement.where(Url.is_active == True)
-        result = await session.execute(statement)
-        urls = result.scalars().all()
-        return urls
+
+        async def get_shard_urls(shard_session: AsyncSession) -> List["Url"]:
+            result = await shard_session.execute(statement)
+            return result.scalars().all()
+
+        # While resharding, a row being moved may briefly be on two shards.
+        urls = {url.shortened_url: url for shard_urls in await gather_shards(session, get_shard_urls) for url in shard_urls}
+        return list(urls.values())
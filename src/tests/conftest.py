@@ -1,18 +1,17 @@
 from typing import AsyncGenerator, Generator
 
 import pytest
-from unittest.mock import MagicMock, Mock, patch
+from unittest.mock import MagicMock, patch
 from httpx import AsyncClient
 from sqlalchemy.pool import NullPool
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker, AsyncEngine
-from sqlalchemy.exc import NoResultFound
 from redis.asyncio import Redis
 
 from src.api.dependencies import db_session
+from src.celery.clicks import click_queue
 from src.core.database import SQLBase
 from src.core.config import settings
 from src.main import app
-from src.models.url import Url
 
 
 @pytest.fixture
@@ -45,7 +44,9 @@ async def reset_database(engine: AsyncEngine) -> AsyncGenerator[None, None]:
 
 @pytest.fixture
 async def session(engine: AsyncEngine) -> AsyncGenerator[AsyncSession, None]:
-    AsyncTestingSessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession, future=True)
+    AsyncTestingSessionLocal = async_sessionmaker(
+        autocommit=False, autoflush=False, expire_on_commit=False, bind=engine, class_=AsyncSession, future=True
+    )
     async with AsyncTestingSessionLocal() as session:
         yield session
 
@@ -63,25 +64,7 @@ async def client() -> AsyncGenerator[AsyncClient, None]:
         yield client
 
 
-async def _increment_click_count(shortened_url: str, session: AsyncSession):
-    async with session.begin():
-        url = await Url.objects.get(Url.shortened_url == shortened_url)
-        if url:
-            url.clicks += 1
-            await session.commit()
-            await session.refresh(url)
-            return url.clicks
-        raise NoResultFound(f"No Url found for shortened_url: {shortened_url}")
-
-
 @pytest.fixture()
-async def mock_increment_click_count(session: AsyncSession):
-    mock_task = MagicMock()
-
-    async def mock_delay(shortened_url):
-        return await _increment_click_count(shortened_url, session)
-
-    mock_task.delay.side_effect = mock_delay
-
-    with patch('src.api.v1.routers.redirect.increment_click_count', new=mock_task):
-        yield
+def mock_increment_click_count() -> Generator[MagicMock, None, None]:
+    with patch.object(click_queue, "_publish") as mock_publish:
+        yield mock_publish
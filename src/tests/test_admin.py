@@ -0,0 +1,139 @@
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+from typing import AsyncGenerator
+from unittest.mock import patch
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from starlette.datastructures import URL
+
+from src.admin import KeysetPagination, UrlAdmin
+from src.core.security import PasswordManager
+from src.main import admin
+from src.models import CacheInvalidation, Url, User
+
+ADMIN_EMAIL = "admin@test.com"
+ADMIN_PASSWORD = "password"
+
+
+class TestKeysetPaging:
+    def test_cursor_round_trip(self):
+        url = UrlAdmin.model(created_at=datetime(2026, 10, 18, 12, 30, 15, 123456), id=uuid4())
+        view = UrlAdmin()
+        assert view.parse_cursor(view.cursor(url)) == (url.created_at, url.id)
+
+    def test_invalid_cursor(self):
+        with pytest.raises(HTTPException) as error:
+            UrlAdmin().parse_cursor("not-a-cursor")
+        assert error.value.status_code == 400
+
+    def test_pagination_links_neighbours_by_cursor(self):
+        pagination = KeysetPagination(rows=[], page=3, page_size=10, count=100, previous_cursor="first", next_cursor="last")
+        pagination.add_pagination_urls(URL("http://test/admin/url/list?page=3&after=old"))
+        assert pagination.previous_page.url == "http://test/admin/url/list?page=2&before=first"
+        assert pagination.next_page.url == "http://test/admin/url/list?page=4&after=last"
+
+    def test_last_page_has_no_next_link(self):
+        pagination = KeysetPagination(rows=[], page=1, page_size=10, count=5)
+        pagination.add_pagination_urls(URL("http://test/admin/url/list"))
+        assert not pagination.has_previous
+        assert not pagination.has_next
+
+
+@pytest.fixture
+async def admin_client(client: AsyncClient, engine: AsyncEngine) -> AsyncGenerator[AsyncClient, None]:
+    """A client logged in to the admin interface, which reads the test database."""
+    test_sessionmaker = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    with ExitStack() as patches:
+        patches.enter_context(patch("src.admin.AsyncSessionLocal", test_sessionmaker))
+        for view in admin.views:
+            patches.enter_context(patch.object(view, "sessionmaker", test_sessionmaker))
+        response = await client.post("/admin/login", data={"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+        assert response.status_code == 302
+        yield client
+
+
+@pytest.mark.anyio
+class TestKeysetListRoute:
+    CODES = [f"admin{index:02d}" for index in range(5)]
+
+    @pytest.fixture(autouse=True)
+    async def setup_links(self, session: AsyncSession) -> None:
+        user = await User.objects(session).create(
+            {
+                "email": ADMIN_EMAIL,
+                "password": PasswordManager.get_password_hash(ADMIN_PASSWORD),
+                "is_active": True,
+                "is_superuser": True,
+            }
+        )
+        created_at = datetime(2026, 10, 18, 12)
+        for index, code in enumerate(self.CODES):
+            await Url.objects(session).create(
+                {
+                    "original_url": f"https://example.com/{code}",
+                    "shortened_url": code,
+                    "owner_id": user.id,
+                    "created_at": created_at + timedelta(minutes=index),
+                }
+            )
+
+    async def listed(self, client: AsyncClient, **params: str) -> list:
+        response = await client.get("/admin/url/list", params={"pageSize": "2", **params})
+        assert response.status_code == 200
+        return [code for code in self.CODES if code in response.text]
+
+    async def test_pages_by_cursor(self, admin_client, session):
+        view = UrlAdmin()
+        urls = {url.shortened_url: url for url in await Url.objects(session).all()}
+        assert await self.listed(admin_client) == ["admin03", "admin04"]
+        assert await self.listed(admin_client, page="2", after=view.cursor(urls["admin03"])) == ["admin01", "admin02"]
+        assert await self.listed(admin_client, page="3", after=view.cursor(urls["admin01"])) == ["admin00"]
+        assert await self.listed(admin_client, page="2", before=view.cursor(urls["admin00"])) == ["admin01", "admin02"]
+        assert await self.listed(admin_client, page="1", before=view.cursor(urls["admin02"])) == ["admin03", "admin04"]
+
+    async def test_invalid_cursor_is_rejected(self, admin_client):
+        response = await admin_client.get("/admin/url/list", params={"after": "not-a-cursor"})
+        assert response.status_code == 400
+
+
+@pytest.mark.anyio
+class TestUrlEdits:
+    @pytest.fixture(autouse=True)
+    async def setup_link(self, session: AsyncSession) -> None:
+        user = await User.objects(session).create(
+            {"email": ADMIN_EMAIL, "password": PasswordManager.get_password_hash(ADMIN_PASSWORD), "is_active": True}
+        )
+        await Url.objects(session).create(
+            {"original_url": "https://example.com", "shortened_url": "edited1", "owner_id": user.id}
+        )
+
+    async def edit(self, session: AsyncSession, data: dict) -> None:
+        url = await Url.objects(session).get(Url.shortened_url == "edited1")
+        await UrlAdmin().on_model_change(data, url, False)
+        for field, value in data.items():
+            setattr(url, field, value)
+        await session.commit()
+
+    async def test_edit_queues_invalidation(self, session):
+        await self.edit(session, {"original_url": "https://example.com/moved", "is_active": True})
+        invalidations = await CacheInvalidation.objects(session).all()
+        assert [invalidation.shortened_url for invalidation in invalidations] == ["edited1"]
+
+    async def test_edit_keeping_the_redirect_queues_nothing(self, session):
+        await self.edit(session, {"original_url": "https://example.com", "clicks": 3})
+        assert await CacheInvalidation.objects(session).all() == []
+
+    async def test_delete_queues_invalidation(self, engine, session):
+        url = await Url.objects(session).get(Url.shortened_url == "edited1")
+        # Loaded in another session, as sqladmin does.
+        session.expunge(url)
+        view = UrlAdmin()
+        with patch.object(view, "sessionmaker", async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)):
+            await view.delete_model(url)
+        assert await Url.objects(session).all() == []
+        invalidations = await CacheInvalidation.objects(session).all()
+        assert [invalidation.shortened_url for invalidation in invalidations] == ["edited1"]
@@ -0,0 +1,258 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.celery.cdn_logs import count_clicks
+from src.celery.clicks import ClickEventQueue
+from src.celery.consumer import ClickBatcher
+from src.celery.journal import ClickJournal, read_records
+from src.celery.utils import run_async
+from src.core.config import ClickOverflowPolicy
+
+
+def build_journal(directory: Path, name: str | None = "test", segment_size: int = 4096, max_segments: int = 4) -> ClickJournal:
+    return ClickJournal(
+        directory=directory,
+        segment_size=segment_size,
+        max_segments=max_segments,
+        fsync_every=10,
+        fsync_interval=1.0,
+        name=name,
+    )
+
+
+def build_queue(
+    publish: MagicMock,
+    journal: ClickJournal,
+    max_size: int = 100,
+    policy: ClickOverflowPolicy = ClickOverflowPolicy.spill,
+    batch_interval: float = 0.05,
+) -> ClickEventQueue:
+    return ClickEventQueue(
+        publish=publish,
+        max_size=max_size,
+        batch_size=50,
+        batch_interval=batch_interval,
+        publish_retries=1,
+        overflow_policy=policy,
+        journal=journal,
+    )
+
+
+def published_counts(publish: MagicMock) -> Dict[str, int]:
+    totals: Dict[str, int] = {}
+    for call in publish.call_args_list:
+        for shortened_url, clicks in call.args[0].items():
+            totals[shortened_url] = totals.get(shortened_url, 0) + clicks
+    return totals
+
+
+def journaled_counts(directory: Path) -> Dict[str, int]:
+    totals: Dict[str, int] = {}
+    for segment in sorted(directory.glob("journal-*/*.seg")):
+        for record in read_records(segment):
+            for shortened_url, clicks in record.items():
+                totals[shortened_url] = totals.get(shortened_url, 0) + clicks
+    return totals
+
+
+@pytest.mark.anyio
+class TestClickEventQueue:
+    async def test_clicks_are_published_in_aggregated_batches(self, tmp_path):
+        publish = MagicMock()
+        queue = build_queue(publish, build_journal(tmp_path))
+        for _ in range(3):
+            queue.put("aaaaaaa")
+        queue.put("bbbbbbb")
+        await asyncio.sleep(0.2)
+        assert publish.call_count == 1
+        assert published_counts(publish) == {"aaaaaaa": 3, "bbbbbbb": 1}
+        await queue.close()
+
+    async def test_close_flushes_pending_clicks(self, tmp_path):
+        publish = MagicMock()
+        queue = build_queue(publish, build_journal(tmp_path))
+        queue.put("aaaaaaa")
+        await queue.close()
+        assert published_counts(publish) == {"aaaaaaa": 1}
+
+    async def test_failed_publish_spills_to_journal(self, tmp_path):
+        publish = MagicMock(side_effect=ConnectionError("broker down"))
+        queue = build_queue(publish, build_journal(tmp_path))
+        queue.put("aaaaaaa")
+        await asyncio.sleep(0.5)
+        assert publish.call_count == 2
+        assert queue.spilled == 1
+        await queue.close()
+        assert journaled_counts(tmp_path) == {"aaaaaaa": 1}
+
+    async def test_full_queue_drops_clicks(self, tmp_path):
+        publish = MagicMock()
+        queue = build_queue(publish, build_journal(tmp_path), max_size=2, policy=ClickOverflowPolicy.drop)
+        for _ in range(5):
+            queue.put("aaaaaaa")
+        assert queue.dropped == 3
+        await queue.close()
+        assert published_counts(publish) == {"aaaaaaa": 2}
+
+    async def test_full_queue_spills_clicks_to_journal(self, tmp_path):
+        publish = MagicMock()
+        queue = build_queue(publish, build_journal(tmp_path), max_size=2)
+        for _ in range(5):
+            queue.put("aaaaaaa")
+        await queue.close()
+        assert queue.spilled == 3
+        assert published_counts(publish) == {"aaaaaaa": 2}
+        assert journaled_counts(tmp_path) == {"aaaaaaa": 3}
+
+    async def test_slow_publish_is_not_sent_twice(self, tmp_path):
+        publish = MagicMock(side_effect=lambda counts: time.sleep(0.4))
+        queue = build_queue(publish, build_journal(tmp_path))
+        queue.put("aaaaaaa")
+        await asyncio.sleep(0.6)
+        assert publish.call_count == 1
+        await queue.close()
+        assert publish.call_count == 1
+
+    async def test_close_waits_for_batch_being_published(self, tmp_path):
+        publish = MagicMock(side_effect=lambda counts: time.sleep(0.3))
+        queue = build_queue(publish, build_journal(tmp_path))
+        queue.put("aaaaaaa")
+        await asyncio.sleep(0.1)
+        await queue.close()
+        assert publish.call_count == 1
+        assert published_counts(publish) == {"aaaaaaa": 1}
+
+    async def test_close_publishes_batch_being_collected(self, tmp_path):
+        publish = MagicMock()
+        queue = build_queue(publish, build_journal(tmp_path), batch_interval=5)
+        queue.put("aaaaaaa")
+        queue.put("bbbbbbb")
+        # The sender has taken both clicks off the queue and waits for more.
+        await asyncio.sleep(0.1)
+        await queue.close()
+        assert published_counts(publish) == {"aaaaaaa": 1, "bbbbbbb": 1}
+
+    async def test_journaled_clicks_are_replayed_after_broker_outage_and_restart(self, tmp_path):
+        broker_down = MagicMock(side_effect=ConnectionError("broker down"))
+        crashed_queue = build_queue(broker_down, build_journal(tmp_path, name="crashed"))
+        for _ in range(3):
+            crashed_queue.put("aaaaaaa")
+        crashed_queue.put("bbbbbbb")
+        await crashed_queue.close()
+        assert journaled_counts(tmp_path) == {"aaaaaaa": 3, "bbbbbbb": 1}
+
+        broker_up = MagicMock()
+        restarted_queue = build_queue(broker_up, build_journal(tmp_path, name="restarted"))
+        restarted_queue.put("ccccccc")
+        await asyncio.sleep(0.2)
+        assert published_counts(broker_up) == {"aaaaaaa": 3, "bbbbbbb": 1, "ccccccc": 1}
+        assert journaled_counts(tmp_path) == {}
+        await restarted_queue.close()
+
+
+class TestClickJournal:
+    def test_replay_publishes_one_message_per_segment(self, tmp_path):
+        journal = build_journal(tmp_path, segment_size=64)
+        for _ in range(4):
+            journal.append({"aaaaaaa": 1})
+        publish = MagicMock()
+        assert journal.replay(publish) == 4
+        assert publish.call_count == 2
+        assert published_counts(publish) == {"aaaaaaa": 4}
+        assert not journal.pending
+
+    def test_failed_replay_keeps_segments(self, tmp_path):
+        journal = build_journal(tmp_path)
+        journal.append({"aaaaaaa": 2})
+        with pytest.raises(ConnectionError):
+            journal.replay(MagicMock(side_effect=ConnectionError("broker down")))
+        assert journaled_counts(tmp_path) == {"aaaaaaa": 2}
+
+    def test_size_cap_discards_oldest_segments(self, tmp_path):
+        journal = build_journal(tmp_path, segment_size=32, max_segments=2)
+        for _ in range(6):
+            journal.append({"aaaaaaa": 1})
+        journal.close()
+        assert len(list(tmp_path.glob("journal-*/*.seg"))) == 2
+        assert journal.discarded == 4
+        assert journaled_counts(tmp_path) == {"aaaaaaa": 2}
+
+    def test_torn_record_is_ignored(self, tmp_path):
+        journal = build_journal(tmp_path)
+        journal.append({"aaaaaaa": 1})
+        journal.append({"bbbbbbb": 1})
+        journal.close()
+        segment = next(tmp_path.glob("journal-*/*.seg"))
+        data = bytearray(segment.read_bytes())
+        data[-4096 + 30] ^= 0xFF
+        segment.write_bytes(bytes(data))
+        assert journaled_counts(tmp_path) == {"aaaaaaa": 1}
+
+    def test_journal_of_live_process_is_not_adopted(self, tmp_path):
+        live = build_journal(tmp_path, name="live")
+        live.append({"aaaaaaa": 1})
+        publish = MagicMock()
+        assert build_journal(tmp_path, name="other").replay(publish) == 0
+        assert publish.call_count == 0
+        live.close()
+
+    def test_journal_of_previous_run_with_the_same_pid_is_adopted(self, tmp_path):
+        previous_run = build_journal(tmp_path, name=None)
+        previous_run.append({"aaaaaaa": 1})
+        previous_run.close()
+        publish = MagicMock()
+        assert build_journal(tmp_path, name=None).replay(publish) == 1
+        assert published_counts(publish) == {"aaaaaaa": 1}
+
+
+class TestClickBatcher:
+    def test_batch_is_applied_in_one_transaction_and_acked(self):
+        apply = MagicMock()
+        batcher = ClickBatcher(apply, max_messages=3)
+        messages = [MagicMock() for _ in range(3)]
+        batcher.add({"aaaaaaa": 2}, messages[0])
+        batcher.add({"bbbbbbb": 1}, messages[1])
+        assert apply.call_count == 0
+        batcher.add({"aaaaaaa": 1}, messages[2])
+        apply.assert_called_once_with({"aaaaaaa": 3, "bbbbbbb": 1})
+        assert all(message.ack.call_count == 1 for message in messages)
+
+    def test_failed_batch_is_requeued(self):
+        batcher = ClickBatcher(MagicMock(side_effect=RuntimeError("database down")), max_messages=10)
+        message = MagicMock()
+        batcher.add({"aaaaaaa": 1}, message)
+        batcher.flush()
+        assert message.requeue.call_count == 1
+        assert message.ack.call_count == 0
+
+
+class TestRunAsync:
+    def test_task_threads_share_one_event_loop(self):
+        async def sleep_and_report() -> asyncio.AbstractEventLoop:
+            await asyncio.sleep(0.2)
+            return asyncio.get_running_loop()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            loops = list(executor.map(lambda _: run_async(sleep_and_report()), range(10)))
+        assert time.perf_counter() - start < 1
+        assert len(set(loops)) == 1
+
+
+class TestCdnLogs:
+    def test_count_clicks(self):
+        lines = [
+            '203.0.113.7 - - [18/Oct/2026:10:00:00 +0000] "GET /api/v1/redirect/aZ3kQ9x HTTP/1.1" 308 0 "-" "curl/8.0"',
+            '203.0.113.8 - - [18/Oct/2026:10:00:01 +0000] "GET /aZ3kQ9x?utm_source=mail HTTP/2.0" 308 0 "-" "curl/8.0"',
+            '203.0.113.9 - - [18/Oct/2026:10:00:02 +0000] "GET /b7Hq2Lm HTTP/1.1" 302 0 "-" "curl/8.0"',
+            '203.0.113.9 - - [18/Oct/2026:10:00:03 +0000] "GET /missing HTTP/1.1" 404 31 "-" "curl/8.0"',
+            '203.0.113.9 - - [18/Oct/2026:10:00:04 +0000] "HEAD /b7Hq2Lm HTTP/1.1" 302 0 "-" "curl/8.0"',
+            '203.0.113.9 - - [18/Oct/2026:10:00:05 +0000] "GET /api/v1/urls HTTP/1.1" 200 512 "-" "curl/8.0"',
+        ]
+        assert count_clicks(lines) == {"aZ3kQ9x": 2, "b7Hq2Lm": 1}
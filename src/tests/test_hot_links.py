@@ -0,0 +1,45 @@
+import time
+
+from src.core.cache import CachedRedirect
+from src.core.hot_links import HotLinkSnapshot, write_snapshot
+
+REDIRECTS = {
+    f"hot{index:04d}": CachedRedirect(f"https://example.com/{index}", 308 if index % 2 else 302, None if index % 2 else 0)
+    for index in range(1000)
+}
+
+
+class TestHotLinkSnapshot:
+    def test_lookup(self, tmp_path):
+        path = tmp_path / "hot-links"
+        write_snapshot(path, REDIRECTS)
+        snapshot = HotLinkSnapshot(path, max_age=60)
+        assert all(snapshot.get(code) == redirect for code, redirect in REDIRECTS.items())
+        assert snapshot.get("missing") is None
+
+    def test_replaced_snapshot_is_remapped(self, tmp_path):
+        path = tmp_path / "hot-links"
+        write_snapshot(path, REDIRECTS)
+        snapshot = HotLinkSnapshot(path, max_age=60)
+        assert snapshot.get("hot0001") is not None
+        write_snapshot(path, {"newhot1": CachedRedirect("https://example.com/new")})
+        snapshot._checked_at = 0
+        assert snapshot.get("hot0001") is None
+        assert snapshot.get("newhot1") == CachedRedirect("https://example.com/new")
+
+    def test_revoked_codes_are_not_served_until_a_newer_snapshot(self, tmp_path):
+        path = tmp_path / "hot-links"
+        write_snapshot(path, REDIRECTS, built_at=time.time() - 1)
+        snapshot = HotLinkSnapshot(path, max_age=60)
+        snapshot.revoke(["hot0001"])
+        assert snapshot.get("hot0001") is None
+        assert snapshot.get("hot0002") is not None
+        write_snapshot(path, REDIRECTS, built_at=time.time() + 1)
+        snapshot._checked_at = 0
+        assert snapshot.get("hot0001") == REDIRECTS["hot0001"]
+
+    def test_stale_or_missing_snapshot_is_ignored(self, tmp_path):
+        path = tmp_path / "hot-links"
+        assert HotLinkSnapshot(path, max_age=60).get("hot0001") is None
+        write_snapshot(path, REDIRECTS, built_at=time.time() - 120)
+        assert HotLinkSnapshot(path, max_age=60).get("hot0001") is None
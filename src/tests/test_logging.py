@@ -0,0 +1,55 @@
+import logging
+
+from src.logging import SampledLogger, start_log_listener
+
+
+class ListHandler(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.messages.append(self.format(record))
+
+
+class TestSampledLogger:
+    def test_sampling_keeps_warnings_and_errors(self, caplog):
+        logger = SampledLogger(logging.getLogger("test.sampled"), rate=0)
+        with caplog.at_level(logging.DEBUG, logger="test.sampled"):
+            logger.info("dropped %s", "info")
+            logger.warning("kept %s", "warning")
+            logger.error("kept %s", "error")
+        assert [record.getMessage() for record in caplog.records] == ["kept warning", "kept error"]
+
+    def test_full_rate_keeps_everything(self, caplog):
+        logger = SampledLogger(logging.getLogger("test.sampled"), rate=1)
+        with caplog.at_level(logging.DEBUG, logger="test.sampled"):
+            logger.info("kept %s", "info")
+        assert [record.getMessage() for record in caplog.records] == ["kept info"]
+
+
+class TestLogListener:
+    def test_records_are_written_by_the_listener(self):
+        root = logging.getLogger()
+        handlers, level = root.handlers, root.level
+        handler = ListHandler()
+        root.handlers = [handler]
+        root.setLevel(logging.INFO)
+        try:
+            listener = start_log_listener()
+            logging.getLogger("test.queued").info("redirected %s", "abc1234")
+            listener.stop()
+        finally:
+            root.handlers, root.level = handlers, level
+        assert handler.messages == ["redirected abc1234"]
+
+    def test_stop_restores_the_root_handlers(self):
+        root = logging.getLogger()
+        handlers = root.handlers
+        handler = ListHandler()
+        root.handlers = [handler]
+        try:
+            start_log_listener().stop()
+            assert root.handlers == [handler]
+        finally:
+            root.handlers = handlers
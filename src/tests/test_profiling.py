@@ -0,0 +1,54 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+
+from src.core.profiling import ProfiledJSONResponse, ProfilingMiddleware, profiled
+
+
+@profiled("db")
+async def query() -> str:
+    return "row"
+
+
+@profiled("auth")
+async def authenticate() -> str:
+    return await query()
+
+
+def profiled_app(tmp_path, sample_rate=0.0) -> FastAPI:
+    app = FastAPI(default_response_class=ProfiledJSONResponse)
+
+    @app.get("/items")
+    async def items():
+        return {"user": await authenticate()}
+
+    app.add_middleware(ProfilingMiddleware, sample_rate=sample_rate, header_enabled=True, directory=tmp_path)
+    return app
+
+
+@pytest.mark.anyio
+class TestProfilingMiddleware:
+    async def test_unprofiled_request(self, tmp_path):
+        async with AsyncClient(app=profiled_app(tmp_path), base_url="http://test") as client:
+            response = await client.get("/items")
+        assert response.status_code == 200
+        assert "server-timing" not in response.headers
+        assert not list(tmp_path.iterdir())
+
+    async def test_profiled_by_header(self, tmp_path):
+        async with AsyncClient(app=profiled_app(tmp_path), base_url="http://test") as client:
+            response = await client.get("/items", headers={"X-Profile": "1"})
+        assert response.json() == {"user": "row"}
+        categories = [entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")]
+        assert {"auth", "db", "serialization", "other", "total"} <= set(categories)
+        assert len(list(tmp_path.glob("*-GET-items.prof"))) == 1
+        report = json.loads(next(tmp_path.glob("*-GET-items.json")).read_text())
+        assert report["path"] == "/items"
+        assert report["seconds"]["total"] >= report["seconds"]["db"]
+
+    async def test_profiled_by_sampling(self, tmp_path):
+        async with AsyncClient(app=profiled_app(tmp_path, sample_rate=1.0), base_url="http://test") as client:
+            response = await client.get("/items")
+        assert "server-timing" in response.headers
@@ -0,0 +1,163 @@
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, Dict, List, Set
+from unittest.mock import patch
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import Connection, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from src.core.config import settings
+from src.core.database import SQLBase
+from src.core.sharding import HashRing, Shards, find_on_shards, move_batch, reshard
+from src.core.url_shortener import url_hash
+from src.models import Url
+
+CODES = [f"code{index}" for index in range(20000)]
+OWNER_ID = uuid4()
+# The tables of a shard, created without the foreign key to `user` like src/alembic/shards does.
+SHARD_TABLES = [SQLBase.metadata.tables["url"], SQLBase.metadata.tables["cache_invalidation"]]
+
+
+def create_shard_tables(connection: Connection) -> None:
+    for table in SHARD_TABLES:
+        connection.execute(CreateTable(table, include_foreign_key_constraints=[]))
+        for index in table.indexes:
+            connection.execute(CreateIndex(index))
+
+
+def drop_shard_tables(connection: Connection) -> None:
+    for table in reversed(SHARD_TABLES):
+        table.drop(connection)
+
+
+@pytest.fixture
+async def shard_urls(engine: AsyncEngine) -> AsyncGenerator[Dict[str, str], None]:
+    """Two shard databases next to the test database, with empty shard tables."""
+    database_url = make_url(str(settings.test_database_url))
+    urls = {
+        name: database_url.set(database=f"{database_url.database}_shard_{name}").render_as_string(hide_password=False)
+        for name in ("a", "b")
+    }
+    async with engine.connect() as connection:
+        connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        for url in urls.values():
+            database = make_url(url).database
+            if not await connection.scalar(text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": database}):
+                await connection.execute(text(f'CREATE DATABASE "{database}"'))
+    shard_engines = [create_async_engine(url, poolclass=NullPool) for url in urls.values()]
+    for shard_engine in shard_engines:
+        async with shard_engine.begin() as connection:
+            await connection.run_sync(create_shard_tables)
+    yield urls
+    for shard_engine in shard_engines:
+        async with shard_engine.begin() as connection:
+            await connection.run_sync(drop_shard_tables)
+        await shard_engine.dispose()
+
+
+@asynccontextmanager
+async def sharded(test_shards: Shards) -> AsyncGenerator[Shards, None]:
+    with patch("src.core.sharding.shards", test_shards):
+        yield test_shards
+    for shard_engine in test_shards.engines.values():
+        await shard_engine.dispose()
+
+
+async def add_urls(test_shards: Shards, name: str, codes: List[str], **values: object) -> None:
+    async with test_shards.session(name) as shard_session:
+        shard_session.add_all(
+            [Url(original_url=f"https://example.com/{code}", shortened_url=code, owner_id=OWNER_ID, **values) for code in codes]
+        )
+        await shard_session.commit()
+
+
+async def url_id(test_shards: Shards, name: str, code: str) -> object:
+    async with test_shards.session(name) as shard_session:
+        return await shard_session.scalar(select(Url.id).where(Url.shortened_url == code))
+
+
+async def shard_codes(test_shards: Shards, name: str) -> Set[str]:
+    async with test_shards.session(name) as shard_session:
+        return set((await shard_session.scalars(select(Url.shortened_url))).all())
+
+
+class TestHashRing:
+    def test_owner_is_deterministic(self):
+        assert [HashRing(["a", "b", "c"]).owner(code) for code in CODES[:100]] == [
+            HashRing(["c", "b", "a"]).owner(code) for code in CODES[:100]
+        ]
+
+    def test_keys_are_spread_evenly(self):
+        owners = Counter(HashRing(["a", "b", "c", "d"]).owner(code) for code in CODES)
+        assert set(owners) == {"a", "b", "c", "d"}
+        assert all(abs(count - len(CODES) / 4) < len(CODES) * 0.05 for count in owners.values())
+
+    def test_adding_a_shard_only_moves_keys_to_it(self):
+        before, after = HashRing(["a", "b", "c"]), HashRing(["a", "b", "c", "d"])
+        moved = [code for code in CODES if before.owner(code) != after.owner(code)]
+        assert all(after.owner(code) == "d" for code in moved)
+        assert abs(len(moved) - len(CODES) / 4) < len(CODES) * 0.05
+
+
+class TestShards:
+    def test_sharding_is_off_without_shards(self):
+        shards = Shards({})
+        assert not shards.enabled
+        assert shards.names == []
+
+    def test_resharding_reads_the_previous_owner(self):
+        urls = {name: f"postgresql+asyncpg://test:test@{name}/test" for name in ["a", "b", "c"]}
+        shards = Shards(urls, ring=["a", "b", "c"], previous_ring=["a", "b"])
+        assert shards.names == ["a", "b", "c"]
+        moved = next(code for code in CODES if shards.owner(code) == "c")
+        assert shards.read_candidates(moved) == ["c", shards.previous_ring.owner(moved)]
+        kept = next(code for code in CODES if shards.owner(code) == "a" and shards.previous_ring.owner(code) == "a")
+        assert shards.read_candidates(kept) == ["a"]
+
+
+@pytest.mark.anyio
+class TestShardedStorage:
+    async def test_find_on_shards_falls_back_to_the_previous_owner(self, session: AsyncSession, shard_urls):
+        test_shards = Shards(shard_urls, ring=["a", "b"], previous_ring=["a"])
+        moved = next(code for code in CODES if test_shards.owner(code) == "b")
+        async with sharded(test_shards):
+            await add_urls(test_shards, "a", [moved])
+            found = await find_on_shards(
+                session, moved, lambda shard_session: Url.objects(shard_session).get(Url.shortened_url == moved)
+            )
+            missing = await find_on_shards(
+                session, "missing", lambda shard_session: Url.objects(shard_session).get(Url.shortened_url == "missing")
+            )
+        assert found is not None and found.shortened_url == moved
+        assert missing is None
+
+    async def test_reshard_moves_rows_to_their_owner(self, shard_urls):
+        test_shards = Shards(shard_urls, ring=["a", "b"], previous_ring=["a"])
+        codes = CODES[:20]
+        async with sharded(test_shards):
+            await add_urls(test_shards, "a", codes)
+            moved = await reshard(batch_size=7)
+            on_a, on_b = await shard_codes(test_shards, "a"), await shard_codes(test_shards, "b")
+        owned_by_b = {code for code in codes if test_shards.owner(code) == "b"}
+        assert owned_by_b
+        assert moved == len(owned_by_b)
+        assert on_b == owned_by_b
+        assert on_a == set(codes) - owned_by_b
+
+    async def test_move_batch_keeps_url_hashes_unique_per_owner(self, shard_urls):
+        test_shards = Shards(shard_urls, ring=["a", "b"], previous_ring=["a"])
+        moving, kept = [code for code in CODES if test_shards.owner(code) == "b"][:2]
+        hashed_url = url_hash("https://example.com/campaign")
+        async with sharded(test_shards):
+            await add_urls(test_shards, "a", [moving], url_hash=hashed_url)
+            await add_urls(test_shards, "b", [kept], url_hash=hashed_url)
+            moving_id = await url_id(test_shards, "a", moving)
+            assert await move_batch("a", None, batch_size=10) == (moving_id, 1)
+            async with test_shards.session("b") as shard_session:
+                hashes = dict((await shard_session.execute(select(Url.shortened_url, Url.url_hash))).all())
+        assert hashes == {moving: None, kept: hashed_url}
@@ -0,0 +1,39 @@
+from unittest.mock import patch
+
+import pytest
+from redis import Redis as SyncRedis
+from redis.asyncio import Redis
+
+from src.core.config import settings
+from src.core.trending import TRENDING_KEY, record_clicks, trending_urls
+
+NOW = 1_800_000_000.0
+
+
+@pytest.mark.anyio
+class TestTrending:
+    @pytest.fixture
+    def sync_redis(self):
+        redis_ = SyncRedis.from_url(f"redis://{settings.redis_host}:{settings.redis_port}")
+        yield redis_
+        redis_.close()
+
+    @pytest.fixture
+    async def redis(self):
+        async with Redis.from_url(f"redis://{settings.redis_host}:{settings.redis_port}", decode_responses=True) as redis_:
+            yield redis_
+
+    async def test_recent_clicks_outweigh_older_ones(self, sync_redis, redis):
+        record_clicks(sync_redis, {"older01": 8, "steady1": 3}, now=NOW)
+        record_clicks(sync_redis, {"newer01": 5, "steady1": 3}, now=NOW + settings.trending_half_life)
+        trending = await trending_urls(redis, 10, now=NOW + settings.trending_half_life)
+        assert [code for code, _ in trending] == ["newer01", "steady1", "older01"]
+        assert dict(trending) == pytest.approx({"newer01": 5.0, "steady1": 4.5, "older01": 4.0})
+
+    async def test_scores_are_bounded_to_max_links(self, sync_redis):
+        with patch.object(settings, "trending_max_links", 2):
+            record_clicks(sync_redis, {"link001": 1, "link002": 3, "link003": 2}, now=NOW)
+        assert sync_redis.zrevrange(TRENDING_KEY, 0, -1) == [b"link002", b"link003"]
+
+    async def test_no_clicks_yet(self, redis):
+        assert await trending_urls(redis, 10) == []
@@ -1,13 +1,26 @@
+import asyncio
+import threading
 import time
+from datetime import datetime, timedelta
 from typing import Any, Dict, Generator
 from unittest.mock import MagicMock, patch
 import pytest
 
 from httpx import AsyncClient
-from sqlalchemy.ext.asyncio import AsyncSession
-from src.celery.tasks import increment_click_count
+from redis import Redis as SyncRedis
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from src.api.v1.schemas import UrlCreate
+from src.celery.clicks import click_queue
+from src.controllers import UrlController
+from src.core.cache import url_cache_key
+from src.core.config import CacheWriteThrough, settings
+from src.core.outbox import relay_batch
+from src.core.trending import record_clicks
+from src.core.visitors import visitor_log
+from src.edge import app as edge_app
 from src.tests.base import BASE_URL
-from src.models import Url, User
+from src.models import CacheInvalidation, Url, User
 from src.core.security import PasswordManager
 
 
@@ -85,7 +98,9 @@ class TestCreateUrl(TestURL):
     async def test_create_shortened_url_with_duplicate_alias(self, client):
         custom_alias = "zapiaai"
         await client.post(self.URL_ENDPOINT, params={"alias": custom_alias}, json={"original_url": self.VALID_URL})
-        response_duplicated_alias = await client.post(self.URL_ENDPOINT, params={"alias": custom_alias}, json={"original_url": self.VALID_URL + "/dup"})
+        response_duplicated_alias = await client.post(
+            self.URL_ENDPOINT, params={"alias": custom_alias}, json={"original_url": self.VALID_URL + "/dup"}
+        )
         assert response_duplicated_alias.status_code == 409
         assert "detail" in response_duplicated_alias.json()
         assert response_duplicated_alias.json()["detail"] == "The provided alias is already in use."
@@ -103,6 +118,71 @@ class TestCreateUrl(TestURL):
         assert "detail" in response.json()
         assert response.json()["detail"] == "Alias must be at least 7 characters long and only contain alphanumeric characters."
 
+    async def test_idempotent_create_returns_existing_url(self, client, session):
+        first = await client.post(
+            self.URL_ENDPOINT, params={"idempotent": True}, json={"original_url": "https://example.com/page?a=1"}
+        )
+        assert first.status_code == 201
+        repeat = await client.post(
+            self.URL_ENDPOINT, params={"idempotent": True}, json={"original_url": "HTTPS://Example.com:443/page?a=1"}
+        )
+        assert repeat.status_code == 200
+        assert repeat.json()["shortened_url"] == first.json()["shortened_url"]
+        assert len(await Url.objects(session).all()) == 1
+
+    async def test_create_without_idempotent_adds_url(self, client):
+        first = await client.post(self.URL_ENDPOINT, json={"original_url": self.VALID_URL})
+        second = await client.post(self.URL_ENDPOINT, json={"original_url": self.VALID_URL})
+        repeat = await client.post(self.URL_ENDPOINT, params={"idempotent": True}, json={"original_url": self.VALID_URL})
+        assert second.status_code == 201
+        assert second.json()["shortened_url"] != first.json()["shortened_url"]
+        assert repeat.json()["shortened_url"] == first.json()["shortened_url"]
+
+    async def test_create_caches_url_of_high_traffic_owner(self, client, session):
+        redis_ = Redis.from_url(f"redis://{settings.redis_host}:{settings.redis_port}")
+        short_url = await self.create_url(client)
+        assert not await redis_.exists(url_cache_key(short_url))
+        await User.objects(session).update_where({"is_high_traffic": True}, User.email == self.TEST_USER_EMAIL)
+        short_url = await self.create_url(client, url=f"{self.VALID_URL}/campaign")
+        assert await redis_.get(url_cache_key(short_url)) == f"302 0 {self.VALID_URL}/campaign".encode()
+
+    async def test_create_caches_every_url_when_always(self, client):
+        with patch.object(settings, "url_cache_write_through", CacheWriteThrough.always):
+            short_url = await self.create_url(client)
+        redis_ = Redis.from_url(f"redis://{settings.redis_host}:{settings.redis_port}")
+        assert 0 < await redis_.ttl(url_cache_key(short_url)) <= settings.url_cache_ttl
+
+    async def test_idempotent_create_skips_deactivated_url(self, client):
+        deactivated = await self.create_url(client, deactivate=True)
+        response = await client.post(self.URL_ENDPOINT, params={"idempotent": True}, json={"original_url": self.VALID_URL})
+        assert response.status_code == 201
+        assert response.json()["shortened_url"] != deactivated
+
+    async def test_idempotent_create_with_other_settings_conflicts(self, client):
+        await self.create_url(client)
+        response = await client.post(
+            self.URL_ENDPOINT, params={"idempotent": True}, json={"original_url": self.VALID_URL, "max_clicks": 10}
+        )
+        assert response.status_code == 409
+        assert response.json()["detail"] == "You already have an active link to this URL, with different settings."
+
+    async def test_concurrent_idempotent_creates_make_one_url(self, engine, session):
+        owner = await User.objects(session).get(User.email == self.TEST_USER_EMAIL)
+        sessions = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+        # Spellings of the same URL, which get different codes but share their hash.
+        spellings = ["https://example.com", "https://example.com/", "HTTPS://Example.com", "https://example.com:443/"]
+
+        async def create(original_url: str):
+            async with sessions() as create_session:
+                return await UrlController.create(
+                    UrlCreate(original_url=original_url), owner.id, None, create_session, idempotent=True
+                )
+
+        results = await asyncio.gather(*(create(original_url) for original_url in spellings))
+        assert len({url.shortened_url for url, _ in results}) == 1
+        assert [created for _, created in results].count(True) == 1
+        assert len(await Url.objects(session).all()) == 1
+
 
 @pytest.mark.anyio
 class TestRetrieveUrlData(TestURL):
@@ -168,6 +248,34 @@ class TestRetrieveUrls(TestURL):
         urls = response.json()["items"]
         assert len(urls) == 0
 
+    async def test_retrieve_unique_visitors(self, client, mock_increment_click_count):
+        short_url = await self.create_url(client)
+        for user_agent in ["browser-a", "browser-a", "browser-b"]:
+            await client.get(f"{self.REDIRECT_ENDPOINT}/{short_url}", headers={"User-Agent": user_agent}, follow_redirects=False)
+        await visitor_log.flush()
+        response = await client.get(f"{self.URL_ENDPOINT}/{short_url}/stats")
+        assert response.status_code == 200
+        assert response.json()["unique_visitors"] == 2
+
+    async def test_unique_visitors_date_range_is_bounded(self, client):
+        short_url = await self.create_url(client)
+        response = await client.get(f"{self.URL_ENDPOINT}/{short_url}/stats", params={"start": "2020-01-01", "end": "2026-01-01"})
+        assert response.status_code == 400
+
+    async def test_retrieve_trending_urls(self, client, session):
+        await User.objects(session).update_where({"is_superuser": True}, User.email == self.TEST_USER_EMAIL)
+        hot_url = await self.create_url(client)
+        cold_url = await self.create_url(client, self.VALID_URL + "/cold")
+        record_clicks(SyncRedis.from_url(f"redis://{settings.redis_host}:{settings.redis_port}"), {hot_url: 10, cold_url: 2})
+        response = await client.get(f"{self.URL_ENDPOINT}/trending", params={"limit": 1})
+        assert response.status_code == 200
+        assert [url["shortened_url"] for url in response.json()] == [hot_url]
+        assert response.json()[0]["score"] == pytest.approx(10, rel=0.01)
+
+    async def test_trending_urls_are_restricted_to_superusers(self, client):
+        response = await client.get(f"{self.URL_ENDPOINT}/trending")
+        assert response.status_code == 403
+
 
 @pytest.mark.anyio
 class TestDeleteUrl(TestURL):
@@ -199,6 +307,40 @@ class TestDeleteUrl(TestURL):
         assert "detail" in deactivate_response.json()
         assert self.ERROR_MESSAGE in deactivate_response.json()["detail"]
 
+    async def test_bulk_deactivate_shortened_urls(self, client, session, mock_increment_click_count):
+        short_urls = [await self.create_url(client, f"{self.VALID_URL}/{index}") for index in range(3)]
+        await client.get(f"{self.REDIRECT_ENDPOINT}/{short_urls[0]}", follow_redirects=False)
+        inactive_url = await self.create_url(client, f"{self.VALID_URL}/inactive", deactivate=True)
+        response = await client.post(
+            f"{self.URL_ENDPOINT}/deactivate", json={"shortened_urls": [*short_urls[:2], inactive_url, "missing1"]}
+        )
+        assert response.status_code == 200
+        assert sorted(response.json()["deactivated"]) == sorted(short_urls[:2])
+        assert await Url.objects(session).count(Url.is_active == True) == 1  # noqa: E712
+        redis_ = Redis.from_url(f"redis://{settings.redis_host}:{settings.redis_port}")
+        assert not await redis_.exists(url_cache_key(short_urls[0]))
+
+    async def test_bulk_deactivate_skips_other_users_urls(self, client, session):
+        short_url = await self.create_url(client)
+        await self.logout(client)
+        await self.setup_user(session, email="new-user@test.com", password="new-password")
+        await self.authenticate(client, email="new-user@test.com", password="new-password")
+        response = await client.post(f"{self.URL_ENDPOINT}/deactivate", json={"shortened_urls": [short_url]})
+        assert response.status_code == 200
+        assert response.json()["deactivated"] == []
+
+    async def test_deactivation_is_relayed_from_the_outbox(self, client, session, mock_increment_click_count):
+        short_url = await self.create_url(client)
+        await client.get(f"{self.REDIRECT_ENDPOINT}/{short_url}", follow_redirects=False)
+        user = await User.objects(session).get(User.email == self.TEST_USER_EMAIL)
+        # Deactivated without evicting the cache entry, as if the process died right after the commit.
+        await UrlController.deactivate(shortened_url=short_url, owner_id=user.id, session=session)
+        async with Redis.from_url(f"redis://{settings.redis_host}:{settings.redis_port}", decode_responses=True) as redis_:
+            assert await redis_.exists(url_cache_key(short_url))
+            assert await relay_batch(session, redis_, 100) == 1
+            assert not await redis_.exists(url_cache_key(short_url))
+        assert await CacheInvalidation.objects(session).all() == []
+
 
 @pytest.mark.anyio
 class TestRedirectUrl(TestURL):
@@ -223,7 +365,146 @@ class TestRedirectUrl(TestURL):
         assert response.status_code == 404
         assert "detail" in response.json()
         assert response.json()["detail"] == self.ERROR_MESSAGE
-        
+
+    async def test_temporary_redirect_is_not_cacheable(self, client, mock_increment_click_count):
+        short_url = await self.create_url(client)
+        response = await client.get(f"{self.REDIRECT_ENDPOINT}/{short_url}", follow_redirects=False)
+        assert response.status_code == 302
+        assert response.headers["cache-control"] == "no-store"
+
+    async def test_permanent_redirect_is_cacheable_until_expiry(self, client, mock_increment_click_count):
+        expires_at = (datetime.utcnow() + timedelta(minutes=10)).isoformat()
+        create_response = await client.post(
+            self.URL_ENDPOINT, json={"original_url": self.VALID_URL, "redirect_type": 308, "expires_at": expires_at}
+        )
+        short_url = create_response.json()["shortened_url"]
+        assert create_response.json()["redirect_type"] == 308
+        for _ in range(2):  # From the database, then from the cache.
+            response = await client.get(f"{self.REDIRECT_ENDPOINT}/{short_url}", follow_redirects=False)
+            assert response.status_code == 308
+            assert response.headers["location"] == self.VALID_URL
+            max_age = int(response.headers["cache-control"].removeprefix("public, max-age="))
+            assert 500 < max_age <= 600
+            assert "expires" in response.headers
+
+    async def test_click_limited_permanent_redirect_is_not_cacheable(self, client, mock_increment_click_count):
+        create_response = await client.post(
+            self.URL_ENDPOINT, json={"original_url": self.VALID_URL, "redirect_type": 301, "max_clicks": 10}
+        )
+        short_url = create_response.json()["shortened_url"]
+        response = await client.get(f"{self.REDIRECT_ENDPOINT}/{short_url}", follow_redirects=False)
+        assert response.status_code == 301
+        assert response.headers["cache-control"] == "no-store"
+
+    async def test_redirect_to_expired_url(self, client):
+        expires_at = (datetime.utcnow() - timedelta(minutes=1)).isoformat()
+        create_response = await client.post(self.URL_ENDPOINT, json={"original_url": self.VALID_URL, "expires_at": expires_at})
+        short_url = create_response.json()["shortened_url"]
+        response = await client.get(f"{self.REDIRECT_ENDPOINT}/{short_url}", follow_redirects=False)
+        assert response.status_code == 404
+        assert response.json()["detail"] == self.ERROR_MESSAGE
+
+    async def test_redirect_cache_entry_expires_with_url(self, client, mock_increment_click_count):
+        expires_at = (datetime.utcnow() + timedelta(minutes=2)).isoformat()
+        create_response = await client.post(self.URL_ENDPOINT, json={"original_url": self.VALID_URL, "expires_at": expires_at})
+        short_url = create_response.json()["shortened_url"]
+        response = await client.get(f"{self.REDIRECT_ENDPOINT}/{short_url}", follow_redirects=False)
+        assert response.status_code == 302
+        redis_ = Redis.from_url(f"redis://{settings.redis_host}:{settings.redis_port}")
+        assert 0 < await redis_.ttl(url_cache_key(short_url)) <= 120
+
+    async def test_redirect_to_url_out_of_clicks(self, client, session):
+        create_response = await client.post(self.URL_ENDPOINT, json={"original_url": self.VALID_URL, "max_clicks": 1})
+        short_url = create_response.json()["shortened_url"]
+        url = await Url.objects(session).get(Url.shortened_url == short_url)
+        url.clicks = 1
+        await session.commit()
+        response = await client.get(f"{self.REDIRECT_ENDPOINT}/{short_url}", follow_redirects=False)
+        assert response.status_code == 404
+
+    async def test_redirect_does_not_wait_on_stalled_broker(self, client):
+        short_url = await self.create_url(client)
+        broker_released = threading.Event()
+        with patch.object(click_queue, "_publish", side_effect=lambda counts: broker_released.wait(10)):
+            start = time.perf_counter()
+            response = await client.get(f"{self.REDIRECT_ENDPOINT}/{short_url}", follow_redirects=False)
+            elapsed = time.perf_counter() - start
+            broker_released.set()
+        assert response.status_code == 302
+        assert elapsed < 1
+
+    async def test_redirect_metrics(self, client, mock_increment_click_count):
+        short_url = await self.create_url(client)
+        await client.get(f"{self.REDIRECT_ENDPOINT}/{short_url}", follow_redirects=False)
+        await client.get(f"{self.REDIRECT_ENDPOINT}/{short_url}", follow_redirects=False)
+        response = await client.get("/metrics")
+        assert response.status_code == 200
+        assert 'redirect_cache_requests_total{result="hit"}' in response.text
+        assert 'redirect_cache_requests_total{result="miss"}' in response.text
+        assert 'route="/api/v1/redirect/{shortened_url}",status="302"' in response.text
+
+    async def test_batch_resolve(self, client, mock_increment_click_count):
+        short_urls = [await self.create_url(client, url=f"{self.VALID_URL}/{index}") for index in range(3)]
+        inactive_url = await self.create_url(client, url=f"{self.VALID_URL}/inactive", deactivate=True)
+        await client.get(f"{self.REDIRECT_ENDPOINT}/{short_urls[0]}", follow_redirects=False)  # Cached.
+        codes = short_urls + [inactive_url, "nonexistent"]
+        response = await client.post(f"{self.REDIRECT_ENDPOINT}/resolve", json={"shortened_urls": codes})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["redirects"] == {
+            short_url: {"original_url": f"{self.VALID_URL}/{index}", "status_code": 302}
+            for index, short_url in enumerate(short_urls)
+        }
+        assert data["not_found"] == [inactive_url, "nonexistent"]
+        assert data["cache_hit_ratio"] == 0.2
+        response = await client.post(f"{self.REDIRECT_ENDPOINT}/resolve", json={"shortened_urls": short_urls})
+        assert response.json()["cache_hit_ratio"] == 1.0
+
+    async def test_redirect_from_edge_app(self, client, engine, mock_increment_click_count):
+        short_url = await self.create_url(client)
+        with patch("src.edge.AsyncSessionLocal", async_sessionmaker(bind=engine, class_=AsyncSession)):
+            async with AsyncClient(app=edge_app, base_url="http://test") as edge_client:
+                response = await edge_client.get(f"/{short_url}", follow_redirects=False)
+                missing_response = await edge_client.get("/missing1", follow_redirects=False)
+        assert response.status_code == 302
+        assert response.headers["location"] == self.VALID_URL
+        assert missing_response.status_code == 404
+        assert missing_response.json()["detail"] == self.ERROR_MESSAGE
+
+
+@pytest.mark.anyio
+class TestBulkWrites(TestURL):
+    async def create_urls(self, session: AsyncSession, count: int) -> list:
+        user = await User.objects(session).get(User.email == self.TEST_USER_EMAIL)
+        return await Url.objects(session).create_many([
+            {"original_url": self.VALID_URL, "shortened_url": f"bulk{index:04d}", "owner_id": user.id}
+            for index in range(count)
+        ])
+
+    async def test_create_many_returns_server_defaults(self, session):
+        urls = await self.create_urls(session, 3)
+        assert [url.shortened_url for url in urls] == ["bulk0000", "bulk0001", "bulk0002"]
+        assert all(url.id is not None and url.created_at is not None for url in urls)
+        assert await Url.objects(session).count() == 3
+
+    async def test_approximate_count_of_small_table_is_exact(self, session):
+        await self.create_urls(session, 3)
+        assert await Url.objects(session).count(approximate=True) == 3
+
+    async def test_update_where_returns_updated_rows(self, session):
+        await self.create_urls(session, 3)
+        urls = await Url.objects(session).update_where({"is_active": False}, Url.shortened_url.in_(["bulk0000", "bulk0002"]))
+        assert sorted(url.shortened_url for url in urls) == ["bulk0000", "bulk0002"]
+        assert all(not url.is_active for url in urls)
+        assert await Url.objects(session).count(Url.is_active == True) == 1  # noqa: E712
+
+    async def test_delete_where_respects_queryset_filters(self, session):
+        await self.create_urls(session, 3)
+        await Url.objects(session).update_where({"is_active": False}, Url.shortened_url == "bulk0000")
+        deleted = await Url.redirectables(session).delete_where(Url.shortened_url.in_(["bulk0000", "bulk0001"]))
+        assert [url.shortened_url for url in deleted] == ["bulk0001"]
+        assert await Url.objects(session).count() == 2
+
 
 @pytest.mark.anyio
 class TestURLIntegration(TestURL):
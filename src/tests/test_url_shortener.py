@@ -0,0 +1,28 @@
+import random
+import string
+
+import pytest
+
+from src.core.url_shortener import (
+    ALLOWED_CHARACTERS,
+    create_hashed_url_variant,
+    create_shortened_url_variant,
+    create_shortened_url_variants,
+)
+
+# Seeded, so every run tests the same URLs.
+RANDOM = random.Random(32)
+
+
+class TestShortenedUrlVariant:
+    URLS = [f"https://example.com/{''.join(RANDOM.choices(string.ascii_letters, k=size))}" for size in range(200)]
+
+    @pytest.mark.parametrize("length", [1, 2, 7, 8, 12, 43, 50])
+    @pytest.mark.parametrize("attempt", [0, 1, 9])
+    def test_matches_truncated_full_encoding(self, length, attempt):
+        for url in self.URLS:
+            expected = create_hashed_url_variant(url, attempt, ALLOWED_CHARACTERS)[:length]
+            assert create_shortened_url_variant(url, attempt, length) == expected
+
+    def test_batch_matches_single(self):
+        assert create_shortened_url_variants(self.URLS, 3) == [create_shortened_url_variant(url, 3) for url in self.URLS]